@@ -1,28 +1,62 @@
+import os
 import tkinter as tk
-from tkinter import filedialog
-from PIL import Image, ImageTk
+from tkinter import filedialog, simpledialog
 import numpy as np
-import matplotlib.pyplot as plt
+from matplotlib.figure import Figure
 from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
-import csv
+from profiles import profile_origin, bbox_to_indices
+from imagecache import ImageCache, build_profile_cache, decode_image, neighbors
+from batchprofile import find_images
+from profileio import save_filetypes, write_table
+from tileviewer import TiledImageView
+from profileplot import ProfilePlot
+from calibration import Calibration
+from spectral import DEFAULT_LAMP_LINES, WavelengthCalibration, parse_wavelengths
+from fringe import fringe_metrics, power_spectrum, power_spectrum_2d
+
+# Live preview redraw budget (~60 Hz): drag events arriving faster are coalesced
+LIVE_INTERVAL_MS = 16
+# Profile direction for arbitrary-angle line profiles (the ROI is a line plus a band width)
+LINE = "Line"
+# Outline and plot colors of named ROIs (Matplotlib's tab10 cycle)
+ROI_COLORS = ["#1f77b4", "#ff7f0e", "#2ca02c", "#9467bd", "#8c564b", "#e377c2", "#7f7f7f", "#bcbd22", "#17becf"]
 
 class ImageAnalysisApp(tk.Frame):
     def __init__(self, master=None):
         super().__init__(master)
         self.master = master
         self.pack(fill=tk.BOTH, expand=True)
-        
+        self.init_state()
+        self.create_widgets()
+
+    def init_state(self):
+        """Image, ROI and export state (no widgets, so benchmarks can run it headless)"""
         # Variables to store state
         self.start_x = None
         self.start_y = None
         self.rect = None
-        self.image = None
-        self.image_id = None
+        self.band = None # Dashed outline of the line-profile band
+        self.roi = None # ROI corners [x1, y1, x2, y2] (or line endpoints) in full-resolution image pixels
+        self.pinned = [] # Named ROIs analyzed together with the active one: {"name", "roi", "color", "items"}
+        self.image = None # 8-bit display image
+        self.image_data = None # Pixel data at full precision (uint8, uint16 or float)
+        self.profile_cache = None # Prefix sums of the open image
+        self.value_label = "Avg Intensity (0-255)" # Profile axis label for the data's bit depth
+        self.calibration = None # Dark/flat correction applied when the image is loaded
+        self.wavelength_cal = None # Pixel -> wavelength map for spectrometer images
         self.plot_figure = None
-        self.current_data = None # Stores data for CSV export
+        self.profile_plot = None # Persistent plot, built on the first analysis
+        self.current_data = None # Stores data columns (NumPy arrays) for export
         self.current_headers = []
+        self.live_job = None # Pending live-preview update (Tk after id)
+        self.fft_window = None # Fringe / FFT panel (Toplevel), refreshed on every analysis
 
-        self.create_widgets()
+        # Folder browsing: decoded images (and their prefix sums) are kept in a
+        # byte-limited LRU and the neighbors are decoded ahead on a background thread
+        self.image_cache = ImageCache(self.decode)
+        self.decode_settings = (None, None) # (calibration, (mode, direction) table), mirrored for the prefetch thread
+        self.folder_files = []
+        self.folder_index = None
 
     def create_widgets(self):
         # --- Control Panel (Top) ---
@@ -32,12 +66,21 @@ class ImageAnalysisApp(tk.Frame):
         # Open Button
         self.open_button = tk.Button(control_frame, text="Open Image", command=self.open_image)
         self.open_button.pack(side=tk.LEFT, padx=10, pady=10)
+        tk.Button(control_frame, text="Open Folder", command=self.open_folder).pack(side=tk.LEFT)
+        tk.Button(control_frame, text="\u25c0", command=lambda: self.step_image(-1)).pack(side=tk.LEFT, padx=(5, 0))
+        tk.Button(control_frame, text="\u25b6", command=lambda: self.step_image(1)).pack(side=tk.LEFT)
+        self.file_label = tk.Label(control_frame, text="", bg="#f0f0f0")
+        self.file_label.pack(side=tk.LEFT, padx=5)
 
         # Direction Toggles
         tk.Label(control_frame, text="|  Profile Direction:", bg="#f0f0f0").pack(side=tk.LEFT, padx=5)
         self.dir_var = tk.StringVar(value="Horizontal")
-        tk.Radiobutton(control_frame, text="Horizontal (X)", variable=self.dir_var, value="Horizontal", bg="#f0f0f0").pack(side=tk.LEFT)
-        tk.Radiobutton(control_frame, text="Vertical (Y)", variable=self.dir_var, value="Vertical", bg="#f0f0f0").pack(side=tk.LEFT)
+        tk.Radiobutton(control_frame, text="Horizontal (X)", variable=self.dir_var, value="Horizontal", bg="#f0f0f0", command=self.on_direction_change).pack(side=tk.LEFT)
+        tk.Radiobutton(control_frame, text="Vertical (Y)", variable=self.dir_var, value="Vertical", bg="#f0f0f0", command=self.on_direction_change).pack(side=tk.LEFT)
+        tk.Radiobutton(control_frame, text="Line (any angle)", variable=self.dir_var, value=LINE, bg="#f0f0f0", command=self.on_direction_change).pack(side=tk.LEFT)
+        tk.Label(control_frame, text="Width:", bg="#f0f0f0").pack(side=tk.LEFT)
+        self.band_var = tk.IntVar(value=5)
+        tk.Spinbox(control_frame, from_=1, to=201, width=4, textvariable=self.band_var, command=self.on_band_change).pack(side=tk.LEFT)
 
         # Color Mode Toggles
         tk.Label(control_frame, text="|  Color Mode:", bg="#f0f0f0").pack(side=tk.LEFT, padx=10)
@@ -45,10 +88,38 @@ class ImageAnalysisApp(tk.Frame):
         tk.Radiobutton(control_frame, text="Grayscale (Intensity)", variable=self.mode_var, value="Grayscale", bg="#f0f0f0").pack(side=tk.LEFT)
         tk.Radiobutton(control_frame, text="RGB Channels", variable=self.mode_var, value="RGB", bg="#f0f0f0").pack(side=tk.LEFT)
 
+        # Live Preview Toggle
+        self.live_var = tk.BooleanVar(value=False)
+        tk.Checkbutton(control_frame, text="Live Preview", variable=self.live_var, bg="#f0f0f0").pack(side=tk.LEFT, padx=10)
+
         # Save Button
-        self.save_button = tk.Button(control_frame, text="Save Plot Data (.csv)", command=self.save_csv, state=tk.DISABLED)
+        self.save_button = tk.Button(control_frame, text="Save Plot Data", command=self.save_csv, state=tk.DISABLED)
         self.save_button.pack(side=tk.RIGHT, padx=10)
 
+        # --- Tools Row ---
+        tools_frame = tk.Frame(self, bg="#f0f0f0", bd=1, relief=tk.RAISED)
+        tools_frame.pack(side=tk.TOP, fill=tk.X)
+
+        # Calibration (dark/flat from the camera app)
+        tk.Button(tools_frame, text="Load Calibration", command=self.load_calibration).pack(side=tk.LEFT, padx=10, pady=5)
+        self.apply_cal_var = tk.BooleanVar(value=False)
+        tk.Checkbutton(tools_frame, text="Apply Dark/Flat", variable=self.apply_cal_var, bg="#f0f0f0", command=self.on_calibration_toggle).pack(side=tk.LEFT)
+
+        # Named ROIs: the drawn ROI is pinned under a name and a new one can be drawn
+        tk.Label(tools_frame, text="|  ROIs:", bg="#f0f0f0").pack(side=tk.LEFT, padx=5)
+        tk.Button(tools_frame, text="Add ROI", command=self.add_roi).pack(side=tk.LEFT, padx=5)
+        tk.Button(tools_frame, text="Clear ROIs", command=self.clear_rois).pack(side=tk.LEFT)
+
+        # Spectrometer: calibrate the profile axis from a lamp spectrum
+        tk.Label(tools_frame, text="|  Spectrum:", bg="#f0f0f0").pack(side=tk.LEFT, padx=5)
+        tk.Button(tools_frame, text="Calibrate \u03bb...", command=self.calibrate_wavelength).pack(side=tk.LEFT, padx=5)
+        tk.Button(tools_frame, text="Load \u03bb Cal", command=self.load_wavelength_cal).pack(side=tk.LEFT)
+        self.wavelength_var = tk.BooleanVar(value=False)
+        tk.Checkbutton(tools_frame, text="Wavelength Axis", variable=self.wavelength_var, bg="#f0f0f0", command=self.on_band_change).pack(side=tk.LEFT, padx=5)
+
+        # Interference/diffraction: spectrum of the profile and of the ROI crop
+        tk.Button(tools_frame, text="Fringe / FFT...", command=self.open_fft_panel).pack(side=tk.LEFT, padx=10)
+
         # --- Main Layout (Split Pane) ---
         paned_window = tk.PanedWindow(self, orient=tk.VERTICAL)
         paned_window.pack(fill=tk.BOTH, expand=True)
@@ -57,6 +128,8 @@ class ImageAnalysisApp(tk.Frame):
         self.canvas_frame = tk.Frame(paned_window)
         self.canvas = tk.Canvas(self.canvas_frame, bg="#555", width=800, height=400)
         self.canvas.pack(fill=tk.BOTH, expand=True)
+        # Tiled pyramid display: wheel zooms, right/middle drag pans
+        self.view = TiledImageView(self.canvas, on_view_change=self.draw_roi)
         paned_window.add(self.canvas_frame)
 
         # Plot Area (Bottom)
@@ -68,163 +141,530 @@ class ImageAnalysisApp(tk.Frame):
         self.canvas.bind("<ButtonPress-1>", self.on_button_press)
         self.canvas.bind("<B1-Motion>", self.on_move_press)
         self.canvas.bind("<ButtonRelease-1>", self.on_button_release)
+        # Page Up / Page Down flip through the folder
+        self.master.bind("<Prior>", lambda event: self.step_image(-1))
+        self.master.bind("<Next>", lambda event: self.step_image(1))
 
     def open_image(self):
-        file_path = filedialog.askopenfilename(filetypes=[("Image files", "*.jpg *.png *.jpeg *.bmp *.tif")])
+        file_path = filedialog.askopenfilename(filetypes=[("Image files", "*.jpg *.png *.jpeg *.bmp *.tif *.tiff"),
+                                                          ("Raw frames", "*.npy *.tif *.tiff")])
         if file_path:
-            self.image = Image.open(file_path)
-            self.tk_image = ImageTk.PhotoImage(self.image)
-            
-            # Reset canvas
-            self.canvas.delete("all")
-            self.canvas.config(scrollregion=(0, 0, self.image.width, self.image.height))
-            self.image_id = self.canvas.create_image(0, 0, anchor="nw", image=self.tk_image)
-            self.rect = None
+            # The rest of the folder is a Next/Previous away
+            folder = os.path.dirname(os.path.abspath(file_path))
+            files = find_images([folder])
+            path = os.path.abspath(file_path)
+            if path not in files:
+                files = [path]
+            self.folder_files = files
+            self.show_file(files.index(path), keep_roi=False)
+
+    def open_folder(self):
+        folder = filedialog.askdirectory(title="Browse Folder")
+        if folder:
+            files = find_images([folder])
+            if not files:
+                print(f"No images in {folder}")
+                return
+            self.folder_files = files
+            self.show_file(0, keep_roi=False)
+
+    def step_image(self, step):
+        if self.folder_index is not None and self.folder_files:
+            index = self.folder_index + step
+            if 0 <= index < len(self.folder_files):
+                self.show_file(index, keep_roi=True)
+
+    def decode(self, path, background=False):
+        """
+        Any thread: decodes a file with the settings mirrored from the UI.
+        Prefetched files also get their prefix-sum table; a file opened now is
+        shown first and its table built afterwards (see show_file).
+        """
+        calibration, table = self.decode_settings
+        return decode_image(path, calibration, table if background else None)
+
+    def show_file(self, index, keep_roi):
+        """Shows a file of the folder (from the cache when possible) and prefetches its neighbors"""
+        # Settings for this and prefetched decodes (Tk variables stay on this thread)
+        calibration = self.calibration if self.apply_cal_var.get() else None
+        table = (self.mode_var.get(), self.dir_var.get()) if self.dir_var.get() != LINE else None
+        self.decode_settings = (calibration, table)
+
+        path = self.folder_files[index]
+        try:
+            entry = self.image_cache.get(path)
+        except Exception as e:
+            print(f"Error opening {path}: {e}")
+            return
+        self.folder_index = index
+        self.file_label.config(text=f"{index + 1} / {len(self.folder_files)}  {os.path.basename(path)}")
+        self.show_image(entry, keep_roi)
+        if table is not None:
+            # No-op for prefetched files; otherwise builds the table off the Tk thread
+            entry.cache.prefetch(*table)
+        self.image_cache.prefetch([self.folder_files[i] for i in neighbors(index, len(self.folder_files))])
+
+    def show_image(self, entry, keep_roi):
+        """Displays a decoded image; with keep_roi the view and the ROI carry over and are re-analyzed"""
+        same_size = self.image is not None and self.image.size == entry.display.size
+        # Raw/16-bit data is kept as is; only the on-screen copy is scaled to 8 bits
+        self.image_data = entry.data
+        self.image = entry.display
+        self.profile_cache = entry.cache
+        self.value_label = entry.value_label
+
+        # Reset canvas
+        self.canvas.delete("all")
+        self.rect = None
+        self.band = None
+        if not keep_roi:
+            self.roi = None
+        elif self.roi:
+            self.rect, self.band, _ = self.create_roi_items('red')
+        for pin in self.pinned:
+            # Named ROIs carry over to the next image
+            pin["items"] = self.create_roi_items(pin["color"], pin["name"])
+        self.view.set_image(self.image, entry.levels, keep_view=keep_roi and same_size)
+        self.draw_roi()
+
+        bbox = self.get_roi_bbox()
+        if keep_roi and (bbox or self.pinned):
+            self.analyze_image(bbox)
+
+    def build_profile_cache(self):
+        # Dark/flat correction happens once here, so every profile sees corrected data
+        calibration = self.calibration if self.apply_cal_var.get() else None
+        self.profile_cache, self.value_label = build_profile_cache(self.image_data, calibration)
+        # Build the prefix sums for the current settings while the user draws
+        # (line profiles sample the plane directly and need no table)
+        if self.dir_var.get() != LINE:
+            self.profile_cache.prefetch(self.mode_var.get(), self.dir_var.get())
+
+    def load_calibration(self):
+        file_path = filedialog.askopenfilename(filetypes=[("Calibration", "*.npz")])
+        if file_path:
+            try:
+                self.calibration = Calibration.load(file_path)
+                self.apply_cal_var.set(True)
+                self.on_calibration_toggle()
+                print(f"Loaded calibration from {file_path}")
+            except Exception as e:
+                print(f"Error loading calibration: {e}")
+
+    def on_calibration_toggle(self):
+        # Rebuild the cache from (un)corrected pixels and refresh the current ROI
+        self.image_cache.clear() # Cached tables hold the old correction
+        if self.image is not None:
+            self.build_profile_cache()
+            bbox = self.get_roi_bbox()
+            if bbox or self.pinned:
+                self.analyze_image(bbox)
+
+    def calibrate_wavelength(self):
+        """Fits pixel -> wavelength from the lamp lines in the drawn ROI's intensity profile"""
+        direction = self.dir_var.get()
+        bbox = self.get_roi_bbox()
+        if not bbox or direction == LINE:
+            print("Draw a horizontal or vertical ROI over the lamp spectrum first")
+            return
+        text = simpledialog.askstring("Wavelength Calibration", "Known lines (nm), in pixel order:",
+                                      initialvalue=DEFAULT_LAMP_LINES, parent=self)
+        if not text:
+            return
+        try:
+            profile = self.profile_cache.profile(bbox, direction, "Grayscale")["Intensity"]
+            cal = WavelengthCalibration.from_profile(profile, parse_wavelengths(text), profile_origin(bbox, direction),
+                                                     direction=direction)
+        except ValueError as e:
+            print(f"Calibration failed: {e}")
+            return
+        print(f"Lines at pixels {np.round(cal.pixels, 2).tolist()}, RMS residual {cal.rms():.3f} nm")
+
+        self.wavelength_cal = cal
+        self.wavelength_var.set(True)
+        file_path = filedialog.asksaveasfilename(defaultextension=".json", filetypes=[("Wavelength calibration", "*.json")])
+        if file_path:
+            cal.save(file_path)
+            print(f"Saved wavelength calibration to {file_path}")
+        self.on_band_change()
+
+    def load_wavelength_cal(self):
+        file_path = filedialog.askopenfilename(filetypes=[("Wavelength calibration", "*.json")])
+        if file_path:
+            try:
+                self.wavelength_cal = WavelengthCalibration.load(file_path)
+                self.wavelength_var.set(True)
+                self.on_band_change()
+                print(f"Loaded wavelength calibration from {file_path}")
+            except Exception as e:
+                print(f"Error loading wavelength calibration: {e}")
+
+    def wavelength_axis(self, bbox, direction, length):
+        """Wavelengths of a profile's samples, or None when the map does not apply"""
+        cal = self.wavelength_cal
+        if cal is None or not self.wavelength_var.get() or direction != cal.direction:
+            return None
+        return cal.axis(profile_origin(bbox, direction), length)
+
+    def on_direction_change(self):
+        # A rectangle and a line ROI are not interchangeable: start over
+        is_line = self.dir_var.get() == LINE
+        items = [self.rect] + [pin["items"][0] for pin in self.pinned]
+        if any(item and (self.canvas.type(item) == "line") != is_line for item in items):
+            if self.rect:
+                self.canvas.delete(self.rect)
+            if self.band:
+                self.canvas.delete(self.band)
+            self.rect = self.band = None
+            self.roi = None
+            self.clear_rois()
+            return
+        self.on_band_change()
+
+    def on_band_change(self):
+        self.draw_roi()
+        bbox = self.get_roi_bbox()
+        if bbox or self.pinned:
+            self.analyze_image(bbox)
+
+    def band_width(self):
+        try:
+            return max(1, int(self.band_var.get()))
+        except (tk.TclError, ValueError):
+            return 1
 
     def on_button_press(self, event):
-        if self.image_id is not None:
-            self.start_x = self.canvas.canvasx(event.x)
-            self.start_y = self.canvas.canvasy(event.y)
+        if self.image is not None:
+            # Start corner in full-resolution image coordinates
+            self.start_x, self.start_y = self.view.canvas_to_image(self.canvas.canvasx(event.x), self.canvas.canvasy(event.y))
+            self.roi = [self.start_x, self.start_y, self.start_x, self.start_y]
 
             if self.rect:
                 self.canvas.delete(self.rect)
-            self.rect = self.canvas.create_rectangle(self.start_x, self.start_y, self.start_x, self.start_y, outline='red', width=2)
+            if self.band:
+                self.canvas.delete(self.band)
+                self.band = None
+            self.rect, self.band, _ = self.create_roi_items('red')
+            self.draw_roi()
+
+    def create_roi_items(self, color, name=None):
+        """Canvas items for one ROI: outline (rectangle or line), line band, name label"""
+        band = text = None
+        if self.dir_var.get() == LINE:
+            band = self.canvas.create_polygon(0, 0, 0, 0, outline=color, fill='', dash=(3, 3))
+            rect = self.canvas.create_line(0, 0, 0, 0, fill=color, width=2, arrow=tk.LAST)
+        else:
+            rect = self.canvas.create_rectangle(0, 0, 0, 0, outline=color, width=2)
+        if name:
+            text = self.canvas.create_text(0, 0, text=name, fill=color, anchor=tk.SW)
+        return rect, band, text
+
+    def add_roi(self):
+        """Pins the drawn ROI under a name; its profile is then shown with all the others"""
+        bbox = self.get_roi_bbox()
+        if not bbox:
+            print("Draw an ROI first")
+            return
+        name = simpledialog.askstring("Add ROI", "ROI name:", initialvalue=f"ROI {len(self.pinned) + 1}", parent=self)
+        if not name:
+            return
+        color = ROI_COLORS[len(self.pinned) % len(ROI_COLORS)]
+        self.pinned.append({"name": name, "roi": list(self.roi), "color": color, "items": self.create_roi_items(color, name)})
+
+        # The active ROI became the pinned one
+        self.canvas.delete(self.rect)
+        if self.band:
+            self.canvas.delete(self.band)
+        self.rect = self.band = None
+        self.roi = None
+        self.draw_roi()
+        self.analyze_image(None)
+
+    def clear_rois(self):
+        for pin in self.pinned:
+            for item in pin["items"]:
+                if item:
+                    self.canvas.delete(item)
+        self.pinned = []
+        bbox = self.get_roi_bbox()
+        if bbox:
+            self.analyze_image(bbox)
 
     def on_move_press(self, event):
-        cur_x = self.canvas.canvasx(event.x)
-        cur_y = self.canvas.canvasy(event.y)
+        cur_x, cur_y = self.view.canvas_to_image(self.canvas.canvasx(event.x), self.canvas.canvasy(event.y))
         if self.rect:
-            self.canvas.coords(self.rect, self.start_x, self.start_y, cur_x, cur_y)
+            self.roi = [self.start_x, self.start_y, cur_x, cur_y]
+            self.draw_roi()
+
+            # Live mode: coalesce drag events, only the latest rectangle is analyzed
+            if self.live_var.get() and self.live_job is None:
+                self.live_job = self.after(LIVE_INTERVAL_MS, self.live_update)
+
+    def draw_roi(self):
+        """Projects the ROIs onto the canvas for the current zoom and pan"""
+        if self.rect and self.roi:
+            self.place_roi(self.roi, self.rect, self.band)
+        for pin in self.pinned:
+            self.place_roi(pin["roi"], *pin["items"])
+
+    def place_roi(self, roi, rect, band=None, text=None):
+        x1, y1 = self.view.image_to_canvas(roi[0], roi[1])
+        x2, y2 = self.view.image_to_canvas(roi[2], roi[3])
+        self.canvas.coords(rect, x1, y1, x2, y2)
+        if text:
+            self.canvas.coords(text, x1 if band else min(x1, x2), y1 if band else min(y1, y2))
+
+        if band:
+            # Band edges: the line offset by +-width/2 along its normal
+            length = np.hypot(x2 - x1, y2 - y1)
+            if length > 0:
+                half = 0.5 * self.band_width() * self.view.scale
+                nx, ny = -(y2 - y1) / length * half, (x2 - x1) / length * half
+                self.canvas.coords(band, x1 + nx, y1 + ny, x2 + nx, y2 + ny, x2 - nx, y2 - ny, x1 - nx, y1 - ny)
+
+    def live_update(self):
+        self.live_job = None
+        bbox = self.get_roi_bbox()
+        if bbox or self.pinned:
+            self.analyze_image(bbox)
 
     def on_button_release(self, event):
-        if self.rect and self.image:
-            # Get coordinates
-            coords = self.canvas.coords(self.rect)
-            # Handle dragging in any direction (ensure x1<x2, y1<y2)
+        if self.live_job is not None:
+            self.after_cancel(self.live_job)
+            self.live_job = None
+
+        bbox = self.get_roi_bbox()
+        if bbox or self.pinned:
+            self.analyze_image(bbox)
+
+    def get_roi_bbox(self):
+        """Current rectangle in image coordinates, or None if there is nothing to analyze"""
+        return self.clamp_roi(self.roi)
+
+    def clamp_roi(self, coords):
+        """ROI clamped to the image (a sorted bbox, or line endpoints in Line mode), or None if empty"""
+        if not (coords and self.image):
+            return None
+
+        # Coordinates are already in image pixels, independent of zoom
+        if self.dir_var.get() == LINE:
+            # Line endpoints keep their order (it sets the profile direction), clamped to pixel centers
             x1, y1, x2, y2 = coords
-            bbox = [min(x1, x2), min(y1, y2), max(x1, x2), max(y1, y2)]
-            
-            # Clamp to image boundaries
-            bbox[0] = max(0, min(self.image.width, bbox[0]))
-            bbox[1] = max(0, min(self.image.height, bbox[1]))
-            bbox[2] = max(0, min(self.image.width, bbox[2]))
-            bbox[3] = max(0, min(self.image.height, bbox[3]))
-
-            # Avoid zero-size crashes
-            if bbox[2] > bbox[0] and bbox[3] > bbox[1]:
-                self.analyze_image(bbox)
+            x1, x2 = (max(0, min(self.image.width - 1, x)) for x in (x1, x2))
+            y1, y2 = (max(0, min(self.image.height - 1, y)) for y in (y1, y2))
+            if np.hypot(x2 - x1, y2 - y1) >= 1:
+                return [x1, y1, x2, y2]
+            return None
+
+        # Handle dragging in any direction (ensure x1<x2, y1<y2)
+        x1, y1, x2, y2 = coords
+        bbox = [min(x1, x2), min(y1, y2), max(x1, x2), max(y1, y2)]
+
+        # Clamp to image boundaries
+        bbox[0] = max(0, min(self.image.width, bbox[0]))
+        bbox[1] = max(0, min(self.image.height, bbox[1]))
+        bbox[2] = max(0, min(self.image.width, bbox[2]))
+        bbox[3] = max(0, min(self.image.height, bbox[3]))
+
+        # Avoid zero-size crashes
+        if bbox[2] > bbox[0] and bbox[3] > bbox[1]:
+            return bbox
+        return None
 
     def analyze_image(self, bbox):
-        # 1. Crop Image
-        cropped = self.image.crop(bbox)
         mode = self.mode_var.get()
         direction = self.dir_var.get()
 
-        # 2. Prepare Data
-        plot_dict = {} # Key: Label, Value: Data Array
-        
-        if mode == "Grayscale":
-            # Convert to Grayscale (L)
-            gray_img = cropped.convert("L")
-            img_array = np.array(gray_img)
-            
-            if direction == "Horizontal":
-                # Average columns (axis 0) -> 1D array along X
-                data = np.mean(img_array, axis=0)
-            else:
-                # Average rows (axis 1) -> 1D array along Y
-                data = np.mean(img_array, axis=1)
-            
-            plot_dict["Intensity"] = data
-            
-        else: # RGB Mode
-            # Ensure RGB
-            rgb_img = cropped.convert("RGB")
-            img_array = np.array(rgb_img)
-            
-            if direction == "Horizontal":
-                # Average down rows (axis 0), keeping 3 channels
-                # Result shape: (Width, 3)
-                means = np.mean(img_array, axis=0)
-            else:
-                # Average across columns (axis 1)
-                # Result shape: (Height, 3)
-                means = np.mean(img_array, axis=1)
-
-            plot_dict["Red"] = means[:, 0]
-            plot_dict["Green"] = means[:, 1]
-            plot_dict["Blue"] = means[:, 2]
-
-        # 3. Update Plot
-        self.update_plot(plot_dict, direction)
-
-    def update_plot(self, data_dict, direction):
-        # Clear previous plot
-        for widget in self.plot_frame.winfo_children():
-            widget.destroy()
-
-        # Create new Figure
-        self.plot_figure = plt.figure(figsize=(6, 3), dpi=100)
-        ax = self.plot_figure.add_subplot(111)
-
-        # Setup CSV Data Structure
-        # Get length from first dataset
-        first_key = next(iter(data_dict))
-        length = len(data_dict[first_key])
-        indices = np.arange(length)
-        
-        # Initialize rows for CSV: [ [0], [1], [2]... ]
-        csv_rows = [[i] for i in indices]
-        self.current_headers = ["Index"]
-
-        # Plot each line (Gray or R/G/B)
-        for label, values in data_dict.items():
-            # Assign standard colors
-            color = 'black'
-            if label == "Red": color = 'red'
-            elif label == "Green": color = 'green'
-            elif label == "Blue": color = 'blue'
-            
-            ax.plot(indices, values, label=label, color=color, linewidth=1)
-            
-            # Add to CSV structure
-            self.current_headers.append(label)
-            for i, val in enumerate(values):
-                csv_rows[i].append(val)
-
-        self.current_data = csv_rows
-
-        # Formatting
-        ax.set_title(f"Average Intensity ({direction} Profile)")
-        ax.set_xlabel("Pixel Position")
-        ax.set_ylabel("Avg Intensity (0-255)")
-        ax.grid(True, linestyle='--', alpha=0.6)
-        if len(data_dict) > 1:
-            ax.legend()
-
-        # Render to Tkinter
-        canvas = FigureCanvasTkAgg(self.plot_figure, master=self.plot_frame)
-        canvas.draw()
-        canvas.get_tk_widget().pack(fill=tk.BOTH, expand=True)
-        
+        # Named ROIs plus the active one, all profiled in one vectorized pass
+        named = [(pin["name"], self.clamp_roi(pin["roi"]), pin["color"]) for pin in self.pinned]
+        named = [item for item in named if item[1]]
+        if self.fft_window is not None and (bbox or named):
+            self.update_fft_panel(bbox or named[0][1], direction)
+        if named:
+            if bbox:
+                named.append(("Current", bbox, "red"))
+            self.analyze_rois(named, direction, mode)
+            return
+        if not bbox:
+            return
+
+        if direction == LINE:
+            # Bilinear samples along the line, averaged across the band
+            width = self.band_width()
+            distance, plot_dict = self.profile_cache.line_profile(bbox[:2], bbox[2:], width, mode)
+            if not plot_dict:
+                return
+            self.update_plot(plot_dict, f"{width} px Line", distance)
+            return
+
+        # Profiles come from the cached prefix sums: no crop, no conversion
+        # Grayscale -> {"Intensity"}, RGB -> {"Red", "Green", "Blue"}
+        plot_dict = self.profile_cache.profile(bbox, direction, mode)
+        if not plot_dict:
+            return
+
+        self.update_plot(plot_dict, direction, bbox=bbox)
+
+    def analyze_rois(self, named, direction, mode):
+        boxes = [bbox for _, bbox, _ in named]
+        if direction == LINE:
+            width = self.band_width()
+            results = self.profile_cache.line_profiles(boxes, width, mode)
+            title = f"{width} px Line"
+            x_header, x_label = "Distance (px)", "Distance Along Line (px)"
+        else:
+            dicts = self.profile_cache.profiles(boxes, direction, mode)
+            results = [(np.arange(len(next(iter(d.values())))) if d else None, d) for d in dicts]
+            title = direction
+            x_header, x_label = "Index", "Pixel Position"
+
+        # One plot line per ROI (and channel), overlaid
+        plot_dict, x, colors = {}, {}, {}
+        rows = []
+        use_wavelength = direction != LINE and self.wavelength_axis(named[0][1], direction, 0) is not None
+        for (name, bbox, color), (positions, data_dict) in zip(named, results):
+            if not data_dict:
+                continue
+            axis = self.wavelength_axis(bbox, direction, len(positions)) if use_wavelength else positions
+            for label, values in data_dict.items():
+                key = name if label == "Intensity" else f"{name} {label}"
+                plot_dict[key] = values
+                x[key] = axis
+                if label == "Intensity":
+                    colors[key] = color
+            rows.append((name, positions, axis, data_dict))
+        if not rows:
+            return
+
+        # Export as one long table: ROI, position, one column per channel
+        labels = list(rows[0][3])
+        self.current_headers = ["ROI", x_header] + labels
+        self.current_data = [np.concatenate([np.full(len(p), name) for name, p, _, _ in rows]),
+                             np.concatenate([p for _, p, _, _ in rows])]
+        if use_wavelength:
+            x_label = f"Wavelength ({self.wavelength_cal.unit})"
+            self.current_headers.insert(2, x_label)
+            self.current_data.append(np.concatenate([w for _, _, w, _ in rows]))
+        self.current_data += [np.concatenate([d[label] for _, _, _, d in rows]) for label in labels]
+
+        self.show_plot(plot_dict, f"Average Intensity ({title} Profile, {len(rows)} ROIs)", x, x_label, colors)
+
+    def show_plot(self, data_dict, title, x, x_label, colors=None):
+        if self.profile_plot is None:
+            self.profile_plot = ProfilePlot(self.plot_frame)
+            self.plot_figure = self.profile_plot.figure
+
+        # Lines are updated in place and blitted
+        self.profile_plot.set_labels(xlabel=x_label, ylabel=self.value_label)
+        self.profile_plot.update(data_dict, title, x, colors)
+
         # Enable Save Button
         self.save_button.config(state=tk.NORMAL)
 
+    def update_plot(self, data_dict, direction, positions=None, bbox=None):
+        wavelengths = None
+        if positions is None:
+            # Get length from first dataset
+            first_key = next(iter(data_dict))
+            length = len(data_dict[first_key])
+            positions = np.arange(length)
+            x_header, x_label = "Index", "Pixel Position"
+            wavelengths = self.wavelength_axis(bbox, direction, length)
+        else:
+            x_header, x_label = "Distance (px)", "Distance Along Line (px)"
+
+        # Export table: the profile arrays themselves, one column per label
+        self.current_headers = [x_header] + list(data_dict)
+        self.current_data = [positions] + list(data_dict.values())
+
+        x = positions
+        if wavelengths is not None:
+            # Calibrated spectrum: plot against wavelength, export both axes
+            x, x_label = wavelengths, f"Wavelength ({self.wavelength_cal.unit})"
+            self.current_headers.insert(1, x_label)
+            self.current_data.insert(1, wavelengths)
+
+        self.show_plot(data_dict, f"Average Intensity ({direction} Profile)", x, x_label)
+
+    # --- Fringe / FFT Panel ---
+    def open_fft_panel(self):
+        if self.fft_window is not None:
+            self.fft_window.lift()
+            return
+        self.fft_window = tk.Toplevel(self)
+        self.fft_window.title("Fringe / FFT Analysis")
+        self.fft_window.protocol("WM_DELETE_WINDOW", self.close_fft_panel)
+
+        self.fringe_label = tk.Label(self.fft_window, text="Draw an ROI across the fringes", anchor=tk.W, font=("Arial", 11))
+        self.fringe_label.pack(side=tk.TOP, fill=tk.X, padx=5, pady=5)
+
+        # 1D power spectrum of the intensity profile
+        self.fft_plot = ProfilePlot(self.fft_window, xlabel="Spatial Frequency (cycles/px)", ylabel="log10(1 + Power)")
+
+        # 2D power spectrum of the ROI crop (image artist updated in place)
+        self.fft2_figure = Figure(figsize=(4, 4), dpi=100)
+        self.fft2_ax = self.fft2_figure.add_subplot(111)
+        self.fft2_ax.set_xlabel("fx (cycles/px)")
+        self.fft2_ax.set_ylabel("fy (cycles/px)")
+        self.fft2_image = None
+        self.fft2_canvas = FigureCanvasTkAgg(self.fft2_figure, master=self.fft_window)
+        self.fft2_canvas.get_tk_widget().pack(fill=tk.BOTH, expand=True)
+
+        bbox = self.get_roi_bbox()
+        if bbox:
+            self.update_fft_panel(bbox, self.dir_var.get())
+
+    def close_fft_panel(self):
+        self.fft_window.destroy()
+        self.fft_window = None
+        self.fft_plot = None
+
+    def update_fft_panel(self, bbox, direction):
+        """Fringe metrics and spectra of one ROI's intensity"""
+        if direction == LINE:
+            _, profile = self.profile_cache.line_profile(bbox[:2], bbox[2:], self.band_width(), "Grayscale")
+            region = [min(bbox[0], bbox[2]), min(bbox[1], bbox[3]), max(bbox[0], bbox[2]) + 1, max(bbox[1], bbox[3]) + 1]
+        else:
+            profile = self.profile_cache.profile(bbox, direction, "Grayscale")
+            region = bbox
+        intensity = profile.get("Intensity")
+        if intensity is None or len(intensity) < 4:
+            return
+
+        metrics = fringe_metrics(intensity)
+        self.fringe_label.config(text=f"Spacing: {metrics['spacing']:.3f} px   "
+                                      f"Frequency: {metrics['frequency']:.5f} cycles/px   "
+                                      f"Contrast: {metrics['contrast']:.3f}   Phase: {metrics['phase']:.3f} rad")
+        freqs, power = power_spectrum(intensity)
+        self.fft_plot.update({"Intensity": np.log10(1 + power)}, f"Profile Spectrum ({direction})", freqs)
+
+        x1, y1, x2, y2 = bbox_to_indices(region, self.profile_cache.width, self.profile_cache.height)
+        crop = self.profile_cache.plane("Grayscale")[y1:y2, x1:x2]
+        if min(crop.shape) < 2:
+            return
+        spectrum, fx, fy = power_spectrum_2d(crop)
+        extent = (fx[0], fx[-1], fy[-1], fy[0])
+        if self.fft2_image is None:
+            self.fft2_image = self.fft2_ax.imshow(spectrum, cmap="magma", extent=extent, aspect="auto")
+        else:
+            self.fft2_image.set_data(spectrum)
+            self.fft2_image.set_extent(extent)
+        self.fft2_image.set_clim(spectrum.min(), spectrum.max())
+        self.fft2_ax.set_title(f"ROI Power Spectrum ({x2 - x1} x {y2 - y1} px)")
+        self.fft2_canvas.draw_idle()
+
     def save_csv(self):
         if not self.current_data:
             return
             
-        file_path = filedialog.asksaveasfilename(defaultextension=".csv", filetypes=[("CSV files", "*.csv")])
+        file_path = filedialog.asksaveasfilename(defaultextension=".csv", filetypes=save_filetypes())
         
         if file_path:
             try:
-                with open(file_path, mode='w', newline='') as file:
-                    writer = csv.writer(file)
-                    writer.writerow(self.current_headers)
-                    writer.writerows(self.current_data)
+                write_table(file_path, self.current_headers, self.current_data)
                 print(f"Saved data to {file_path}")
             except Exception as e:
-                print(f"Error saving CSV: {e}")
+                print(f"Error saving data: {e}")
 
 def main():
     root = tk.Tk()
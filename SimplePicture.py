@@ -4,6 +4,94 @@ from picamera import PiCamera
 from picamera.array import PiRGBArray
 import threading
 import time
+import queue
+from imagewriter import ImageWriterService
+
+# Camera settings shared by stills and live view
+STILL_RESOLUTION = (1024, 768)
+PREVIEW_SIZE = (320, 320)
+FRAMERATE = 24
+SHUTTER_SPEED = 500
+
+class CameraSession:
+    """
+    One long-lived PiCamera shared by live view and still capture.
+
+    A single thread owns the camera: it opens and warms it up once, then keeps
+    pulling preview frames from the video port (capture_continuous, resized on
+    the GPU). A still request is served between two preview frames from the
+    still port of the same camera, so a capture costs the port switch instead
+    of a full open/warm-up/close. Frames never touch Tk here: previews go to the
+    latest-value `frames` queue and stills to the `on_still(frame, tag)` callback.
+    """
+
+    def __init__(self, on_still, on_error=None):
+        self.on_still = on_still
+        self.on_error = on_error
+        self.frames = queue.Queue(maxsize=1)
+        self.live = False
+        self.ready = False
+        self._requests = queue.Queue()
+        self._closing = False
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    @property
+    def alive(self):
+        return self._thread.is_alive()
+
+    def capture(self, tag=None):
+        """Queues a still capture; on_still(frame, tag) is called from the camera thread"""
+        self._requests.put(tag)
+
+    def close(self):
+        self._closing = True
+        self._requests.put(None) # Wake the idle wait
+        self._thread.join(timeout=5)
+
+    def _run(self):
+        """Camera Thread: owns the PiCamera for the whole session"""
+        try:
+            with PiCamera(resolution=STILL_RESOLUTION, framerate=FRAMERATE) as camera:
+                camera.exposure_mode = 'off'
+                camera.shutter_speed = SHUTTER_SPEED
+                # Warm up once per session, not once per action
+                time.sleep(2)
+                self.ready = True
+
+                preview = PiRGBArray(camera, size=PREVIEW_SIZE)
+                still = PiRGBArray(camera)
+                for _ in camera.capture_continuous(preview, format="rgb", use_video_port=True, resize=PREVIEW_SIZE):
+                    if self._closing:
+                        break
+                    if self.live:
+                        self._put_latest(preview.array)
+                    preview.truncate(0)
+
+                    # Stills between preview frames; when live view is off, idle here
+                    try:
+                        tag = self._requests.get_nowait() if self.live else self._requests.get(timeout=0.1)
+                    except queue.Empty:
+                        continue
+                    if self._closing:
+                        break
+                    still.truncate(0)
+                    camera.capture(still, format="rgb")
+                    self.on_still(still.array, tag)
+        except Exception as e:
+            if self.on_error:
+                self.on_error(e)
+        finally:
+            self.ready = False
+
+    def _put_latest(self, frame):
+        # Drop the previous preview if Tk has not shown it yet
+        if self.frames.full():
+            try:
+                self.frames.get_nowait()
+            except queue.Empty:
+                pass
+        self.frames.put(frame)
 
 class SimpleCameraApp(tk.Frame):
     def __init__(self, master=None):
@@ -12,6 +100,18 @@ class SimpleCameraApp(tk.Frame):
         self.pack()
         self.create_widgets()
         self.live_view_running = False
+        self.live_photo = None # PhotoImage reused for every live frame
+
+        # Captures are encoded/written in the background; results come back through a queue
+        self.writer = ImageWriterService(on_done=self.on_image_written)
+        self.capture_results = queue.Queue()
+        self.poll_capture_results()
+
+        # One camera for the whole session (opens and warms up in the background)
+        self.session = CameraSession(on_still=self.on_still, on_error=lambda e: self.capture_results.put(("error", e)))
+        self.poll_live_frames()
+        # Closing the window releases the camera too, not only the QUIT button
+        self.master.protocol("WM_DELETE_WINDOW", self.quit_app)
 
     def create_widgets(self):
         self.file_name_var = tk.StringVar(value='image.jpg')  # default filename
@@ -24,7 +124,7 @@ class SimpleCameraApp(tk.Frame):
         self.live_view_button = tk.Button(self, text="Live View", command=self.toggle_live_view)
         self.live_view_button.pack(pady=5)
 
-        self.quit_button = tk.Button(self, text="QUIT", command=self.master.destroy)
+        self.quit_button = tk.Button(self, text="QUIT", command=self.quit_app)
         self.quit_button.pack(pady=5)
 
         self.image_label = tk.Label(self)  # This label will hold the image display
@@ -32,12 +132,45 @@ class SimpleCameraApp(tk.Frame):
 
     def capture_image(self):
         file_name = self.file_name_var.get() or 'image.jpg'  # Preventing an empty file name
-        with PiCamera() as camera:
-            camera.resolution = (1024, 768)
-            camera.exposure_mode = 'off'
-            camera.shutter_speed = 500
-            camera.capture(file_name)
-            self.display_image(file_name)
+        if not self.session.alive:
+            print("An error occurred: camera session is not running")
+            return
+        # The session's camera thread takes the still; the window stays responsive
+        self.capture_button.config(state=tk.DISABLED)
+        self.session.capture(file_name)
+
+    def on_still(self, frame, file_name):
+        """Camera Thread: hands a captured still to the writer and the display"""
+        if self.writer.submit(frame, file_name) is None:
+            self.capture_results.put(("error", f"Disk busy, capture not saved ({self.writer.pending} pending)"))
+        self.capture_results.put(("frame", frame))
+
+    def on_image_written(self, path, error):
+        """Writer Thread: report failures on the Tk thread"""
+        if error:
+            self.capture_results.put(("error", f"Could not save {path}: {error}"))
+
+    def poll_capture_results(self):
+        """Main Thread: shows finished captures"""
+        try:
+            while True:
+                kind, value = self.capture_results.get_nowait()
+                if kind == "frame":
+                    self.display_array(value)
+                    self.capture_button.config(state=tk.NORMAL)
+                else:
+                    print(f"An error occurred: {value}")
+                    self.capture_button.config(state=tk.NORMAL)
+        except queue.Empty:
+            pass
+        self.after(50, self.poll_capture_results)
+
+    def display_array(self, frame):
+        photo = ImageTk.PhotoImage(Image.fromarray(frame))
+        self.live_photo = None # Live view re-attaches its own image on the next frame
+
+        self.image_label.config(image=photo)
+        self.image_label.image = photo
 
     def display_image(self, image_path):
         image = Image.open(image_path)
@@ -48,47 +181,33 @@ class SimpleCameraApp(tk.Frame):
 
     def toggle_live_view(self):
         self.live_view_running = not self.live_view_running
+        self.session.live = self.live_view_running
         if self.live_view_running:
             self.live_view_button.config(text="Stop Live View")
-            threading.Thread(target=self.live_camera_view).start()
         else:
             self.live_view_button.config(text="Live View")
+            self.live_photo = None
 
-    def live_camera_view(self):
+    def poll_live_frames(self):
+        """Main Thread: shows the latest live frame from the session"""
         try:
-            # Initialize the camera
-
-            with PiCamera() as camera:
-                camera.resolution = (320, 320)
-                camera.framerate = 24  # You can adjust the framerate
-                raw_capture = PiRGBArray(camera, size=(320, 320))
-                camera.exposure_mode = 'off'
-                camera.shutter_speed = 500
-
-                # Allow the camera to warm up
-                time.sleep(2)
-
-                # Capture continuously, and display the frames in the Tkinter label
-                for frame in camera.capture_continuous(raw_capture, format="bgr", use_video_port=True):
-                    if not self.live_view_running:
-                        break  # If the 'Stop Live View' button is clicked, close the camera view
-
-                    # Clear the stream for the next frame
-                    raw_capture.truncate(0)
-
-                    # Convert the image to PIL format
-                    image = Image.fromarray(frame.array)
-
-                    # Convert the image from PIL format to ImageTk format
-                    imgtk = ImageTk.PhotoImage(image=image)
-
-                    # Update the label with the current frame
-                    # This operation should be thread-safe, as we're not directly interacting with Tkinter's main loop
-                    self.image_label.config(image=imgtk)
-                    self.image_label.image = imgtk
-
-        except Exception as e:
-            print(f"An error occurred: {e}")
+            frame = self.session.frames.get_nowait()
+            if self.live_view_running:
+                image = Image.fromarray(frame)
+                if self.live_photo is None:
+                    self.live_photo = ImageTk.PhotoImage(image=image)
+                    self.image_label.config(image=self.live_photo)
+                    self.image_label.image = self.live_photo
+                else:
+                    # Copy pixels into the existing Tk image instead of creating a new one
+                    self.live_photo.paste(image)
+        except queue.Empty:
+            pass
+        self.after(15, self.poll_live_frames)
+
+    def quit_app(self):
+        self.session.close()
+        self.master.destroy()
 
 def main():
     root = tk.Tk()
@@ -96,6 +215,7 @@ def main():
     root.title("Simple Camera App")  # Set the title of the window
     app = SimpleCameraApp(master=root)
     app.mainloop()
+    app.writer.close() # Finish writing queued captures
 
 if __name__ == "__main__":
     main()
@@ -6,53 +6,203 @@ import threading
 import time
 import sys
 import queue
+import numpy as np
+from burst import BurstWriter
+from imagewriter import ImageWriterService
+from profiles import roi_profile, profile_origin
+from profileio import save_filetypes, write_table
+from profileplot import ProfilePlot
+from framestack import FrameStacker
+from calibration import Calibration, MasterFrameBuilder
+from spectral import PeakTracker, WavelengthCalibration, peak_centers
+from beamprofile import BeamLog, BeamProfiler, curve_fit
+from rawimage import bayer_order, bayer_to_rgb, unpack_raw
+from kymograph import KymographDisplay, KymographWriter
+from pipelinestats import PipelineStats
+
+# Preview size on screen; frames are scaled to this in the capture thread
+DISPLAY_SIZE = (800, 600)
+
+# Kymograph window size and redraw interval (seconds)
+KYMO_SIZE = (640, 480)
+KYMO_REFRESH = 0.2
+
+# Pipeline statistics overlay refresh interval (seconds)
+STATS_REFRESH = 0.5
+
+# Stacking menu entries -> FrameStacker modes
+STACK_MODES = {"Off": None, "Running mean": "mean", "EMA": "ema"}
 
 class CameraApp:
     def __init__(self, window, window_title):
         self.window = window
         self.window.title(window_title)
-        self.window.geometry("900x800")
+        self.window.geometry("900x950")
+
+        self.init_state()
 
+        # 1. Setup UI first
+        self.setup_ui()
+        # Closing the window finishes snapshots and logs and releases the camera
+        self.window.protocol("WM_DELETE_WINDOW", self.on_close)
+
+        # 2. Initialize Camera in the background
+        # Hardware setup takes 20-40 seconds on the Pi 4, so it runs on a worker
+        # thread. The worker never touches Tk: it reports through ui_queue, which
+        # the main thread drains in poll_ui_queue.
+        self.camera_ready = False
+        self.status_update("Initializing Hardware...", "orange")
+        threading.Thread(target=self.init_camera_worker, daemon=True).start()
+        self.poll_ui_queue()
+
+    def init_state(self):
+        """Pipeline state shared by the capture thread and the GUI (no widgets, so benchmarks can run it headless)"""
         # Thread communication
+        self.ui_queue = queue.Queue()
         self.frame_queue = queue.Queue(maxsize=1)
         self.is_running = False
         self.camera_thread = None
-        self.current_raw_image = None # Holds the image for saving
+        self.current_raw_frame = None # Latest frame for saving; published by the capture thread, never written again
+        self.preview_photo = None # Single PhotoImage reused for every preview frame
+        self.burst_request = None # (path, frames, seconds) handed to the capture thread
+        self.burst_writer = None # Active BurstWriter, owned by the capture thread
+        self.burst_limits = None # (frames, seconds) of the active burst
+        self.burst_started = None
+        self.full_res = False # Save from the still configuration instead of the preview stream
+        self.still_request = None # Output path of a full-resolution save, handed to the capture thread
 
-        # 1. Setup UI first
-        self.setup_ui()
+        # Live ROI profile: settings are mirrored into plain attributes so the
+        # capture thread never reads Tk variables
+        self.profile_queue = queue.Queue(maxsize=1)
+        self.live_roi = None # (x1, y1, x2, y2) as fractions of the frame, set by the GUI
+        self.live_settings = (False, "Horizontal", "Grayscale") # (enabled, direction, mode)
+        self.roi_start = None
+        self.roi_rect = None
+        self.plot_window = None
+        self.live_plot = None
 
-        # 2. Initialize Camera (BLOCKING)
-        # We reverted to the blocking method because it is more stable on the Pi 4.
-        # The GUI will freeze for 20-40 seconds here. This is expected.
-        self.status_update("Initializing Hardware (GUI may freeze for 30s)...", "orange")
-        self.window.update() # Force the label to appear before we freeze
+        # Spectrometer: pixel -> wavelength map and line-center tracking on live profiles
+        self.wavelength_cal = None
+        self.track_peaks = False
+        self.peak_tracker = PeakTracker() # Replaced (not reset) by the GUI, used by the capture thread
 
+        # Beam profiling: (enabled, gaussian fit) mirrored from the UI, profiler owned by the capture thread
+        self.beam_queue = queue.Queue(maxsize=1)
+        self.beam_settings = (False, False)
+        self.beam_profiler = None
+        self.beam_log = None # Active BeamLog, appended to by the capture thread
+        self.beam_items = None # Canvas overlay (ellipse, window, text), created on first result
+
+        # Kymograph: live profiles appended to disk, latest rows shown as a scrolling image
+        self.kymo_request = None # Output path handed to the capture thread
+        self.kymo_writer = None # Active KymographWriter, appended to by the capture thread
+        self.kymo_display = None # KymographDisplay ring, filled by the capture thread
+        self.kymo_lock = threading.Lock() # Guards the request -> writer handover against Stop
+        self.kymo_shown = 0 # Display rows already drawn by the GUI
+        self.kymo_window = None
+        self.kymo_photo = None
+        self.kymo_drawn = 0.0
+
+        # Frame stacking: (mode, frames) mirrored from the UI, stacker owned by the capture thread
+        self.stack_settings = (None, 10)
+        self.stacker = None
+
+        # Dark/flat calibration: masters are averaged in the capture thread
+        self.calibration = None # Active Calibration (replaced as a whole, never mutated)
+        self.master_dark = None
+        self.master_flat = None
+        self.master_builder = None # MasterFrameBuilder being filled by the capture thread
+        self.apply_calibration = False
+
+        # Raw mode: unpacked 10/12-bit sensor data as uint16 for saving and analysis
+        self.raw_mode = False
+        self.raw_config = None # Stream configuration with an unpacked raw stream (None if unsupported)
+        self.capture_config = None # Full sensor resolution still configuration for Save
+        self.raw_size = None
+        self.raw_bayer = None # Bayer order ("RGGB", ...) or None for mono sensors
+        self.raw_info = None # Layout saved with raw snapshots ({"bayer": ..., "bits": ...})
+        self.active_config = None
+
+        # Pipeline instrumentation: stage timings and frame counters, always collected
+        self.stats = PipelineStats()
+        self.stats_overlay = False
+        self.stats_drawn = 0.0
+
+        # Snapshots are encoded and written on background threads
+        self.writer = ImageWriterService(on_done=self.on_image_written)
+
+    def init_camera_worker(self):
+        """Background Thread: Opens and configures the camera"""
         try:
-            self.picam2 = Picamera2()
+            self.ui_queue.put(("status", "Initializing Hardware: opening camera...", "orange"))
+            picam2 = Picamera2()
+
+            # Build the configurations up front so switching modes later is cheap
+            self.ui_queue.put(("status", "Initializing Hardware: configuring streams...", "orange"))
             # RGB888 is easier for Tkinter/PIL to handle than YUV
-            config = self.picam2.create_preview_configuration(main={"size": (640, 480), "format": "RGB888"})
-            self.picam2.configure(config)
-            self.picam2.start() # Warmup
-            self.picam2.stop()
-            
-            self.camera_ready = True
-            self.status_update("System Ready. Press Start.", "green")
-            self.btn_start.config(state=tk.NORMAL)
-            
+            self.stream_config = picam2.create_preview_configuration(main={"size": (640, 480), "format": "RGB888"})
+            self.capture_config = picam2.create_still_configuration(main={"format": "RGB888"})
+            try:
+                # Deepest full-size sensor mode, unpacked (one uint16 per pixel)
+                mode = max(picam2.sensor_modes, key=lambda m: (m["bit_depth"], m["size"][0] * m["size"][1]))
+                self.raw_config = picam2.create_preview_configuration(main={"size": (640, 480), "format": "RGB888"},
+                                                                      raw={"format": mode["unpacked"], "size": mode["size"]})
+                self.raw_size = mode["size"]
+                self.raw_bayer = bayer_order(mode["unpacked"])
+                self.raw_bits = mode["bit_depth"]
+                self.raw_info = {"bayer": self.raw_bayer, "bits": self.raw_bits}
+            except Exception as e:
+                print(f"Raw mode unavailable: {e}")
+            picam2.configure(self.stream_config)
+            self.active_config = self.stream_config
+
+            self.ui_queue.put(("status", "Initializing Hardware: warming up sensor...", "orange"))
+            picam2.start() # Warmup
+            picam2.stop()
+
+            self.picam2 = picam2
+            self.ui_queue.put(("ready",))
+
         except Exception as e:
-            self.camera_ready = False
-            self.status_update(f"Camera Error: {e}", "red")
-            print(f"Detailed Error: {e}")
+            self.ui_queue.put(("error", e))
+
+    def poll_ui_queue(self):
+        """Main Thread: Applies messages posted by background threads"""
+        try:
+            while True:
+                message = self.ui_queue.get_nowait()
+                if message[0] == "status":
+                    self.status_update(message[1], message[2])
+                elif message[0] == "ready":
+                    self.camera_ready = True
+                    self.status_update("System Ready. Press Start.", "green")
+                    self.btn_start.config(state=tk.NORMAL)
+                elif message[0] == "master":
+                    self.set_master(message[1], message[2])
+                elif message[0] == "error":
+                    self.camera_ready = False
+                    self.status_update(f"Camera Error: {message[1]}", "red")
+                    print(f"Detailed Error: {message[1]}")
+        except queue.Empty:
+            pass
+
+        self.window.after(100, self.poll_ui_queue)
 
     def setup_ui(self):
         # Header
         self.label_title = Label(self.window, text="Raspberry Pi Optic Lab", font=("Arial", 20, "bold"))
         self.label_title.pack(pady=10)
 
-        # Video Area
-        self.video_label = Label(self.window, text="[ Camera Standby ]", bg="#222", fg="#888", width=110, height=30)
-        self.video_label.pack(pady=10, fill=tk.BOTH, expand=True)
+        # Video Area (a Canvas so the ROI can be drawn over the preview)
+        self.video_canvas = tk.Canvas(self.window, bg="#222", width=DISPLAY_SIZE[0], height=DISPLAY_SIZE[1], highlightthickness=0)
+        self.video_canvas.pack(pady=10)
+        self.video_item = self.video_canvas.create_image(0, 0, anchor="nw")
+        self.standby_text = self.video_canvas.create_text(DISPLAY_SIZE[0] // 2, DISPLAY_SIZE[1] // 2, text="[ Camera Standby ]", fill="#888")
+
+        # ROI drawing
+        self.video_canvas.bind("<ButtonPress-1>", self.on_roi_press)
+        self.video_canvas.bind("<B1-Motion>", self.on_roi_move)
+        self.video_canvas.bind("<ButtonRelease-1>", self.on_roi_release)
 
         # Buttons
         self.btn_frame = tk.Frame(self.window)
@@ -66,11 +216,116 @@ class CameraApp:
 
         # SAVE BUTTON: Green to make it obvious
         self.btn_save = Button(self.btn_frame, text="Save Image", font=("Arial", 12, "bold"), width=12, bg="#aaffaa", command=self.save_image, state=tk.DISABLED)
-        self.btn_save.pack(side=tk.LEFT, padx=20)
+        self.btn_save.pack(side=tk.LEFT, padx=(20, 5))
+
+        self.btn_save_as = Button(self.btn_frame, text="Save As...", font=("Arial", 12), width=10, bg="#dddddd", command=self.save_image_as, state=tk.DISABLED)
+        self.btn_save_as.pack(side=tk.LEFT, padx=5)
+
+        # Auto-naming for quick saves
+        self.naming_var = tk.StringVar(value="timestamp")
+        tk.OptionMenu(self.btn_frame, self.naming_var, "timestamp", "sequence",
+                      command=lambda value: setattr(self.writer, "naming", value)).pack(side=tk.LEFT, padx=5)
+
+        # Full-resolution saves: one frame from the still configuration (8-bit mode)
+        self.full_res_var = tk.BooleanVar(value=False)
+        tk.Checkbutton(self.btn_frame, text="Full Res", variable=self.full_res_var,
+                       command=lambda: setattr(self, "full_res", self.full_res_var.get())).pack(side=tk.LEFT, padx=5)
+
+        # Raw mode: sensor data at full bit depth (switch while stopped)
+        self.raw_var = tk.BooleanVar(value=False)
+        self.raw_check = tk.Checkbutton(self.btn_frame, text="Raw 16-bit", variable=self.raw_var, command=self.on_raw_mode)
+        self.raw_check.pack(side=tk.LEFT, padx=5)
+
+        # Burst Recording: raw frames straight into an on-disk ring buffer
+        self.burst_frame = tk.Frame(self.window)
+        self.burst_frame.pack(pady=5)
+
+        Label(self.burst_frame, text="Burst frames:").pack(side=tk.LEFT)
+        self.burst_frames_var = tk.IntVar(value=100)
+        tk.Entry(self.burst_frame, textvariable=self.burst_frames_var, width=6).pack(side=tk.LEFT, padx=5)
+
+        Label(self.burst_frame, text="Seconds (0 = until full):").pack(side=tk.LEFT)
+        self.burst_seconds_var = tk.DoubleVar(value=0)
+        tk.Entry(self.burst_frame, textvariable=self.burst_seconds_var, width=6).pack(side=tk.LEFT, padx=5)
+
+        self.btn_burst = Button(self.burst_frame, text="Record Burst", width=12, bg="#ffcccc", command=self.record_burst, state=tk.DISABLED)
+        self.btn_burst.pack(side=tk.LEFT, padx=10)
+
+        # Pipeline statistics: overlay above the status bar and export
+        Label(self.burst_frame, text="|").pack(side=tk.LEFT)
+        self.stats_var = tk.BooleanVar(value=False)
+        tk.Checkbutton(self.burst_frame, text="Pipeline Stats", variable=self.stats_var, command=self.on_stats_overlay).pack(side=tk.LEFT, padx=5)
+        Button(self.burst_frame, text="Save Stats...", command=self.save_stats).pack(side=tk.LEFT, padx=5)
+
+        # Live Analysis: profile of the ROI on every frame
+        self.analysis_frame = tk.Frame(self.window)
+        self.analysis_frame.pack(pady=5)
+
+        self.live_profile_var = tk.BooleanVar(value=False)
+        tk.Checkbutton(self.analysis_frame, text="Live Profile (drag an ROI on the preview)", variable=self.live_profile_var).pack(side=tk.LEFT, padx=5)
+        self.dir_var = tk.StringVar(value="Horizontal")
+        tk.Radiobutton(self.analysis_frame, text="Horizontal (X)", variable=self.dir_var, value="Horizontal").pack(side=tk.LEFT)
+        tk.Radiobutton(self.analysis_frame, text="Vertical (Y)", variable=self.dir_var, value="Vertical").pack(side=tk.LEFT)
+        self.mode_var = tk.StringVar(value="Grayscale")
+        tk.Radiobutton(self.analysis_frame, text="Intensity", variable=self.mode_var, value="Grayscale").pack(side=tk.LEFT, padx=(10, 0))
+        tk.Radiobutton(self.analysis_frame, text="RGB", variable=self.mode_var, value="RGB").pack(side=tk.LEFT)
+        for var in (self.live_profile_var, self.dir_var, self.mode_var):
+            var.trace_add("write", self.on_live_settings)
+        self.track_peaks_var = tk.BooleanVar(value=False)
+        tk.Checkbutton(self.analysis_frame, text="Track Peaks", variable=self.track_peaks_var,
+                       command=self.on_track_peaks).pack(side=tk.LEFT, padx=5)
+
+        # Stacking: running average to beat sensor noise at short exposures
+        Label(self.analysis_frame, text="|  Stacking:").pack(side=tk.LEFT, padx=(10, 0))
+        self.stack_mode_var = tk.StringVar(value="Off")
+        tk.OptionMenu(self.analysis_frame, self.stack_mode_var, *STACK_MODES).pack(side=tk.LEFT)
+        self.stack_frames_var = tk.IntVar(value=10)
+        tk.Entry(self.analysis_frame, textvariable=self.stack_frames_var, width=4).pack(side=tk.LEFT)
+        Label(self.analysis_frame, text="frames").pack(side=tk.LEFT)
+        for var in (self.stack_mode_var, self.stack_frames_var):
+            var.trace_add("write", self.on_stack_settings)
+
+        # Beam Profiler: centroid, D4s widths and an auto-tracking window on every frame
+        self.beam_frame = tk.Frame(self.window)
+        self.beam_frame.pack(pady=5)
+
+        self.beam_var = tk.BooleanVar(value=False)
+        tk.Checkbutton(self.beam_frame, text="Beam Profiler", variable=self.beam_var).pack(side=tk.LEFT, padx=5)
+        self.beam_fit_var = tk.BooleanVar(value=False)
+        tk.Checkbutton(self.beam_frame, text="Gaussian Fit" if curve_fit else "Gaussian Fit (needs scipy)", variable=self.beam_fit_var,
+                       state=tk.NORMAL if curve_fit else tk.DISABLED).pack(side=tk.LEFT, padx=5)
+        for var in (self.beam_var, self.beam_fit_var):
+            var.trace_add("write", self.on_beam_settings)
+        self.btn_beam_log = Button(self.beam_frame, text="Start Log...", command=self.toggle_beam_log)
+        self.btn_beam_log.pack(side=tk.LEFT, padx=10)
+
+        # Kymograph: the ROI profile of every frame over time
+        Label(self.beam_frame, text="|  Kymograph:").pack(side=tk.LEFT, padx=(10, 0))
+        self.btn_kymo = Button(self.beam_frame, text="Record...", command=self.toggle_kymograph)
+        self.btn_kymo.pack(side=tk.LEFT, padx=5)
+
+        # Calibration: master dark/flat frames, corrected per frame
+        self.cal_frame = tk.Frame(self.window)
+        self.cal_frame.pack(pady=5)
+
+        Label(self.cal_frame, text="Calibration frames:").pack(side=tk.LEFT)
+        self.cal_count_var = tk.IntVar(value=32)
+        tk.Entry(self.cal_frame, textvariable=self.cal_count_var, width=4).pack(side=tk.LEFT, padx=5)
+        self.btn_dark = Button(self.cal_frame, text="Capture Dark", command=lambda: self.capture_master("dark"), state=tk.DISABLED)
+        self.btn_dark.pack(side=tk.LEFT, padx=2)
+        self.btn_flat = Button(self.cal_frame, text="Capture Flat", command=lambda: self.capture_master("flat"), state=tk.DISABLED)
+        self.btn_flat.pack(side=tk.LEFT, padx=2)
+        Button(self.cal_frame, text="Save Cal...", command=self.save_calibration).pack(side=tk.LEFT, padx=2)
+        Button(self.cal_frame, text="Load Cal...", command=self.load_calibration).pack(side=tk.LEFT, padx=2)
+        self.apply_cal_var = tk.BooleanVar(value=False)
+        tk.Checkbutton(self.cal_frame, text="Apply", variable=self.apply_cal_var,
+                       command=lambda: setattr(self, "apply_calibration", self.apply_cal_var.get())).pack(side=tk.LEFT, padx=5)
+        Button(self.cal_frame, text="Load \u03bb Cal...", command=self.load_wavelength_cal).pack(side=tk.LEFT, padx=(10, 2))
 
         # Status Bar
         self.status_label = Label(self.window, text="Booting...", bd=1, relief=tk.SUNKEN, anchor=tk.W)
         self.status_label.pack(side=tk.BOTTOM, fill=tk.X)
+        self.stats_label = Label(self.window, text="", bd=1, relief=tk.SUNKEN, anchor=tk.W, font=("Courier", 9))
 
     def status_update(self, msg, color="black"):
         self.status_label.config(text=msg, fg=color)
@@ -82,12 +337,22 @@ class CameraApp:
 
         if not self.is_running:
             self.status_update("Starting Stream...", "blue")
+            config = self.raw_config if self.raw_mode else self.stream_config
+            if config is not self.active_config:
+                self.picam2.configure(config)
+                self.active_config = config
             self.picam2.start()
             self.is_running = True
+            self.stats.reset()
             
             self.btn_start.config(state=tk.DISABLED)
             self.btn_stop.config(state=tk.NORMAL)
             self.btn_save.config(state=tk.NORMAL)
+            self.btn_save_as.config(state=tk.NORMAL)
+            self.btn_burst.config(state=tk.NORMAL)
+            self.btn_dark.config(state=tk.NORMAL)
+            self.btn_flat.config(state=tk.NORMAL)
+            self.raw_check.config(state=tk.DISABLED)
 
             # Start the background capture thread
             self.camera_thread = threading.Thread(target=self.capture_loop, daemon=True)
@@ -110,84 +375,701 @@ class CameraApp:
         except:
             pass
         
-        self.video_label.config(image='', text="[ Camera Standby ]", bg="#222")
+        self.video_canvas.itemconfig(self.video_item, image='')
+        self.video_canvas.itemconfig(self.standby_text, state=tk.NORMAL)
+        self.preview_photo = None
         self.btn_start.config(state=tk.NORMAL)
         self.btn_stop.config(state=tk.DISABLED)
         self.btn_save.config(state=tk.DISABLED)
+        self.btn_save_as.config(state=tk.DISABLED)
+        self.btn_burst.config(state=tk.DISABLED)
+        self.btn_dark.config(state=tk.DISABLED)
+        self.btn_flat.config(state=tk.DISABLED)
+        self.raw_check.config(state=tk.NORMAL)
+        self.still_request = None # Not picked up before the stop
         self.status_update("Camera Stopped.", "black")
 
     def save_image(self):
-        """Saves the current frame using a file dialog"""
-        if self.current_raw_image is None:
+        """Queues the current frame for the background writer under an automatic name"""
+        if self.current_raw_frame is None:
             self.status_update("No image data to save!", "red")
             return
+        if self.full_res and not self.raw_mode:
+            self.request_still()
+        else:
+            self.queue_snapshot(self.current_raw_frame)
 
-        # Note: The preview will freeze while this dialog is open. 
-        # This is normal behavior for a simple GUI. 
-        # The camera hardware stays on, and it resumes immediately after saving.
+    def save_image_as(self):
+        """Saves the current frame to a path chosen in a file dialog"""
+        # Grab the frame first: the dialog is modal, the camera keeps streaming
+        if self.current_raw_frame is None:
+            self.status_update("No image data to save!", "red")
+            return
+        frame = self.current_raw_frame
+
+        if self.raw_mode:
+            # Raw sensor data: lossless containers only
+            defaultextension, filetypes = ".npy", [("NumPy array", "*.npy"), ("16-bit TIFF", "*.tif")]
+        else:
+            defaultextension, filetypes = ".png", [("PNG files", "*.png"), ("JPEG files", "*.jpg"), ("All files", "*.*")]
         filepath = filedialog.asksaveasfilename(
-            defaultextension=".png",
-            filetypes=[("PNG files", "*.png"), ("JPEG files", "*.jpg"), ("All files", "*.*")],
+            defaultextension=defaultextension,
+            filetypes=filetypes,
             title="Save Snapshot"
         )
+        if not filepath:
+            return
+        if self.full_res and not self.raw_mode:
+            # Captured after the dialog closes: the still is the frame after the click
+            self.request_still(filepath)
+        else:
+            self.queue_snapshot(frame, filepath)
+
+    def request_still(self, filepath=None):
+        """Asks the capture thread for one frame from the full-resolution still configuration"""
+        if self.still_request is not None:
+            self.status_update("A full-resolution save is already pending", "orange")
+            return
+        path = filepath or self.writer.next_path()
+        self.still_request = path
+        self.status_update(f"Capturing full resolution: {path}...", "blue")
+
+    def capture_still(self):
+        """Capture Thread: switches to the still configuration for one frame and queues it for the writer"""
+        path = self.still_request
+        self.still_request = None
+        try:
+            # Picamera2 switches back to the stream configuration after the capture.
+            # The still is saved as captured: dark/flat masters and stacking are preview-sized
+            frame = self.picam2.switch_mode_and_capture_array(self.capture_config)
+        except Exception as e:
+            self.ui_queue.put(("status", f"Full-resolution capture failed: {e}", "red"))
+            return
+        if self.writer.submit(frame, path) is None:
+            self.ui_queue.put(("status", f"Disk busy: snapshot dropped ({self.writer.pending} pending, {self.writer.dropped} dropped)", "red"))
+        else:
+            self.ui_queue.put(("status", f"Saving: {path} ({frame.shape[1]}x{frame.shape[0]})", "blue"))
+
+    def queue_snapshot(self, frame, filepath=None):
+        # Encoding and disk I/O happen on the writer threads; the preview keeps running
+        # Raw mosaics carry their Bayer layout, so the analyzer bins them like the live path does
+        queued = self.writer.submit(frame, filepath, self.raw_info if self.raw_mode else None)
+        if queued is None:
+            self.status_update(f"Disk busy: snapshot dropped ({self.writer.pending} pending, {self.writer.dropped} dropped)", "red")
+        else:
+            self.status_update(f"Saving: {queued}", "blue")
+
+    def on_image_written(self, path, error):
+        """Writer Thread: reports the result through the UI queue"""
+        if error:
+            self.ui_queue.put(("status", f"Save Failed: {error}", "red"))
+        else:
+            self.ui_queue.put(("status", f"Saved: {path} ({self.writer.pending} pending)", "green"))
+
+    def record_burst(self):
+        """Asks the capture thread to record the next frames into a burst file"""
+        try:
+            frames = self.burst_frames_var.get()
+            seconds = self.burst_seconds_var.get()
+        except tk.TclError:
+            self.status_update("Burst settings must be numbers", "red")
+            return
+        if frames < 1 or seconds < 0:
+            self.status_update("Burst needs at least 1 frame", "red")
+            return
+        if self.burst_writer is not None or self.burst_request is not None:
+            self.status_update("A burst is already recording", "orange")
+            return
+
+        # Auto-named so no dialog interrupts the stream
+        path = time.strftime("burst_%Y%m%d_%H%M%S.burst")
+        self.burst_request = (path, frames, seconds)
+        self.status_update(f"Recording burst to {path}...", "blue")
+
+    def start_burst(self, frame):
+        """Capture Thread: creates the ring buffer once the frame shape is known"""
+        path, frames, seconds = self.burst_request
+        self.burst_request = None
+        try:
+            bayer = self.raw_bayer if self.raw_mode else None
+            self.burst_writer = BurstWriter(path, frame.shape, frame.dtype, frames, bayer)
+            self.burst_limits = (frames, seconds)
+            self.burst_started = time.time()
+        except Exception as e:
+            self.ui_queue.put(("status", f"Burst Failed: {e}", "red"))
+
+    def finish_burst(self):
+        """Capture Thread: flushes the burst and reports back to the UI"""
+        writer = self.burst_writer
+        self.burst_writer = None
+        writer.close()
+        kept = min(writer.frames_written, writer.capacity)
+        elapsed = max(time.time() - self.burst_started, 1e-6)
+        self.ui_queue.put(("status", f"Burst saved: {writer.path} ({kept} frames, {writer.frames_written / elapsed:.1f} fps)", "green"))
+
+    def on_raw_mode(self):
+        """Main Thread: raw mode takes effect on the next Start"""
+        if self.raw_var.get() and self.raw_config is None:
+            self.raw_var.set(False)
+            self.status_update("This camera offers no unpacked raw mode", "red")
+            return
+        self.raw_mode = self.raw_var.get()
+        # Quick saves keep the raw data exactly
+        self.writer.extension = ".npy" if self.raw_mode else ".png"
+        if self.raw_mode:
+            # Saved files keep the full mosaic; analysis and dark/flat/wavelength
+            # calibrations use the 2x2-binned RGB image (full size for mono sensors)
+            width, height = self.raw_size
+            if self.raw_bayer:
+                space = f"analysis on binned {width // 2}x{height // 2} RGB"
+                layout = f"{self.raw_bayer} Bayer"
+            else:
+                space, layout = "analysis at full size", "mono"
+            self.status_update(f"Raw mode: {self.raw_bits}-bit {layout} {width}x{height}, {space} uint16 "
+                               "(stacking and dark/flat apply to profiles only; saves stay raw)", "blue")
+        else:
+            self.status_update("Raw mode off: 8-bit RGB", "black")
+
+    def capture_raw(self):
+        """Capture Thread: (8-bit preview frame, uint16 sensor frame, uint16 analysis frame) from one request"""
+        request = self.picam2.capture_request()
+        try:
+            frame = request.make_array("main")
+            # Copy out of the request buffer before it is recycled
+            raw = unpack_raw(request.make_array("raw"), self.raw_size).copy()
+        finally:
+            request.release()
+        # Bayer data is binned 2x2 into RGB for analysis; mono data is analyzed as is
+        data = bayer_to_rgb(raw, self.raw_bayer) if self.raw_bayer else raw
+        return frame, raw, data
+
+    # --- Live ROI profile ---
+    def on_roi_press(self, event):
+        self.roi_start = (event.x, event.y)
+        if self.roi_rect:
+            self.video_canvas.delete(self.roi_rect)
+        self.roi_rect = self.video_canvas.create_rectangle(event.x, event.y, event.x, event.y, outline='red', width=2)
+
+    def on_roi_move(self, event):
+        if self.roi_rect:
+            self.video_canvas.coords(self.roi_rect, *self.roi_start, event.x, event.y)
+
+    def on_roi_release(self, event):
+        if not self.roi_rect:
+            return
+        x1, y1, x2, y2 = self.video_canvas.coords(self.roi_rect)
+        # Store as fractions of the preview so it maps onto any raw frame size
+        width, height = DISPLAY_SIZE
+        roi = (max(0.0, min(x1, x2) / width), max(0.0, min(y1, y2) / height),
+               min(1.0, max(x1, x2) / width), min(1.0, max(y1, y2) / height))
+        self.live_roi = roi if roi[2] > roi[0] and roi[3] > roi[1] else None
+        # Lines seen through a new ROI are new tracks
+        self.peak_tracker = PeakTracker()
+
+    def on_live_settings(self, *args):
+        enabled = self.live_profile_var.get()
+        self.live_settings = (enabled, self.dir_var.get(), self.mode_var.get())
+        if enabled and self.plot_window is None:
+            self.open_plot_window()
+
+    def open_plot_window(self):
+        self.plot_window = tk.Toplevel(self.window)
+        self.plot_window.title("Live ROI Profile")
+        self.plot_window.protocol("WM_DELETE_WINDOW", self.close_plot_window)
 
+        # Peak readout (packed first so the plot takes the remaining space)
+        peak_frame = tk.Frame(self.plot_window)
+        peak_frame.pack(side=tk.BOTTOM, fill=tk.X)
+        self.peak_label = Label(peak_frame, text="", anchor=tk.W)
+        self.peak_label.pack(side=tk.LEFT, fill=tk.X, expand=True, padx=5)
+        Button(peak_frame, text="Save Peak Log...", command=self.save_peak_log).pack(side=tk.RIGHT, padx=5, pady=2)
+
+        self.live_plot = ProfilePlot(self.plot_window)
+
+    def close_plot_window(self):
+        self.live_profile_var.set(False)
+        self.plot_window.destroy()
+        self.plot_window = None
+        self.live_plot = None
+
+    def compute_live_profile(self, frame):
+        """Capture Thread: ROI profile of the raw frame, handed to the GUI as latest-value and recorded to the kymograph"""
+        enabled, direction, mode = self.live_settings
+        roi = self.live_roi
+        recording = self.kymo_request is not None or self.kymo_writer is not None
+        if not (enabled or recording) or roi is None:
+            return
+        height, width = frame.shape[:2]
+        bbox = (roi[0] * width, roi[1] * height, roi[2] * width, roi[3] * height)
+        plot_dict = roi_profile(frame, bbox, direction, mode)
+        if not plot_dict:
+            return
+
+        # Spectrometer extras: wavelength axis and tracked line centers (absolute pixels)
+        values = next(iter(plot_dict.values()))
+        origin = profile_origin(bbox, direction)
+        cal = self.wavelength_cal
+        if cal is not None and cal.direction != direction:
+            cal = None
+        x = cal.axis(origin, len(values)) if cal is not None else None
+        intensity = plot_dict.get("Intensity")
+        if intensity is None:
+            intensity = (plot_dict["Red"] + plot_dict["Green"] + plot_dict["Blue"]) / 3
+        now = time.time()
+        if recording:
+            self.record_kymograph(now, intensity, direction, origin)
+        if not enabled:
+            return
+
+        peaks = None
+        if self.track_peaks:
+            peaks = self.peak_tracker.update(peak_centers(intensity) + origin, now)
+            if peaks is not None and cal is not None:
+                peaks = cal(peaks)
+        self.put_latest(self.profile_queue, (plot_dict, direction, x, peaks))
+
+    # --- Kymograph ---
+    def toggle_kymograph(self):
+        if self.kymo_request is None and self.kymo_writer is None:
+            if self.live_roi is None:
+                self.status_update("Drag an ROI on the preview first", "red")
+                return
+            filepath = filedialog.asksaveasfilename(defaultextension=".kymo", filetypes=[("Kymograph", "*.kymo")], title="Record Kymograph")
+            if filepath:
+                # The capture thread opens the file once it knows the profile length
+                self.kymo_request = filepath
+                self.btn_kymo.config(text="Stop")
+                self.open_kymo_window()
+                self.status_update(f"Recording kymograph to {filepath}", "blue")
+        else:
+            with self.kymo_lock:
+                writer, self.kymo_writer, self.kymo_request = self.kymo_writer, None, None
+            self.btn_kymo.config(text="Record...")
+            if writer is not None:
+                writer.close()
+                note = f", {writer.skipped} skipped after ROI changes" if writer.skipped else ""
+                self.status_update(f"Recorded {writer.rows} profiles{note}: {writer.path}", "green")
+
+    def record_kymograph(self, timestamp, profile, direction, origin):
+        """Capture Thread: appends one profile to the recording and the display ring"""
+        path = self.kymo_request
+        if path is not None:
+            try:
+                writer = KymographWriter(path, len(profile), direction, origin)
+            except OSError as e:
+                with self.kymo_lock:
+                    if self.kymo_request == path:
+                        self.kymo_request = None
+                self.ui_queue.put(("status", f"Kymograph Failed: {e}", "red"))
+                return
+            # Publish only if Stop was not pressed while the file was being created
+            with self.kymo_lock:
+                stopped = self.kymo_request != path
+                if not stopped:
+                    self.kymo_request = None
+                    self.kymo_display = KymographDisplay(len(profile))
+                    self.kymo_writer = writer
+            if stopped:
+                writer.close()
+                return
+        writer = self.kymo_writer
+        if writer is not None and writer.append(timestamp, profile):
+            self.kymo_display.add(profile)
+
+    def open_kymo_window(self):
+        if self.kymo_window is not None:
+            return
+        self.kymo_window = tk.Toplevel(self.window)
+        self.kymo_window.title("Kymograph (time runs down)")
+        # Closing the window only hides the display; the recording goes on
+        self.kymo_window.protocol("WM_DELETE_WINDOW", self.close_kymo_window)
+        self.kymo_label = Label(self.kymo_window, bg="black")
+        self.kymo_label.pack(fill=tk.BOTH, expand=True)
+        self.kymo_photo = None
+        self.kymo_shown = 0
+
+    def close_kymo_window(self):
+        self.kymo_window.destroy()
+        self.kymo_window = None
+        self.kymo_photo = None
+
+    def draw_kymograph(self):
+        """Main Thread: redraws the scrolling image when new rows arrived"""
+        display = self.kymo_display
+        if self.kymo_window is None or display is None or display.count == self.kymo_shown:
+            return
+        self.kymo_shown = display.count
+        image = Image.fromarray(display.image()).resize(KYMO_SIZE, Image.BILINEAR)
+        if self.kymo_photo is None:
+            self.kymo_photo = ImageTk.PhotoImage(image=image)
+            self.kymo_label.config(image=self.kymo_photo)
+        else:
+            self.kymo_photo.paste(image)
+
+    # --- Beam Profiler ---
+    def on_beam_settings(self, *args):
+        self.beam_settings = (self.beam_var.get(), self.beam_fit_var.get())
+        if not self.beam_settings[0] and self.beam_items is not None:
+            for item in self.beam_items:
+                self.video_canvas.itemconfig(item, state=tk.HIDDEN)
+
+    def toggle_beam_log(self):
+        if self.beam_log is None:
+            filepath = filedialog.asksaveasfilename(defaultextension=".csv", filetypes=save_filetypes(), title="Beam Log")
+            if filepath:
+                try:
+                    self.beam_log = BeamLog(filepath)
+                except Exception as e:
+                    self.status_update(f"Log Failed: {e}", "red")
+                    return
+                self.btn_beam_log.config(text="Stop Log")
+                self.status_update(f"Logging beam metrics to {filepath}", "blue")
+        else:
+            log, self.beam_log = self.beam_log, None
+            log.close()
+            self.btn_beam_log.config(text="Start Log...")
+            self.status_update(f"Logged {log.count} frames: {log.path}", "green")
+
+    def measure_beam(self, frame):
+        """Capture Thread: beam metrics of the frame, logged and handed to the GUI as latest-value"""
+        enabled, fit = self.beam_settings
+        if not enabled:
+            self.beam_profiler = None
+            return
+        if self.beam_profiler is None:
+            self.beam_profiler = BeamProfiler()
+        self.beam_profiler.fit = fit
+        result = self.beam_profiler.update(frame)
+        log = self.beam_log
+        if result is not None and log is not None:
+            log.add(time.time(), result)
+        self.put_latest(self.beam_queue, (result, frame.shape[:2]))
+
+    def draw_beam_overlay(self, result, shape):
+        """Main Thread: D4s ellipse, tracking window and readout over the preview"""
+        canvas = self.video_canvas
+        if self.beam_items is None:
+            self.beam_items = (canvas.create_polygon(0, 0, 0, 0, outline="lime", fill="", width=2),
+                               canvas.create_rectangle(0, 0, 0, 0, outline="yellow", dash=(4, 4)),
+                               canvas.create_text(10, 10, anchor="nw", fill="lime", font=("Courier", 11), text=""))
+        ellipse, window, text = self.beam_items
+        if not self.beam_settings[0]:
+            return
+        for item in self.beam_items:
+            canvas.itemconfig(item, state=tk.NORMAL)
+        if result is None:
+            canvas.itemconfig(ellipse, state=tk.HIDDEN)
+            canvas.itemconfig(window, state=tk.HIDDEN)
+            canvas.itemconfig(text, text="No beam")
+            return
+
+        scale_x, scale_y = DISPLAY_SIZE[0] / shape[1], DISPLAY_SIZE[1] / shape[0]
+        t = np.linspace(0, 2 * np.pi, 48, endpoint=False)
+        angle = np.radians(result["angle"])
+        u, v = 0.5 * result["major"] * np.cos(t), 0.5 * result["minor"] * np.sin(t)
+        xs = (result["cx"] + u * np.cos(angle) - v * np.sin(angle)) * scale_x
+        ys = (result["cy"] + u * np.sin(angle) + v * np.cos(angle)) * scale_y
+        canvas.coords(ellipse, *np.column_stack((xs, ys)).ravel().tolist())
+        x1, y1, x2, y2 = result["window"]
+        canvas.coords(window, x1 * scale_x, y1 * scale_y, x2 * scale_x, y2 * scale_y)
+
+        lines = [f"Centroid  {result['cx']:8.2f}, {result['cy']:8.2f} px",
+                 f"D4s X/Y   {result['d4x']:8.2f}, {result['d4y']:8.2f} px",
+                 f"Major/Min {result['major']:8.2f}, {result['minor']:8.2f} px @ {result['angle']:.1f} deg",
+                 f"Ellipt.   {result['ellipticity']:8.3f}   Peak {result['peak']:.0f}"]
+        if result["fit"] is not None:
+            lines.append(f"Fit 1/e2  {result['fit'][2]:8.2f}, {result['fit'][3]:8.2f} px")
+        if self.beam_log is not None:
+            lines.append("Logging...")
+        canvas.itemconfig(text, text="\n".join(lines))
+        canvas.tag_raise(text)
+
+    # --- Spectrometer ---
+    def load_wavelength_cal(self):
+        filepath = filedialog.askopenfilename(filetypes=[("Wavelength calibration", "*.json")], title="Load Wavelength Calibration")
+        if filepath:
+            try:
+                self.wavelength_cal = WavelengthCalibration.load(filepath)
+                self.status_update(f"Loaded wavelength calibration: {filepath}", "green")
+            except Exception as e:
+                self.status_update(f"Load Failed: {e}", "red")
+
+    def on_track_peaks(self):
+        self.peak_tracker = PeakTracker()
+        self.track_peaks = self.track_peaks_var.get()
+
+    def save_peak_log(self):
+        times, centers = self.peak_tracker.table()
+        if not len(times):
+            self.status_update("No tracked peaks to save!", "red")
+            return
+        filepath = filedialog.asksaveasfilename(defaultextension=".csv", filetypes=save_filetypes(), title="Save Peak Log")
+        if filepath:
+            unit = "px"
+            if self.wavelength_cal is not None and self.wavelength_cal.direction == self.live_settings[1]:
+                centers, unit = self.wavelength_cal(centers), self.wavelength_cal.unit
+            headers = ["Time"] + [f"Peak {i + 1} ({unit})" for i in range(centers.shape[1])]
+            try:
+                write_table(filepath, headers, [times] + list(centers.T))
+                self.status_update(f"Saved peak log: {filepath}", "green")
+            except Exception as e:
+                self.status_update(f"Save Failed: {e}", "red")
+
+    def on_stack_settings(self, *args):
+        try:
+            frames = max(1, self.stack_frames_var.get())
+        except tk.TclError:
+            return # Entry is being edited
+        self.stack_settings = (STACK_MODES[self.stack_mode_var.get()], frames)
+
+    def stack_frame(self, frame):
+        """Capture Thread: returns the averaged frame, or the raw frame when stacking is off"""
+        mode, frames = self.stack_settings
+        if mode is None:
+            self.stacker = None
+            return frame
+        if self.stacker is None or (self.stacker.mode, self.stacker.window) != (mode, frames):
+            self.stacker = FrameStacker(mode, frames)
+        return self.stacker.add(frame)
+
+    # --- Calibration ---
+    def capture_master(self, kind):
+        """Asks the capture thread to average the next raw frames into a master dark/flat"""
+        try:
+            count = self.cal_count_var.get()
+        except tk.TclError:
+            count = 0
+        if count < 1:
+            self.status_update("Calibration needs at least 1 frame", "red")
+            return
+        if self.master_builder is not None:
+            self.status_update("A calibration capture is already running", "orange")
+            return
+        self.master_builder = MasterFrameBuilder(kind, count)
+        hint = "cover the lens" if kind == "dark" else "point at a uniform light source"
+        self.status_update(f"Capturing master {kind} ({count} frames, {hint})...", "blue")
+
+    def set_master(self, kind, frame):
+        """Main Thread: stores a finished master and rebuilds the correction factors"""
+        if kind == "dark":
+            self.master_dark = frame
+        else:
+            self.master_flat = frame
+        # A size change invalidates the other master
+        for name in ("master_dark", "master_flat"):
+            other = getattr(self, name)
+            if other is not None and other.shape != frame.shape:
+                setattr(self, name, None)
+        self.calibration = Calibration(dark=self.master_dark, flat=self.master_flat)
+        self.status_update(f"Master {kind} ready.", "green")
+
+    def save_calibration(self):
+        if self.calibration is None:
+            self.status_update("No calibration to save!", "red")
+            return
+        filepath = filedialog.asksaveasfilename(defaultextension=".npz", filetypes=[("Calibration", "*.npz")], title="Save Calibration")
+        if filepath:
+            try:
+                self.calibration.save(filepath)
+                self.status_update(f"Saved calibration: {filepath}", "green")
+            except Exception as e:
+                self.status_update(f"Save Failed: {e}", "red")
+
+    def load_calibration(self):
+        filepath = filedialog.askopenfilename(filetypes=[("Calibration", "*.npz")], title="Load Calibration")
+        if filepath:
+            try:
+                self.calibration = Calibration.load(filepath)
+                self.master_dark, self.master_flat = self.calibration.dark, self.calibration.flat
+                self.status_update(f"Loaded calibration: {filepath}", "green")
+            except Exception as e:
+                self.status_update(f"Load Failed: {e}", "red")
+
+    def calibrate_frame(self, frame):
+        """Capture Thread: feeds master captures and applies the correction when enabled"""
+        builder = self.master_builder
+        if builder is not None and builder.add(frame):
+            self.master_builder = None
+            self.ui_queue.put(("master", builder.kind, builder.result()))
+
+        calibration = self.calibration
+        if self.apply_calibration and calibration is not None and calibration.matches(frame):
+            return calibration.apply_clipped(frame)
+        return frame
+
+    def put_latest(self, target_queue, item):
+        """Queue management: Drop old items if GUI is lagging; returns True when one was dropped"""
+        dropped = False
+        if target_queue.full():
+            try:
+                target_queue.get_nowait()
+                dropped = True
+            except queue.Empty:
+                pass
+        target_queue.put(item)
+        return dropped
+
+    # --- Pipeline Statistics ---
+    def on_stats_overlay(self):
+        self.stats_overlay = self.stats_var.get()
+        if self.stats_overlay:
+            self.stats_label.config(text=self.stats.overlay_text())
+            self.stats_label.pack(side=tk.BOTTOM, fill=tk.X)
+        else:
+            self.stats_label.pack_forget()
+
+    def save_stats(self):
+        if not self.stats.captured:
+            self.status_update("No frames captured yet!", "red")
+            return
+        filepath = filedialog.asksaveasfilename(defaultextension=".csv", filetypes=save_filetypes(), title="Save Pipeline Stats")
         if filepath:
             try:
-                # Save the raw PIL object
-                self.current_raw_image.save(filepath)
-                self.status_update(f"Saved: {filepath}", "green")
+                self.stats.export(filepath)
+                self.status_update(f"Saved pipeline stats: {filepath}", "green")
             except Exception as e:
                 self.status_update(f"Save Failed: {e}", "red")
 
     def capture_loop(self):
         """Background Thread: Captures data from hardware"""
+        stats = self.stats
         while self.is_running:
             try:
-                frame = self.picam2.capture_array()
-                
-                # Queue management: Drop old frames if GUI is lagging
-                if self.frame_queue.full():
-                    try:
-                        self.frame_queue.get_nowait()
-                    except queue.Empty:
-                        pass
-                self.frame_queue.put(frame)
+                if self.still_request is not None:
+                    # Mode switch stalls the stream for a frame or two; not counted as a capture
+                    self.capture_still()
+                start = time.perf_counter()
+                if self.raw_mode:
+                    # Raw mode: bursts and Save keep the sensor data, analysis sees uint16,
+                    # the preview comes from the ISP's 8-bit stream
+                    preview_frame, frame, data = self.capture_raw()
+                else:
+                    frame = preview_frame = data = self.picam2.capture_array()
+                captured = time.perf_counter()
+                stats.add("capture", captured - start)
+                stats.frame_captured(captured)
+
+                # Calibrated, stacked (averaged) frame feeds profile and beam analysis, and in 8-bit
+                # mode also the preview and Save; bursts stay raw. In raw mode the preview (ISP
+                # stream) and Save/bursts (sensor mosaic) are in other pixel spaces than the binned
+                # analysis frame the masters were made from, so they stay uncorrected
+                shown = self.stack_frame(self.calibrate_frame(data))
+
+                # Publish the frame for Save. Stacking and calibration return buffers they
+                # overwrite on the next frame, so those are copied here rather than torn later
+                if self.raw_mode or shown is data:
+                    self.current_raw_frame = frame
+                else:
+                    self.current_raw_frame = shown.copy()
+
+                # Live ROI profile from the raw buffer (O(ROI), before any conversion)
+                self.compute_live_profile(shown)
+
+                # Beam metrics on the tracked window only
+                self.measure_beam(shown)
+
+                # Burst recording: one copy into the memory-mapped ring, nothing else
+                if self.burst_request is not None:
+                    self.start_burst(frame)
+                if self.burst_writer is not None:
+                    self.burst_writer.write(frame)
+                    frames, seconds = self.burst_limits
+                    if seconds > 0:
+                        done = time.time() - self.burst_started >= seconds
+                    else:
+                        done = self.burst_writer.frames_written >= frames
+                    if done:
+                        self.finish_burst()
+                    elif self.frame_queue.full():
+                        # GUI has not shown the last preview yet: skip the resize
+                        stats.add("process", time.perf_counter() - captured)
+                        stats.frame_dropped()
+                        continue
+                processed = time.perf_counter()
+                stats.add("process", processed - captured)
+
+                # Scale for the window here, off the Tk thread, with a cheap resampler
+                image = Image.fromarray(preview_frame if self.raw_mode else shown)
+                converted = time.perf_counter()
+                preview = image.resize(DISPLAY_SIZE, Image.BILINEAR)
+                resized = time.perf_counter()
+                stats.add("convert", converted - processed)
+                stats.add("resize", resized - converted)
+                # Queued with its timestamp so the GUI can measure the wait
+                if self.put_latest(self.frame_queue, (preview, resized)):
+                    stats.frame_dropped()
                 
             except Exception as e:
                 print(f"Capture Error: {e}")
                 self.is_running = False
                 break
 
+        # Stream stopped mid-burst: keep what was recorded
+        if self.burst_writer is not None:
+            self.finish_burst()
+
     def update_gui_loop(self):
         """Main Thread: Updates the screen"""
         if not self.is_running:
             return
 
         try:
-            frame = self.frame_queue.get_nowait()
-            
-            # Create PIL Image (Raw 640x480)
-            image = Image.fromarray(frame)
-            
-            # Store a COPY for the save button (so we save the raw resolution)
-            self.current_raw_image = image.copy()
+            preview, queued = self.frame_queue.get_nowait()
+            start = time.perf_counter()
+            self.stats.add("queue wait", start - queued)
 
-            # Resize for the Window (800x600)
-            image_resized = image.resize((800, 600)) 
-            photo = ImageTk.PhotoImage(image=image_resized)
-
-            self.current_image = photo 
-            self.video_label.config(image=photo, width=0, height=0)
+            if self.preview_photo is None:
+                # First frame: create the PhotoImage once and attach it to the canvas
+                self.preview_photo = ImageTk.PhotoImage(image=preview)
+                self.video_canvas.itemconfig(self.video_item, image=self.preview_photo)
+                self.video_canvas.itemconfig(self.standby_text, state=tk.HIDDEN)
+            else:
+                # Afterwards just copy pixels into the existing Tk image
+                self.preview_photo.paste(preview)
+            shown = time.perf_counter()
+            self.stats.add("display", shown - start)
+            self.stats.frame_displayed(shown)
 
         except queue.Empty:
             pass # GUI is faster than camera, just wait
 
+        try:
+            plot_dict, direction, x, peaks = self.profile_queue.get_nowait()
+            if self.live_plot is not None:
+                unit = self.wavelength_cal.unit if x is not None else "px"
+                self.live_plot.set_labels(xlabel=f"Wavelength ({unit})" if x is not None else "Pixel Position")
+                self.live_plot.update(plot_dict, f"Live Average Intensity ({direction} Profile)", x)
+                if peaks is not None:
+                    self.peak_label.config(text="Peaks: " + ", ".join("--" if p != p else f"{p:.2f}" for p in peaks) + f" {unit}")
+        except queue.Empty:
+            pass
+
+        try:
+            result, shape = self.beam_queue.get_nowait()
+            self.draw_beam_overlay(result, shape)
+        except queue.Empty:
+            pass
+
+        # Kymograph: at most a few redraws per second, however fast frames arrive
+        now = time.time()
+        if now - self.kymo_drawn >= KYMO_REFRESH:
+            self.kymo_drawn = now
+            self.draw_kymograph()
+        if self.stats_overlay and now - self.stats_drawn >= STATS_REFRESH:
+            self.stats_drawn = now
+            self.stats_label.config(text=self.stats.overlay_text())
+
         # Schedule next check
         self.window.after(20, self.update_gui_loop)
 
     def on_close(self):
         self.status_update("Shutting down...")
         self.is_running = False
+        self.writer.close() # Finish writing queued snapshots
+        if self.beam_log is not None:
+            self.beam_log.close()
+        if self.kymo_writer is not None:
+            self.kymo_writer.close()
         if hasattr(self, 'picam2'):
             try:
                 self.picam2.stop()
@@ -0,0 +1,203 @@
+import argparse
+import csv
+import glob
+import os
+import sys
+from functools import lru_cache
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+from profiles import ProfileCache, profile_origin
+from rawimage import load_array
+from calibration import Calibration
+from profileio import TableWriter
+from spectral import WavelengthCalibration
+from fringe import fringe_metrics_batch
+
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png", ".bmp", ".tif", ".tiff", ".npy")
+
+DIRECTIONS = {"horizontal": "Horizontal", "h": "Horizontal", "x": "Horizontal",
+              "vertical": "Vertical", "v": "Vertical", "y": "Vertical"}
+MODES = {"grayscale": "Grayscale", "gray": "Grayscale", "intensity": "Grayscale",
+         "rgb": "RGB"}
+
+
+def find_images(inputs):
+    """Expands directories and glob patterns into a sorted list of image files"""
+    paths = []
+    for item in inputs:
+        if os.path.isdir(item):
+            candidates = [os.path.join(item, name) for name in os.listdir(item)]
+        else:
+            candidates = glob.glob(item)
+        paths.extend(p for p in candidates if p.lower().endswith(IMAGE_EXTENSIONS) and os.path.isfile(p))
+    return sorted(set(paths))
+
+
+def parse_bbox(text):
+    values = [float(v) for v in text.split(",")]
+    if len(values) != 4:
+        raise argparse.ArgumentTypeError(f"bbox must be x1,y1,x2,y2 (got {text!r})")
+    return values
+
+
+def read_bbox_file(path):
+    """
+    Reads ROIs from a CSV file, one per line: 'x1,y1,x2,y2' applies to every image,
+    'filename,x1,y1,x2,y2' applies only to that file (matched by base name).
+    Returns (default_bboxes, {filename: [bboxes]}).
+    """
+    defaults = []
+    per_file = {}
+    with open(path, newline='') as file:
+        for row in csv.reader(file):
+            row = [cell.strip() for cell in row]
+            if not row or not row[0] or row[0].startswith("#"):
+                continue
+            if len(row) == 4:
+                defaults.append(parse_bbox(",".join(row)))
+            elif len(row) == 5:
+                per_file.setdefault(os.path.basename(row[0]), []).append(parse_bbox(",".join(row[1:])))
+            else:
+                raise ValueError(f"Bad line in {path}: {row}")
+    return defaults, per_file
+
+
+@lru_cache(maxsize=None)
+def load_calibration(path):
+    # Loaded once per worker process
+    return Calibration.load(path)
+
+
+def profile_file(path, bboxes, direction, mode, calibration_path=None):
+    """Worker: opens one image and returns its profiles, using the same ProfileCache as the GUI"""
+    # Full precision: 16-bit TIFF and raw .npy frames are profiled without an 8-bit conversion
+    array = load_array(path)
+    if calibration_path:
+        calibration = load_calibration(calibration_path)
+        if not calibration.matches(array):
+            raise ValueError(f"Calibration {calibration.shape} does not match {path} {array.shape}")
+        array = calibration.apply(array, out=np.empty(array.shape, dtype=np.float32))
+    cache = ProfileCache(array)
+    # All ROIs of the image in one vectorized gather
+    return cache.profiles(bboxes, direction, mode)
+
+
+def _profile_job(job):
+    """Worker: (profiles, None), or (None, error message) so one bad file does not end the batch"""
+    try:
+        return profile_file(*job), None
+    except Exception as e:
+        return None, f"{type(e).__name__}: {e}"
+
+
+FRINGE_HEADERS = ["File", "ROI", "Channel", "Frequency (1/px)", "Spacing (px)", "Contrast", "Phase (rad)"]
+
+
+def run_batch(paths, bbox_lookup, direction, mode, output, jobs=None, calibration_path=None, wavelength_cal=None,
+              fringe=False):
+    """
+    Profiles every image over a process pool and writes one combined table.
+    Files that fail to load or profile are reported on stderr and skipped.
+    With a WavelengthCalibration a wavelength column follows the index.
+    With fringe=True the table holds one row of fringe metrics per ROI and channel
+    instead of the profiles.
+    """
+    jobs_list = []
+    for path in paths:
+        bboxes = bbox_lookup(path)
+        if bboxes:
+            jobs_list.append((path, bboxes, direction, mode, calibration_path))
+        else:
+            print(f"Skipping {path}: no ROI", file=sys.stderr)
+
+    labels = ["Intensity"] if mode == "Grayscale" else ["Red", "Green", "Blue"]
+    headers = ["File", "ROI", "Index"]
+    if wavelength_cal is not None:
+        headers.append(f"Wavelength ({wavelength_cal.unit})")
+    # Small chunks keep all workers busy without per-image IPC overhead dominating
+    chunksize = max(1, len(jobs_list) // (4 * (jobs or os.cpu_count() or 1)))
+
+    count = skipped = 0
+    if fringe:
+        headers, labels = FRINGE_HEADERS, []
+    with ProcessPoolExecutor(max_workers=jobs) as executor, TableWriter(output, headers + labels) as writer:
+        # map() yields results in input order, so the table is deterministic
+        for job, (profiles, error) in zip(jobs_list, executor.map(_profile_job, jobs_list, chunksize=chunksize)):
+            if error is not None:
+                print(f"Skipping {job[0]}: {error}", file=sys.stderr)
+                skipped += 1
+                continue
+            name = os.path.basename(job[0])
+            if fringe:
+                write_fringe_rows(writer, name, profiles)
+                count += 1
+                continue
+            for roi, (bbox, plot_dict) in enumerate(zip(job[1], profiles)):
+                if not plot_dict:
+                    continue
+                length = len(plot_dict[labels[0]])
+                # Columns go straight from the profile arrays to the writer
+                columns = [np.full(length, name), np.full(length, roi), np.arange(length)]
+                if wavelength_cal is not None:
+                    columns.append(wavelength_cal.axis(profile_origin(bbox, direction), length))
+                writer.write(columns + [plot_dict[label] for label in labels])
+            count += 1
+    if skipped:
+        print(f"{skipped} of {len(jobs_list)} images could not be profiled", file=sys.stderr)
+    return count
+
+
+def write_fringe_rows(writer, name, profiles):
+    """Fringe metrics of one image's profiles: one rFFT over all channels of an ROI"""
+    for roi, plot_dict in enumerate(profiles):
+        if not plot_dict:
+            continue
+        metrics = fringe_metrics_batch(np.stack(list(plot_dict.values())))
+        count = len(plot_dict)
+        writer.write([np.full(count, name), np.full(count, roi), np.array(list(plot_dict)),
+                      metrics["frequency"], metrics["spacing"], metrics["contrast"], metrics["phase"]])
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Headless ROI profile extraction for a folder of images")
+    parser.add_argument("inputs", nargs="+", help="image files, directories or glob patterns")
+    roi = parser.add_mutually_exclusive_group(required=True)
+    roi.add_argument("--bbox", type=parse_bbox, help="fixed ROI as x1,y1,x2,y2 in pixels")
+    roi.add_argument("--bbox-file", help="CSV of ROIs: 'x1,y1,x2,y2' or 'filename,x1,y1,x2,y2' per line")
+    parser.add_argument("--direction", default="Horizontal", type=str.lower, choices=sorted(DIRECTIONS),
+                        help="profile direction (default: horizontal)")
+    parser.add_argument("--mode", default="Grayscale", type=str.lower, choices=sorted(MODES),
+                        help="color mode (default: grayscale)")
+    parser.add_argument("--calibration", help="dark/flat calibration .npz saved by the camera app")
+    parser.add_argument("--wavelength-cal", help="pixel -> wavelength calibration .json saved by the analyzer")
+    parser.add_argument("--fringe", action="store_true", help="write fringe spacing/frequency/contrast per ROI instead of profiles")
+    parser.add_argument("-o", "--output", default="profiles.csv", help="combined output table: .csv, .npz, .npy, .parquet or .h5 (default: profiles.csv)")
+    parser.add_argument("-j", "--jobs", type=int, default=None, help="worker processes (default: all cores)")
+    args = parser.parse_args(argv)
+
+    paths = find_images(args.inputs)
+    if not paths:
+        parser.error("no images found")
+
+    if args.bbox:
+        defaults, per_file = [args.bbox], {}
+    else:
+        defaults, per_file = read_bbox_file(args.bbox_file)
+
+    def bbox_lookup(path):
+        return per_file.get(os.path.basename(path), defaults)
+
+    direction = DIRECTIONS[args.direction]
+    wavelength_cal = None
+    if args.wavelength_cal:
+        wavelength_cal = WavelengthCalibration.load(args.wavelength_cal)
+        if wavelength_cal.direction != direction:
+            parser.error(f"wavelength calibration is for {wavelength_cal.direction.lower()} profiles")
+
+    count = run_batch(paths, bbox_lookup, direction, MODES[args.mode], args.output, args.jobs, args.calibration, wavelength_cal,
+                      args.fringe)
+    print(f"Profiled {count} images -> {args.output}")
+
+
+if __name__ == "__main__":
+    main()
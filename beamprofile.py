@@ -0,0 +1,225 @@
+import threading
+from functools import lru_cache
+import numpy as np
+from profiles import luminance
+from profileio import TableWriter
+
+# Optional 2D Gaussian fit
+try:
+    from scipy.optimize import curve_fit
+except ImportError:
+    curve_fit = None
+
+# ISO 11146 integration window: 3x the beam diameter, centered on the centroid
+WINDOW_FACTOR = 3.0
+# Smallest tracking window side, so a tiny beam still has some background around it
+MIN_WINDOW = 16
+# Window refinements per frame while acquiring the beam
+MAX_ITERATIONS = 10
+# Largest side of the window handed to the Gaussian fit (bigger windows are binned)
+FIT_SIZE = 64
+
+LOG_HEADERS = ["Time", "Centroid X (px)", "Centroid Y (px)", "D4s X (px)", "D4s Y (px)",
+               "D4s Major (px)", "D4s Minor (px)", "Angle (deg)", "Ellipticity", "Peak", "Total",
+               "Fit X (px)", "Fit Y (px)", "Fit Major (px)", "Fit Minor (px)"]
+
+
+@lru_cache(maxsize=32)
+def coordinates(length):
+    """Pixel coordinates 0..length-1 as float64 (cached per size; read-only)"""
+    coords = np.arange(length, dtype=np.float64)
+    coords.flags.writeable = False
+    return coords
+
+
+def beam_moments(image, origin=(0, 0)):
+    """
+    Intensity-weighted centroid and second moments of a (background-free) 2D array.
+
+    Everything comes from the two marginal sums and one matrix-vector product
+    (sum of I * x * y = y . (I @ x)), so no per-pixel coordinate grids are built.
+    Returns None for an empty (all-zero) image.
+    """
+    height, width = image.shape
+    x = coordinates(width)
+    y = coordinates(height)
+    column_sums = image.sum(axis=0, dtype=np.float64) # Profile along x
+    row_sums = image.sum(axis=1, dtype=np.float64) # Profile along y
+    total = column_sums.sum()
+    if total <= 0:
+        return None
+
+    cx = column_sums @ x / total
+    cy = row_sums @ y / total
+    var_x = column_sums @ (x - cx) ** 2 / total
+    var_y = row_sums @ (y - cy) ** 2 / total
+    cov_xy = (y - cy) @ (image @ (x - cx)) / total
+    return {"cx": cx + origin[0], "cy": cy + origin[1], "var_x": var_x, "var_y": var_y, "cov_xy": cov_xy,
+            "total": total}
+
+
+def d4sigma(moments):
+    """
+    ISO 11146 second-moment diameters from beam_moments().
+
+    Returns (D4s x, D4s y, major, minor, angle in degrees of the major axis from x,
+    ellipticity = minor / major).
+    """
+    var_x, var_y, cov = moments["var_x"], moments["var_y"], moments["cov_xy"]
+    mean = 0.5 * (var_x + var_y)
+    spread = np.hypot(0.5 * (var_x - var_y), cov)
+    major = 4 * np.sqrt(max(mean + spread, 0.0))
+    minor = 4 * np.sqrt(max(mean - spread, 0.0))
+    angle = np.degrees(0.5 * np.arctan2(2 * cov, var_x - var_y))
+    return (4 * np.sqrt(max(var_x, 0.0)), 4 * np.sqrt(max(var_y, 0.0)), major, minor, angle,
+            minor / major if major > 0 else 0.0)
+
+
+def _gaussian_2d(coords, amplitude, x0, y0, sigma_major, sigma_minor, theta, offset):
+    x, y = coords
+    cos, sin = np.cos(theta), np.sin(theta)
+    u = (x - x0) * cos + (y - y0) * sin
+    v = -(x - x0) * sin + (y - y0) * cos
+    return offset + amplitude * np.exp(-0.5 * ((u / sigma_major) ** 2 + (v / sigma_minor) ** 2))
+
+
+def fit_gaussian(image, moments, origin=(0, 0)):
+    """
+    Least-squares 2D elliptical Gaussian fit (needs scipy), seeded from the moments.
+
+    Windows larger than FIT_SIZE are binned first so the fit stays fast.
+    Returns (x0, y0, 1/e^2 major diameter, 1/e^2 minor diameter) or None.
+    """
+    if curve_fit is None:
+        return None
+    height, width = image.shape
+    step = max(1, int(np.ceil(max(height, width) / FIT_SIZE)))
+    if step > 1:
+        h, w = height // step * step, width // step * step
+        image = image[:h, :w].reshape(h // step, step, w // step, step).mean(axis=(1, 3))
+    ys, xs = np.indices(image.shape, dtype=np.float64)
+    xs = xs * step + (step - 1) / 2.0
+    ys = ys * step + (step - 1) / 2.0
+
+    _, _, major, minor, angle, _ = d4sigma(moments)
+    guess = (float(image.max()), moments["cx"] - origin[0], moments["cy"] - origin[1],
+             max(major / 4, 0.5), max(minor / 4, 0.5), np.radians(angle), 0.0)
+    try:
+        params, _ = curve_fit(_gaussian_2d, (xs.ravel(), ys.ravel()), image.ravel(), p0=guess, maxfev=200)
+    except (RuntimeError, ValueError):
+        return None
+    _, x0, y0, sigma_a, sigma_b, _, _ = params
+    sigma_a, sigma_b = sorted((abs(sigma_a), abs(sigma_b)), reverse=True)
+    return x0 + origin[0], y0 + origin[1], 4 * sigma_a, 4 * sigma_b
+
+
+class BeamProfiler:
+    """
+    Per-frame beam metrics with an auto-tracking integration window.
+
+    Each update() converts only the current window to intensity, removes the
+    background (border mean, with a 3 sigma noise floor), computes the moments
+    and then moves the window to the centroid with a side of WINDOW_FACTOR x the D4s diameter,
+    as ISO 11146 prescribes. While the window is still shrinking (beam
+    acquisition) the measurement is repeated on the same frame; once locked the
+    work is proportional to the beam size, not the sensor size. If the beam is
+    lost the window resets to the full frame.
+    """
+
+    def __init__(self, fit=False):
+        self.fit = fit
+        self.window = None # (x1, y1, x2, y2) in frame pixels, None = full frame
+
+    def reset(self):
+        self.window = None
+
+    def update(self, frame):
+        """Metrics of one frame (a dict), or None when no beam is found"""
+        height, width = frame.shape[:2]
+        # Acquisition: iterate on this frame until the window stops shrinking
+        for _ in range(MAX_ITERATIONS):
+            window = self.window or (0, 0, width, height)
+            result = self._measure(frame, window)
+            if result is None or self.window is None or self._area(self.window) > 0.95 * self._area(window):
+                break
+        return result
+
+    @staticmethod
+    def _area(window):
+        return (window[2] - window[0]) * (window[3] - window[1])
+
+    def _measure(self, frame, window):
+        height, width = frame.shape[:2]
+        x1, y1, x2, y2 = window
+        image = luminance(frame[y1:y2, x1:x2]).astype(np.float32)
+
+        # Baseline from the window border; pixels within 3 sigma of it count as background
+        border = np.concatenate((image[0], image[-1], image[1:-1, 0], image[1:-1, -1]))
+        image -= border.mean()
+        image[image < 3 * border.std()] = 0
+
+        moments = beam_moments(image, origin=(x1, y1))
+        if moments is None:
+            self.window = None
+            return None
+        d4x, d4y, major, minor, angle, ellipticity = d4sigma(moments)
+        result = {"cx": moments["cx"], "cy": moments["cy"], "d4x": d4x, "d4y": d4y, "major": major,
+                  "minor": minor, "angle": angle, "ellipticity": ellipticity, "peak": float(image.max()),
+                  "total": moments["total"], "window": (x1, y1, x2, y2), "fit": None}
+        if self.fit:
+            result["fit"] = fit_gaussian(image, moments, origin=(x1, y1))
+
+        # Track: next window centered on the beam, 3x its diameter
+        half = max(WINDOW_FACTOR * max(d4x, d4y), MIN_WINDOW) / 2
+        window = (int(max(0, moments["cx"] - half)), int(max(0, moments["cy"] - half)),
+                  int(min(width, moments["cx"] + half + 1)), int(min(height, moments["cy"] + half + 1)))
+        self.window = window if window[2] - window[0] >= 3 and window[3] - window[1] >= 3 else None
+        return result
+
+
+class BeamLog:
+    """
+    Buffered per-frame log of beam metrics.
+
+    Rows are collected in memory and written in blocks through TableWriter, so
+    logging costs the capture thread a list append per frame. add() and close()
+    share one lock, so rows arriving while the log closes are never half written.
+    """
+
+    def __init__(self, path, block=256):
+        self.path = path
+        self.block = block
+        self.rows = []
+        self.count = 0
+        self._writer = TableWriter(path, LOG_HEADERS)
+        self._lock = threading.Lock()
+
+    def add(self, timestamp, result):
+        fit = result["fit"] or (np.nan,) * 4
+        row = (timestamp, result["cx"], result["cy"], result["d4x"], result["d4y"], result["major"],
+               result["minor"], result["angle"], result["ellipticity"], result["peak"], result["total"]) + tuple(fit)
+        # Same lock as close(): a row is either written or the log is already closed
+        with self._lock:
+            if self._writer is None:
+                return
+            self.rows.append(row)
+            if len(self.rows) >= self.block:
+                self._flush()
+
+    def _flush(self):
+        if self.rows and self._writer is not None:
+            columns = np.array(self.rows, dtype=np.float64).T
+            self._writer.write(list(columns))
+            self.count += len(self.rows)
+            self.rows = []
+
+    def flush(self):
+        with self._lock:
+            self._flush()
+
+    def close(self):
+        with self._lock:
+            self._flush()
+            if self._writer is not None:
+                self._writer.close()
+                self._writer = None
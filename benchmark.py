@@ -0,0 +1,385 @@
+import argparse
+import os
+import sys
+import tempfile
+import threading
+import time
+from collections import defaultdict
+import numpy as np
+import fakecamera
+from profileio import save_filetypes, write_table
+
+# Seconds each path runs for
+DURATION = 5.0
+# Live ROI as fractions of the frame (a wide strip across the middle)
+ROI = (0.2, 0.4, 0.8, 0.6)
+# Size of the still image handed to the analyzer (HQ camera, 2x2 binned)
+IMAGE_SIZE = (2028, 1520)
+# Latency percentiles reported per stage
+PERCENTILES = (50, 90, 99)
+# Memory sampling interval (seconds)
+MEMORY_INTERVAL = 0.01
+
+RESULT_HEADERS = ["Path", "Stage", "Calls", "Mean (ms)"] + [f"p{p} (ms)" for p in PERCENTILES] + ["Max (ms)"]
+
+
+class StageTimer:
+    """
+    Wall-clock samples per pipeline stage.
+
+    wrap() replaces a method or function on an object with a timed version, so
+    the app code runs unmodified; samples from any thread are appended to plain
+    lists (atomic under the GIL).
+    """
+
+    def __init__(self):
+        self.samples = defaultdict(list)
+
+    def add(self, stage, seconds):
+        self.samples[stage].append(seconds)
+
+    def wrap(self, owner, name, stage=None):
+        original = getattr(owner, name)
+        samples = self.samples[stage or name]
+
+        def timed(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return original(*args, **kwargs)
+            finally:
+                samples.append(time.perf_counter() - start)
+
+        setattr(owner, name, timed)
+
+    def calls(self, stage):
+        return len(self.samples.get(stage, ()))
+
+    def rows(self):
+        """(stage, calls, mean, percentiles..., max) in milliseconds, stages with samples only"""
+        rows = []
+        for stage, samples in self.samples.items():
+            if not samples:
+                continue
+            ms = np.asarray(samples) * 1000
+            rows.append((stage, len(ms), ms.mean()) + tuple(np.percentile(ms, PERCENTILES)) + (ms.max(),))
+        return rows
+
+
+class MemorySampler:
+    """
+    Peak resident memory of the process while a path runs, sampled from
+    /proc/self/statm on a background thread (no allocation tracing, so the
+    timings are not disturbed).
+    """
+
+    def __init__(self, interval=MEMORY_INTERVAL):
+        self.interval = interval
+        self.page = os.sysconf("SC_PAGE_SIZE") if hasattr(os, "sysconf") else 4096
+        self.baseline = self.peak = self.rss()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def rss(self):
+        try:
+            with open("/proc/self/statm") as file:
+                return int(file.read().split()[1]) * self.page
+        except OSError:
+            return 0
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.peak = max(self.peak, self.rss())
+
+    def __enter__(self):
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+        self.peak = max(self.peak, self.rss())
+
+
+def drag_boxes(width, height, count):
+    """ROIs sliding and growing across the image, like a user dragging the mouse"""
+    t = np.linspace(0, 1, count)
+    x1 = width * (0.1 + 0.3 * t)
+    y1 = height * (0.3 + 0.1 * np.sin(6 * t))
+    return [(a, b, a + width * (0.2 + 0.3 * s), b + height * 0.2) for a, b, s in zip(x1, y1, t)]
+
+
+def pump(root, seconds, done=lambda: False):
+    """Runs the Tk event loop for `seconds` (or until done())"""
+    end = time.perf_counter() + seconds
+    while time.perf_counter() < end and not done():
+        root.update()
+        time.sleep(0.001)
+
+
+# --- Headless stand-ins for Tk ---
+class Stub:
+    """Widget (or window) that was never built: any attribute, any call, does nothing"""
+
+    def __getattr__(self, name):
+        return self
+
+    def __call__(self, *args, **kwargs):
+        return None
+
+
+STUB = Stub()
+
+
+class Value:
+    """Tk variable stand-in (get/set, traces ignored)"""
+
+    def __init__(self, value):
+        self.value = value
+
+    def get(self):
+        return self.value
+
+    def set(self, value):
+        self.value = value
+
+    def trace_add(self, *args):
+        pass
+
+
+def headless_camera_app():
+    """CameraApp with its real pipeline state and camera setup, and stubs for every widget"""
+    import SimplePicture2
+
+    class HeadlessCameraApp(SimplePicture2.CameraApp):
+        def __init__(self):
+            self.window = STUB
+            self.init_state()
+            self.camera_ready = False
+            self.init_camera_worker() # Same setup as the app, on this thread
+            self.poll_ui_queue()
+            self.preview_photo = STUB # Preview frames are pasted into nothing (no Tk image)
+
+        def __getattr__(self, name):
+            # Only reached for attributes the app never created here: its widgets
+            return STUB
+
+    return HeadlessCameraApp()
+
+
+def headless_analyzer_app():
+    """ImageAnalysisApp with its real state, Tk variables as Values and an off-screen plot"""
+    import ImageAnalyzer2
+
+    class HeadlessAnalyzerApp(ImageAnalyzer2.ImageAnalysisApp):
+        def __init__(self):
+            self.init_state()
+            self.dir_var = Value("Horizontal")
+            self.band_var = Value(5)
+            self.mode_var = Value("Grayscale")
+            self.live_var = Value(False)
+            self.apply_cal_var = Value(False)
+            self.wavelength_var = Value(False)
+            self.plot_frame = None # ProfilePlot draws on an Agg canvas
+
+        def __getattr__(self, name):
+            return STUB
+
+    return HeadlessAnalyzerApp()
+
+
+# --- Paths: the same app code with or without a display ---
+def bench_camera(args, timer, headless=False):
+    """CameraApp with the stand-in camera: capture_loop stages, update_gui_loop and the live plot"""
+    from calibration import Calibration
+
+    if headless:
+        from profileplot import ProfilePlot
+        app = headless_camera_app()
+        # What the Live Profile and Beam checkboxes would set
+        app.live_settings = (True, "Horizontal", "Grayscale")
+        app.live_plot = ProfilePlot(None)
+        app.beam_settings = (args.scene == "beam", False)
+    else:
+        import tkinter as tk
+        import SimplePicture2
+        root = tk.Tk()
+        app = SimplePicture2.CameraApp(root, "Benchmark")
+        pump(root, 30, lambda: app.camera_ready)
+        app.live_profile_var.set(True)
+        app.beam_var.set(args.scene == "beam")
+    if not app.camera_ready:
+        if not headless:
+            root.destroy()
+        raise RuntimeError("Stand-in camera did not initialize")
+
+    # Analysis as a user would switch it on: ROI, live profile window, beam profiler,
+    # and optionally frame stacking and a dark/flat correction
+    app.live_roi = ROI
+    if args.stack:
+        app.stack_settings = ("mean", args.stack)
+    if args.calibrate:
+        shape = (args.size[1], args.size[0], 3)
+        app.calibration = Calibration(dark=np.full(shape, 2.0), flat=np.full(shape, 200.0))
+        app.apply_calibration = True
+
+    timer.wrap(app.picam2, "capture_array", "capture")
+    timer.wrap(app, "calibrate_frame", "calibrate")
+    timer.wrap(app, "stack_frame", "stack")
+    timer.wrap(app, "compute_live_profile", "live profile")
+    timer.wrap(app, "measure_beam", "beam")
+    timer.wrap(app.live_plot, "update", "plot update")
+    timer.wrap(app, "update_gui_loop", "gui loop")
+
+    app.start_camera()
+    start = time.perf_counter()
+    if headless:
+        # update_gui_loop reschedules itself with after(20); here the loop does the scheduling
+        while time.perf_counter() - start < args.duration:
+            app.update_gui_loop()
+            time.sleep(0.02)
+    else:
+        pump(root, args.duration)
+    elapsed = time.perf_counter() - start
+    app.is_running = False
+    app.camera_thread.join(2)
+    app.picam2.stop()
+    app.writer.close()
+    if not headless:
+        root.destroy()
+
+    # Stages inside capture_loop and the Tk paste, from the app's own pipeline counters (latest samples)
+    stages = ("convert", "resize", "queue wait") + (() if headless else ("display",))
+    for stage in stages:
+        for seconds in app.stats.stages[stage].recent():
+            timer.add(stage, seconds)
+    return {"captured fps": timer.calls("capture") / elapsed, "processed fps": timer.calls("live profile") / elapsed,
+            "displayed fps": app.stats.displayed / elapsed, "dropped previews": app.stats.dropped}
+
+
+def bench_analyzer(args, timer, headless=False):
+    """ImageAnalysisApp on a synthetic still: open, analyze_image while dragging, update_plot, save_csv"""
+    from tkinter import filedialog
+    from PIL import Image
+
+    width, height = args.image_size
+    with tempfile.TemporaryDirectory() as folder:
+        image_path = os.path.join(folder, "scene.png")
+        Image.fromarray(fakecamera.synthetic_frame(args.scene, (width, height))).save(image_path)
+        if headless:
+            app = headless_analyzer_app()
+            redraw = None
+        else:
+            import tkinter as tk
+            import ImageAnalyzer2
+            root = tk.Tk()
+            app = ImageAnalyzer2.ImageAnalysisApp(master=root)
+            redraw = root.update
+        timer.wrap(app, "analyze_image")
+        timer.wrap(app, "update_plot")
+        timer.wrap(app, "save_csv")
+
+        # The file dialogs answer immediately
+        dialogs = filedialog.askopenfilename, filedialog.asksaveasfilename
+        export = [os.path.join(folder, "profile" + ext.split()[0].lstrip("*")) for _, ext in save_filetypes()]
+        filedialog.askopenfilename = lambda **kwargs: image_path
+        try:
+            start = time.perf_counter()
+            app.open_image()
+            timer.add("open image", time.perf_counter() - start)
+            if redraw:
+                redraw()
+
+            # Drag: one analysis per mouse event, the screen redrawn in between
+            count = 0
+            start = time.perf_counter()
+            for direction in ("Horizontal", "Vertical"):
+                app.dir_var.set(direction)
+                app.on_direction_change()
+                for bbox in drag_boxes(width, height, 200):
+                    app.analyze_image(list(bbox))
+                    if redraw:
+                        began = time.perf_counter()
+                        redraw()
+                        timer.add("redraw", time.perf_counter() - began)
+                    count += 1
+                    if time.perf_counter() - start > args.duration:
+                        break
+            elapsed = time.perf_counter() - start
+
+            for path in export:
+                filedialog.asksaveasfilename = lambda path=path, **kwargs: path
+                app.save_csv()
+        finally:
+            filedialog.askopenfilename, filedialog.asksaveasfilename = dialogs
+            if not headless:
+                root.destroy()
+    return {"analyses/s": count / elapsed}
+
+
+PATHS = {"camera": bench_camera, "analyzer": bench_analyzer}
+
+
+def has_display():
+    import tkinter as tk
+    try:
+        tk.Tk().destroy()
+        return True
+    except tk.TclError:
+        return False
+
+
+def parse_size(text):
+    try:
+        width, height = (int(v) for v in text.lower().split("x"))
+    except ValueError:
+        raise argparse.ArgumentTypeError("Size must look like 640x480")
+    return width, height
+
+
+def report(path, headless, summary, timer, memory):
+    mode = " (headless)" if headless else ""
+    figures = ", ".join(f"{value:.1f} {name}" for name, value in summary.items())
+    print(f"\n{path}{mode}: {figures}, peak RSS {memory.peak / 1e6:.1f} MB (+{(memory.peak - memory.baseline) / 1e6:.1f} MB)")
+    print(f"  {'stage':<14}{'calls':>7}{'mean':>9}" + "".join(f"{'p' + str(p):>9}" for p in PERCENTILES) + f"{'max':>9}  (ms)")
+    for stage, calls, *values in timer.rows():
+        print(f"  {stage:<14}{calls:>7}" + "".join(f"{v:9.3f}" for v in values))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmarks the camera and analyzer hot paths with a simulated camera")
+    parser.add_argument("paths", nargs="*", default=sorted(PATHS), help=f"paths to run: {', '.join(sorted(PATHS))} (default: all)")
+    parser.add_argument("--scene", default="fringes", choices=fakecamera.SCENES, help="synthetic scene (default: fringes)")
+    parser.add_argument("--size", type=parse_size, default=(640, 480), help="camera stream size (default: 640x480)")
+    parser.add_argument("--fps", type=float, default=30.0, help="camera frame rate, 0 = as fast as possible (default: 30)")
+    parser.add_argument("--image-size", type=parse_size, default=IMAGE_SIZE, help="analyzer image size (default: 2028x1520)")
+    parser.add_argument("--stack", type=int, default=0, help="running-mean stacking over N frames in the camera path (default: off)")
+    parser.add_argument("--calibrate", action="store_true", help="apply a dark/flat correction in the camera path")
+    parser.add_argument("--duration", type=float, default=DURATION, help="seconds per path (default: 5)")
+    parser.add_argument("--headless", action="store_true", help="stub the widgets even when a display is available")
+    parser.add_argument("-o", "--output", help="also write the stage table: .csv, .npz, .npy, .parquet or .h5")
+    args = parser.parse_args(argv)
+    unknown = [path for path in args.paths if path not in PATHS]
+    if unknown:
+        parser.error(f"unknown path: {', '.join(unknown)}")
+
+    fakecamera.install(args.scene, args.size, args.fps)
+    headless = args.headless or not has_display()
+    if headless and not args.headless:
+        print("No display: running the apps with stubbed widgets (use xvfb-run to include Tk drawing)")
+
+    results = []
+    for path in args.paths:
+        timer = StageTimer()
+        with MemorySampler() as memory:
+            summary = PATHS[path](args, timer, headless)
+        report(path, headless, summary, timer, memory)
+        results += [(path,) + row for row in timer.rows()]
+
+    if args.output and results:
+        write_table(args.output, RESULT_HEADERS, [np.array(column) for column in zip(*results)])
+        print(f"\nSaved results -> {args.output}")
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
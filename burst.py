@@ -0,0 +1,150 @@
+import json
+import sys
+import time
+import numpy as np
+
+# File layout:
+#   [4096-byte header: MAGIC + JSON (shape, dtype, capacity, frames_written, bayer)]
+#   [int64 sequence number per slot, -1 = empty]
+#   [float64 timestamp per slot (time.time())]
+#   [capacity x frame_shape frames of dtype]
+MAGIC = b"OPTBURST"
+HEADER_SIZE = 4096
+VERSION = 1
+
+
+def _layout(capacity, frame_shape, dtype):
+    seq_offset = HEADER_SIZE
+    time_offset = seq_offset + 8 * capacity
+    frame_offset = time_offset + 8 * capacity
+    frame_bytes = int(np.prod(frame_shape)) * np.dtype(dtype).itemsize
+    return seq_offset, time_offset, frame_offset, frame_offset + frame_bytes * capacity
+
+
+def _write_header(path, info):
+    text = MAGIC + json.dumps(info).encode("utf-8")
+    if len(text) > HEADER_SIZE:
+        raise ValueError("Burst header too large")
+    with open(path, "r+b") as file:
+        file.write(text.ljust(HEADER_SIZE, b" "))
+
+
+class BurstWriter:
+    """
+    Preallocated on-disk ring buffer of raw frames.
+
+    The file is created at full size up front and memory-mapped, so write() is a
+    single copy of the frame into the mapped slot: no PIL conversion, no encoding
+    and no allocation per frame. Once capacity is reached the oldest frames are
+    overwritten, so the file always holds the most recent `capacity` frames.
+    `bayer` records the layout ("RGGB", ...) of raw mosaic frames.
+    """
+
+    def __init__(self, path, frame_shape, dtype, capacity, bayer=None):
+        self.path = path
+        self.frame_shape = tuple(frame_shape)
+        self.dtype = np.dtype(dtype)
+        self.capacity = int(capacity)
+        self.frames_written = 0
+
+        seq_offset, time_offset, frame_offset, total = _layout(self.capacity, self.frame_shape, self.dtype)
+        with open(path, "wb") as file:
+            file.truncate(total)
+        self.info = {"version": VERSION, "frame_shape": list(self.frame_shape), "dtype": self.dtype.str,
+                     "capacity": self.capacity, "frames_written": 0, "bayer": bayer}
+        _write_header(path, self.info)
+
+        self.sequence = np.memmap(path, dtype=np.int64, mode="r+", offset=seq_offset, shape=(self.capacity,))
+        self.timestamps = np.memmap(path, dtype=np.float64, mode="r+", offset=time_offset, shape=(self.capacity,))
+        self.frames = np.memmap(path, dtype=self.dtype, mode="r+", offset=frame_offset,
+                                shape=(self.capacity,) + self.frame_shape)
+        self.sequence[:] = -1
+
+    def write(self, frame, timestamp=None):
+        slot = self.frames_written % self.capacity
+        self.frames[slot] = frame
+        self.timestamps[slot] = time.time() if timestamp is None else timestamp
+        self.sequence[slot] = self.frames_written
+        self.frames_written += 1
+
+    def close(self):
+        if self.frames is None:
+            return
+        for array in (self.frames, self.timestamps, self.sequence):
+            array.flush()
+        self.frames = self.timestamps = self.sequence = None
+        self.info["frames_written"] = self.frames_written
+        _write_header(self.path, self.info)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class BurstReader:
+    """
+    Read-only view of a burst file in chronological order.
+
+    Frames stay memory-mapped: indexing reads only the requested frame from disk.
+    """
+
+    def __init__(self, path):
+        with open(path, "rb") as file:
+            header = file.read(HEADER_SIZE)
+        if not header.startswith(MAGIC):
+            raise ValueError(f"{path} is not a burst file")
+        self.info = json.loads(header[len(MAGIC):].decode("utf-8").rstrip())
+        self.frame_shape = tuple(self.info["frame_shape"])
+        self.dtype = np.dtype(self.info["dtype"])
+        self.bayer = self.info.get("bayer") # Bayer order of raw mosaic frames, None otherwise
+        capacity = self.info["capacity"]
+
+        seq_offset, time_offset, frame_offset, _ = _layout(capacity, self.frame_shape, self.dtype)
+        sequence = np.memmap(path, dtype=np.int64, mode="r", offset=seq_offset, shape=(capacity,))
+        self._timestamps = np.memmap(path, dtype=np.float64, mode="r", offset=time_offset, shape=(capacity,))
+        self._frames = np.memmap(path, dtype=self.dtype, mode="r", offset=frame_offset,
+                                 shape=(capacity,) + self.frame_shape)
+
+        # Slot indices sorted by capture order (unwraps the ring)
+        filled = np.flatnonzero(sequence >= 0)
+        self.order = filled[np.argsort(sequence[filled])]
+
+    def __len__(self):
+        return len(self.order)
+
+    def __getitem__(self, index):
+        return self._frames[self.order[index]]
+
+    def frames(self, index, rows=slice(None), cols=slice(None)):
+        """Frames `index` (an int, slice or index array, in capture order), cropped to rows/cols"""
+        return self._frames[self.order[index], rows, cols]
+
+    def __iter__(self):
+        for slot in self.order:
+            yield self._frames[slot]
+
+    @property
+    def timestamps(self):
+        return np.asarray(self._timestamps[self.order])
+
+    def frame_rate(self):
+        times = self.timestamps
+        if len(times) < 2:
+            return 0.0
+        return (len(times) - 1) / (times[-1] - times[0])
+
+
+def main():
+    if len(sys.argv) != 2:
+        print("Usage: python burst.py <file.burst>")
+        return
+    reader = BurstReader(sys.argv[1])
+    layout = f" {reader.bayer} Bayer" if reader.bayer else ""
+    print(f"{len(reader)} frames of {reader.frame_shape} {reader.dtype}{layout}, "
+          f"{reader.info['frames_written']} captured, {reader.frame_rate():.1f} fps")
+
+
+if __name__ == "__main__":
+    main()
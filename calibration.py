@@ -0,0 +1,94 @@
+import numpy as np
+
+
+class MasterFrameBuilder:
+    """Averages `count` frames into a master dark or flat (float64 sum, no per-frame allocation)"""
+
+    def __init__(self, kind, count):
+        self.kind = kind # "dark" or "flat"
+        self.count = max(1, int(count))
+        self.added = 0
+        self._sum = None
+
+    def add(self, frame):
+        """Adds one frame; returns True once enough frames were collected"""
+        if self._sum is None:
+            self._sum = np.zeros(frame.shape, dtype=np.float64)
+        self._sum += frame
+        self.added += 1
+        return self.added >= self.count
+
+    def result(self):
+        return (self._sum / self.added).astype(np.float32)
+
+
+class Calibration:
+    """
+    Dark-frame and flat-field correction: corrected = (raw - dark) / flat_norm.
+
+    flat_norm is the dark-subtracted flat divided by its mean (per color channel,
+    so the lamp color does not tint the result). All of this is folded into a
+    per-pixel gain = 1 / flat_norm and bias = -dark * gain once, so correcting a
+    frame is raw * gain + bias: two in-place passes into a preallocated buffer
+    and no temporaries. Pixels with a dead flat (norm ~ 0) get gain 0.
+    """
+
+    def __init__(self, dark=None, flat=None):
+        if dark is None and flat is None:
+            raise ValueError("Calibration needs a dark frame, a flat frame or both")
+        self.dark = None if dark is None else np.asarray(dark, dtype=np.float32)
+        self.flat = None if flat is None else np.asarray(flat, dtype=np.float32)
+        self.shape = (self.dark if self.dark is not None else self.flat).shape
+        if self.dark is not None and self.flat is not None and self.dark.shape != self.flat.shape:
+            raise ValueError(f"Dark {self.dark.shape} and flat {self.flat.shape} shapes differ")
+
+        if self.flat is not None:
+            flat = self.flat - self.dark if self.dark is not None else self.flat.copy()
+            mean = flat.mean(axis=(0, 1), keepdims=True)
+            norm = flat / np.where(mean > 0, mean, 1)
+            self.gain = np.where(norm > 1e-3, 1.0 / np.maximum(norm, 1e-3), 0).astype(np.float32)
+        else:
+            self.gain = np.ones(self.shape, dtype=np.float32)
+        self.bias = (-self.dark * self.gain if self.dark is not None else np.zeros(self.shape)).astype(np.float32)
+
+        self._float_out = None
+        self._clipped_out = None
+
+    def matches(self, frame):
+        return frame.shape == self.shape
+
+    def apply(self, raw, out=None):
+        """Corrected frame as float32 (into `out` or an internal reused buffer)"""
+        if out is None:
+            if self._float_out is None or self._float_out.shape != raw.shape:
+                self._float_out = np.empty(raw.shape, dtype=np.float32)
+            out = self._float_out
+        np.multiply(raw, self.gain, out=out)
+        np.add(out, self.bias, out=out)
+        return out
+
+    def apply_clipped(self, raw):
+        """Corrected frame clipped back into raw's integer dtype (reused buffer), for display/saving"""
+        corrected = self.apply(raw)
+        limits = np.iinfo(raw.dtype)
+        np.clip(corrected, limits.min, limits.max, out=corrected)
+        corrected += 0.5 # Round, the cast below truncates
+        if self._clipped_out is None or self._clipped_out.shape != raw.shape or self._clipped_out.dtype != raw.dtype:
+            self._clipped_out = np.empty(raw.shape, dtype=raw.dtype)
+        np.copyto(self._clipped_out, corrected, casting="unsafe")
+        return self._clipped_out
+
+    def save(self, path):
+        """Stores the master frames in a compressed .npz; gain/bias are rebuilt on load"""
+        arrays = {}
+        if self.dark is not None:
+            arrays["dark"] = self.dark
+        if self.flat is not None:
+            arrays["flat"] = self.flat
+        np.savez_compressed(path, **arrays)
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as data:
+            return cls(dark=data["dark"] if "dark" in data else None,
+                       flat=data["flat"] if "flat" in data else None)
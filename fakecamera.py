@@ -0,0 +1,194 @@
+import sys
+import threading
+import time
+import types
+import numpy as np
+
+# Synthetic scenes the stand-in camera can show
+SCENES = ("fringes", "beam", "noise")
+# Precomputed frames cycled through, so generating frames costs nothing per capture
+VARIANTS = 16
+# Raw stream of the stand-in sensor: 12-bit RGGB Bayer data
+RAW_BITS = 12
+
+
+def synthetic_frame(scene, size, step=0, noise=4.0, seed=None):
+    """
+    One RGB888 frame (height, width, 3) of a synthetic scene.
+
+    fringes - cosine fringes (period 24 px) drifting a little with `step`
+    beam    - elliptical Gaussian beam wandering around the frame center
+    noise   - uniform mid-gray with sensor-like noise only
+    """
+    width, height = size
+    rng = np.random.default_rng(seed)
+    y, x = np.mgrid[0:height, 0:width].astype(np.float32)
+    if scene == "fringes":
+        image = 128 + 100 * np.cos(2 * np.pi * x / 24.0 + 0.3 * step)
+    elif scene == "beam":
+        cx = width / 2 + 0.05 * width * np.cos(0.4 * step)
+        cy = height / 2 + 0.05 * height * np.sin(0.4 * step)
+        sx, sy = 0.08 * width, 0.05 * height
+        image = 20 + 220 * np.exp(-2 * (((x - cx) / sx) ** 2 + ((y - cy) / sy) ** 2))
+    elif scene == "noise":
+        image = np.full((height, width), 128.0, dtype=np.float32)
+    else:
+        raise ValueError(f"Unknown scene: {scene} (choose from {', '.join(SCENES)})")
+    image = image + rng.normal(0, noise, image.shape)
+    gray = np.clip(image, 0, 255).astype(np.uint8)
+    return np.repeat(gray[:, :, None], 3, axis=2)
+
+
+def mosaic(frame, bits=RAW_BITS):
+    """RGGB Bayer mosaic (uint16, `bits` significant) of an RGB frame, sampled directly"""
+    scale = (2 ** bits - 1) / 255.0
+    raw = np.empty(frame.shape[:2], dtype=np.uint16)
+    raw[0::2, 0::2] = frame[0::2, 0::2, 0] * scale
+    raw[0::2, 1::2] = frame[0::2, 1::2, 1] * scale
+    raw[1::2, 0::2] = frame[1::2, 0::2, 1] * scale
+    raw[1::2, 1::2] = frame[1::2, 1::2, 2] * scale
+    return raw
+
+
+class FakeRequest:
+    """Completed request of the stand-in camera (main and raw buffers)"""
+
+    def __init__(self, arrays):
+        self.arrays = arrays
+
+    def make_array(self, name="main"):
+        return self.arrays[name]
+
+    def release(self):
+        self.arrays = None
+
+
+class FakePicamera2:
+    """
+    Stand-in for picamera2.Picamera2 that serves synthetic frames, for running
+    the apps and benchmarks on machines without a camera.
+
+    Implements the calls the apps make (configurations, start/stop,
+    capture_array, capture_request). The main stream always has the class-level
+    `size`, whatever the app asks for, so benchmarks can vary the resolution
+    without touching the app. Captures block until the next frame is
+    due at `fps` (0 = as fast as possible), like the real camera. The raw stream
+    is an unpacked 12-bit RGGB buffer with the same stride layout as libcamera's
+    (uint8 rows, two bytes per pixel).
+    """
+
+    # Settings picked up by new instances (see install())
+    scene = "fringes"
+    size = (640, 480)
+    sensor_size = (1280, 960)
+    fps = 30.0
+
+    def __init__(self, camera_num=0):
+        self.sensor_modes = [{"size": self.sensor_size, "bit_depth": RAW_BITS, "format": "SRGGB12_CSI2P",
+                              "unpacked": "SRGGB12", "fps": self.fps}]
+        self.config = None
+        self.started = False
+        self.frames_served = 0
+        self._frames = {}
+        self._next_frame = 0.0
+        self._lock = threading.Lock()
+
+    # --- Configuration ---
+    def create_preview_configuration(self, main=None, raw=None, **kwargs):
+        config = {"main": dict(main or {}, size=self.size)}
+        if raw is not None:
+            config["raw"] = {"size": self.sensor_size, "format": "SRGGB12"}
+            config["raw"].update(raw)
+        return config
+
+    def create_still_configuration(self, main=None, raw=None, **kwargs):
+        config = self.create_preview_configuration(main, raw)
+        config["main"]["size"] = self.sensor_size
+        return config
+
+    create_video_configuration = create_preview_configuration
+
+    def configure(self, config):
+        self.config = config
+        # Render the scene now so the first capture is not slower than the rest
+        self._frames = {}
+        for name in config:
+            self._stream(name)
+
+    def set_controls(self, controls):
+        pass
+
+    # --- Streaming ---
+    def start(self):
+        self.started = True
+        self._next_frame = time.perf_counter()
+
+    def stop(self):
+        self.started = False
+
+    def close(self):
+        self.stop()
+
+    def _stream(self, name):
+        """Precomputed frames of one stream (rendered once per configuration)"""
+        frames = self._frames.get(name)
+        if frames is None:
+            stream = self.config[name]
+            if name == "raw":
+                width, height = stream["size"]
+                rgb = [synthetic_frame(self.scene, (width, height), step, seed=step) for step in range(VARIANTS)]
+                # Unpacked layout: two bytes per pixel in uint8 rows
+                frames = [mosaic(frame).view(np.uint8).reshape(height, 2 * width) for frame in rgb]
+            else:
+                frames = [synthetic_frame(self.scene, stream["size"], step, seed=step) for step in range(VARIANTS)]
+            self._frames[name] = frames
+        return frames
+
+    def _wait_for_frame(self):
+        if not self.started:
+            raise RuntimeError("Camera is not started")
+        with self._lock:
+            if self.fps > 0:
+                now = time.perf_counter()
+                if self._next_frame > now:
+                    time.sleep(self._next_frame - now)
+                # Frames that were missed are dropped, as on the real sensor
+                self._next_frame = max(self._next_frame + 1.0 / self.fps, time.perf_counter())
+            index = self.frames_served % VARIANTS
+            self.frames_served += 1
+        return index
+
+    def capture_array(self, name="main"):
+        index = self._wait_for_frame()
+        return self._stream(name)[index].copy()
+
+    def capture_request(self):
+        index = self._wait_for_frame()
+        arrays = {"main": self._stream("main")[index].copy()}
+        if "raw" in self.config:
+            arrays["raw"] = self._stream("raw")[index].copy()
+        return FakeRequest(arrays)
+
+    def switch_mode_and_capture_array(self, camera_config, name="main"):
+        """One frame from another configuration; the current one stays active afterwards"""
+        index = self._wait_for_frame()
+        # Rendered on demand: a single still is cheaper than precomputing every variant
+        return synthetic_frame(self.scene, camera_config[name]["size"], index, seed=index)
+
+
+def install(scene="fringes", size=(640, 480), fps=30.0, sensor_size=None):
+    """
+    Registers FakePicamera2 as picamera2.Picamera2 in sys.modules, so that
+    `from picamera2 import Picamera2` in the apps picks up the stand-in.
+    Call before importing the app module.
+    """
+    if scene not in SCENES:
+        raise ValueError(f"Unknown scene: {scene} (choose from {', '.join(SCENES)})")
+    FakePicamera2.scene = scene
+    FakePicamera2.size = tuple(size)
+    FakePicamera2.sensor_size = tuple(sensor_size or (2 * size[0], 2 * size[1]))
+    FakePicamera2.fps = float(fps)
+    module = types.ModuleType("picamera2")
+    module.Picamera2 = FakePicamera2
+    sys.modules["picamera2"] = module
+    return FakePicamera2
@@ -0,0 +1,70 @@
+import numpy as np
+
+
+class FrameStacker:
+    """
+    Incremental frame averaging for noisy short exposures.
+
+    mode "mean": running mean of the last `window` frames. The float32 sum is
+    updated in place by adding the new frame and subtracting the one leaving the
+    window, which is kept in a preallocated ring of raw frames.
+    mode "ema": exponential moving average with alpha = 2 / (window + 1), the
+    same effective span as a `window`-frame mean.
+
+    Buffers are allocated on the first frame (or when the frame shape changes);
+    after that add() performs no allocation. The returned array is a reused
+    output buffer in the frame's dtype, overwritten by the next add().
+    """
+
+    def __init__(self, mode="mean", window=10):
+        self.mode = mode
+        self.window = max(1, int(window))
+        self.alpha = 2.0 / (self.window + 1)
+        self.count = 0
+        self._shape = None
+        self._dtype = None
+
+    def _allocate(self, frame):
+        self._shape = frame.shape
+        self._dtype = frame.dtype
+        self._acc = np.zeros(frame.shape, dtype=np.float32)
+        self._scratch = np.empty(frame.shape, dtype=np.float32)
+        self._output = np.empty(frame.shape, dtype=frame.dtype)
+        if self.mode == "mean":
+            self._ring = np.empty((self.window,) + frame.shape, dtype=frame.dtype)
+        self.count = 0
+
+    def reset(self):
+        self._shape = None
+        self.count = 0
+
+    def add(self, frame):
+        """Adds one frame and returns the current average (a reused buffer)"""
+        if frame.shape != self._shape or frame.dtype != self._dtype:
+            self._allocate(frame)
+
+        acc = self._acc
+        if self.mode == "ema":
+            if self.count == 0:
+                acc[...] = frame
+            else:
+                # acc += alpha * (frame - acc)
+                np.subtract(frame, acc, out=self._scratch)
+                self._scratch *= self.alpha
+                acc += self._scratch
+            self.count += 1
+            self._scratch[...] = acc
+        else:
+            slot = self.count % self.window
+            if self.count >= self.window:
+                acc -= self._ring[slot]
+            acc += frame
+            self._ring[slot] = frame
+            self.count += 1
+            np.multiply(acc, 1.0 / min(self.count, self.window), out=self._scratch)
+
+        # Round back to the frame's dtype for display and saving
+        if np.issubdtype(self._dtype, np.integer):
+            self._scratch += 0.5
+        np.copyto(self._output, self._scratch, casting="unsafe")
+        return self._output
@@ -0,0 +1,190 @@
+import argparse
+import sys
+from functools import lru_cache
+import numpy as np
+from profiles import bbox_to_indices, luminance
+from rawimage import bayer_to_rgb
+
+# Fastest FFT available: pyFFTW (planned FFTW transforms, plans cached between
+# calls), then scipy.fft (pocketfft with threads), then numpy.fft
+try:
+    import pyfftw
+    import pyfftw.interfaces.numpy_fft as fft
+    pyfftw.interfaces.cache.enable()
+    pyfftw.interfaces.cache.set_keepalive_time(60)
+    FFT_BACKEND = "pyfftw"
+    _fft_kwargs = {"threads": -1}
+except ImportError:
+    try:
+        import scipy.fft as fft
+        FFT_BACKEND = "scipy"
+        _fft_kwargs = {"workers": -1}
+    except ImportError:
+        fft = np.fft
+        FFT_BACKEND = "numpy"
+        _fft_kwargs = {}
+
+# Largest 2D spectrum side; bigger crops use their central region
+MAX_FFT2_SIZE = 512
+# Profiles per vectorized block in burst mode
+BURST_CHUNK = 256
+
+
+@lru_cache(maxsize=64)
+def window(length):
+    """Hann window of a given length (cached; read-only)"""
+    w = np.hanning(length) if length > 1 else np.ones(length)
+    w.flags.writeable = False
+    return w
+
+
+@lru_cache(maxsize=64)
+def frequency_axis(length):
+    """rFFT bin frequencies in cycles per pixel (cached; read-only)"""
+    f = np.fft.rfftfreq(length)
+    f.flags.writeable = False
+    return f
+
+
+@lru_cache(maxsize=16)
+def window_2d(height, width):
+    w = np.outer(window(height), window(width))
+    w.flags.writeable = False
+    return w
+
+
+def power_spectrum(profile):
+    """(frequencies, power) of a 1D profile, mean removed and Hann-windowed"""
+    profile = np.asarray(profile, dtype=np.float64)
+    spectrum = fft.rfft((profile - profile.mean()) * window(len(profile)), **_fft_kwargs)
+    return frequency_axis(len(profile)), np.abs(spectrum) ** 2
+
+
+def fringe_metrics_batch(profiles):
+    """
+    Fringe metrics for a stack of equal-length profiles (N, length) in one rFFT.
+
+    Returns a dict of (N,) arrays:
+      frequency - dominant spatial frequency in cycles/pixel (sub-bin, Gaussian
+                  interpolation of the windowed peak)
+      spacing   - fringe period in pixels (1 / frequency)
+      contrast  - fringe visibility, amplitude of the dominant component over the
+                  mean level ((Imax - Imin) / (Imax + Imin) for clean fringes)
+      phase     - phase of the dominant component at the first sample (radians)
+    """
+    profiles = np.atleast_2d(np.asarray(profiles, dtype=np.float64))
+    count, length = profiles.shape
+    nan = np.full(count, np.nan)
+    if length < 4:
+        return {"frequency": nan, "spacing": nan.copy(), "contrast": nan.copy(), "phase": nan.copy()}
+
+    w = window(length)
+    means = profiles.mean(axis=1)
+    spectra = fft.rfft((profiles - means[:, None]) * w, axis=1, **_fft_kwargs)
+    power = spectra.real ** 2 + spectra.imag ** 2
+
+    # Dominant bin above DC, refined to sub-bin precision by a parabola through
+    # the log power of its neighbours (exact for the Gaussian-like Hann peak)
+    peak = np.argmax(power[:, 1:], axis=1) + 1
+    rows = np.arange(count)
+    inner = peak < power.shape[1] - 1
+    side = np.minimum(peak + 1, power.shape[1] - 1)
+    floor = np.finfo(np.float64).tiny
+    left, mid, right = (np.log(np.maximum(power[rows, i], floor)) for i in (peak - 1, peak, side))
+    curvature = left - 2 * mid + right
+    with np.errstate(divide="ignore", invalid="ignore"):
+        delta = np.where(inner & (curvature < 0), 0.5 * (left - right) / curvature, 0.0)
+    frequency = (peak + np.clip(delta, -0.5, 0.5)) / length
+
+    # Amplitude corrected for scalloping: an off-bin tone only gets the window's
+    # response at its offset from the bin center, not the full w.sum()
+    offset = frequency * length - peak
+    response = np.abs(np.exp(-2j * np.pi / length * np.outer(offset, np.arange(length))) @ w)
+    amplitude = 2 * np.abs(spectra[rows, peak]) / response
+    with np.errstate(divide="ignore", invalid="ignore"):
+        spacing = np.where(frequency > 0, 1.0 / frequency, np.nan)
+        contrast = np.where(means > 0, amplitude / means, np.nan)
+    # The symmetric window adds a linear phase of pi * offset * (N - 1) / N for an off-bin peak
+    phase = np.angle(spectra[rows, peak]) - np.pi * offset * (length - 1) / length
+    phase = (phase + np.pi) % (2 * np.pi) - np.pi
+    return {"frequency": frequency, "spacing": spacing, "contrast": contrast, "phase": phase}
+
+
+def fringe_metrics(profile):
+    """fringe_metrics_batch for one profile: {name: float}"""
+    return {name: float(values[0]) for name, values in fringe_metrics_batch(profile).items()}
+
+
+def power_spectrum_2d(crop):
+    """
+    Log power spectrum of a 2D region, DC centered.
+
+    Returns (log10(1 + power), fx, fy) with fx/fy in cycles per pixel. Regions
+    larger than MAX_FFT2_SIZE are cut to their central part so the spectrum
+    stays interactive.
+    """
+    crop = np.asarray(crop, dtype=np.float64)
+    height, width = crop.shape
+    if height > MAX_FFT2_SIZE:
+        top = (height - MAX_FFT2_SIZE) // 2
+        crop = crop[top:top + MAX_FFT2_SIZE]
+    if width > MAX_FFT2_SIZE:
+        left = (width - MAX_FFT2_SIZE) // 2
+        crop = crop[:, left:left + MAX_FFT2_SIZE]
+    height, width = crop.shape
+
+    spectrum = fft.fft2((crop - crop.mean()) * window_2d(height, width), **_fft_kwargs)
+    power = np.log10(1 + np.abs(fft.fftshift(spectrum)) ** 2)
+    return power, fft.fftshift(np.fft.fftfreq(width)), fft.fftshift(np.fft.fftfreq(height))
+
+
+def burst_profiles(reader, bbox, direction="Horizontal"):
+    """
+    Yields (first frame index, (chunk, length) intensity profiles) for a burst
+    file, one block of frames at a time. Raw Bayer bursts are binned to RGB
+    first, so `bbox` is in the same half-resolution pixels as the live profile.
+    """
+    height, width = reader.frame_shape[:2]
+    scale = 2 if reader.bayer else 1
+    x1, y1, x2, y2 = bbox_to_indices(bbox, width // scale, height // scale)
+    if x2 <= x1 or y2 <= y1:
+        raise ValueError("ROI is empty")
+    axis = 1 if direction == "Horizontal" else 2
+    rows, cols = slice(y1 * scale, y2 * scale), slice(x1 * scale, x2 * scale)
+    for start in range(0, len(reader), BURST_CHUNK):
+        # Memory-mapped: only the ROI of this block is read
+        block = reader.frames(slice(start, start + BURST_CHUNK), rows, cols)
+        if reader.bayer:
+            block = bayer_to_rgb(block, reader.bayer)
+        if block.ndim == 4:
+            block = luminance(block)
+        yield start, block.mean(axis=axis)
+
+
+def main(argv=None):
+    from batchprofile import DIRECTIONS, parse_bbox
+    from burst import BurstReader
+    from profileio import TableWriter
+
+    parser = argparse.ArgumentParser(description="Fringe spacing, frequency and contrast for every frame of a burst file")
+    parser.add_argument("burst", help="burst file recorded by the camera app")
+    parser.add_argument("--bbox", type=parse_bbox, required=True, help="ROI as x1,y1,x2,y2 in pixels")
+    parser.add_argument("--direction", default="Horizontal", type=str.lower, choices=sorted(DIRECTIONS),
+                        help="profile direction (default: horizontal)")
+    parser.add_argument("-o", "--output", default="fringes.csv", help="output table: .csv, .npz, .npy, .parquet or .h5")
+    args = parser.parse_args(argv)
+
+    reader = BurstReader(args.burst)
+    times = reader.timestamps
+    headers = ["Frame", "Time", "Frequency (1/px)", "Spacing (px)", "Contrast", "Phase (rad)"]
+    with TableWriter(args.output, headers) as writer:
+        for start, profiles in burst_profiles(reader, args.bbox, DIRECTIONS[args.direction]):
+            metrics = fringe_metrics_batch(profiles)
+            frames = np.arange(start, start + len(profiles))
+            writer.write([frames, times[frames], metrics["frequency"], metrics["spacing"],
+                          metrics["contrast"], metrics["phase"]])
+    print(f"Analyzed {len(reader)} frames ({FFT_BACKEND} FFT) -> {args.output}")
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -1,10 +1,11 @@
 import tkinter as tk
 from tkinter import filedialog
-from PIL import Image, ImageTk, ImageDraw
+from PIL import Image, ImageDraw
 import numpy as np
 import matplotlib.pyplot as plt
 from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
 import csv
+from tileviewer import TiledImageView
 
 class ImageAnalysisApp(tk.Frame):
     def __init__(self, master=None):
@@ -19,6 +20,8 @@ class ImageAnalysisApp(tk.Frame):
 
         self.canvas = tk.Canvas(self, bg="white", width=1024, height=768)
         self.canvas.pack()
+        # Tiled pyramid display: wheel zooms, right/middle drag pans
+        self.view = TiledImageView(self.canvas, on_view_change=self.draw_roi)
 
         self.save_button = tk.Button(self, text="Save as CSV", command=self.save_csv, state=tk.DISABLED)
         self.save_button.pack()
@@ -31,39 +34,47 @@ class ImageAnalysisApp(tk.Frame):
         self.start_x = None
         self.start_y = None
         self.rect = None
+        self.roi = None # Rectangle corners in full-resolution image pixels
         self.image = None
-        self.image_id = None
         self.plot_figure = None
 
     def open_image(self):
         file_path = filedialog.askopenfilename(filetypes=[("Image files", "*.jpg *.png *.jpeg")])
         if file_path:
             self.image = Image.open(file_path)
-            self.tk_image = ImageTk.PhotoImage(self.image)
-            self.canvas.config(scrollregion=(0, 0, self.image.width, self.image.height))
-            self.image_id = self.canvas.create_image(0, 0, anchor="nw", image=self.tk_image)
+            self.view.set_image(self.image)
 
     def on_button_press(self, event):
-        if self.image_id is not None:  # Only start drawing the rectangle if an image is loaded
-            # save mouse drag start position
-            self.start_x = self.canvas.canvasx(event.x)
-            self.start_y = self.canvas.canvasy(event.y)
+        if self.image is not None:  # Only start drawing the rectangle if an image is loaded
+            # save mouse drag start position (image coordinates)
+            self.start_x, self.start_y = self.view.canvas_to_image(self.canvas.canvasx(event.x), self.canvas.canvasy(event.y))
+            self.roi = [self.start_x, self.start_y, self.start_x, self.start_y]
 
             # create rectangle if not yet exist
             if not self.rect:
-                self.rect = self.canvas.create_rectangle(self.start_x, self.start_y, self.start_x, self.start_y, outline='red')
+                self.rect = self.canvas.create_rectangle(0, 0, 0, 0, outline='red')
+            self.draw_roi()
 
     def on_move_press(self, event):
-        cur_x = self.canvas.canvasx(event.x)
-        cur_y = self.canvas.canvasy(event.y)
+        if not self.rect:
+            return
+        cur_x, cur_y = self.view.canvas_to_image(self.canvas.canvasx(event.x), self.canvas.canvasy(event.y))
 
         # expand rectangle as you drag the mouse
-        self.canvas.coords(self.rect, self.start_x, self.start_y, cur_x, cur_y)
+        self.roi = [self.start_x, self.start_y, cur_x, cur_y]
+        self.draw_roi()
+
+    def draw_roi(self):
+        # Map the image-space rectangle onto the canvas for the current zoom/pan
+        if self.rect and self.roi:
+            x1, y1 = self.view.image_to_canvas(self.roi[0], self.roi[1])
+            x2, y2 = self.view.image_to_canvas(self.roi[2], self.roi[3])
+            self.canvas.coords(self.rect, x1, y1, x2, y2)
 
     def on_button_release(self, event):
         if self.rect and self.image:
-            # Transform canvas coordinates to image coordinates
-            bbox = self.canvas.coords(self.rect)
+            # The ROI is already stored in image coordinates
+            bbox = list(self.roi)
             bbox[0] = max(0, min(self.image.width - 1, bbox[0]))
             bbox[1] = max(0, min(self.image.height - 1, bbox[1]))
             bbox[2] = max(0, min(self.image.width - 1, bbox[2]))
@@ -0,0 +1,175 @@
+import os
+import threading
+from collections import OrderedDict
+import numpy as np
+from profiles import ProfileCache
+from rawimage import display_image, intensity_label, load_array
+
+# Memory budget of decoded images while browsing (data, display copy, planes, prefix sums, pyramid)
+MAX_CACHE_BYTES = 512 * 2**20
+# Files on each side of the current one decoded ahead of time
+PREFETCH_RADIUS = 1
+
+
+def build_profile_cache(data, calibration=None):
+    """
+    ProfileCache of an image's pixels, dark/flat corrected when a matching
+    calibration is given. Returns (cache, profile axis label).
+    """
+    array = data
+    if calibration is not None:
+        if calibration.matches(data):
+            array = calibration.apply(data, out=np.empty(data.shape, dtype=np.float32))
+        else:
+            print(f"Calibration {calibration.shape} does not match image {data.shape}; not applied")
+    return ProfileCache(array), intensity_label(array)
+
+
+class DecodedImage:
+    """One file ready to show: full-precision data, 8-bit display copy, pyramid levels and profile tables"""
+
+    def __init__(self, path, data, calibration=None):
+        self.path = path
+        self.data = data
+        self.display = display_image(data)
+        self.levels = [self.display] # Filled in place by TiledImageView
+        self.cache, self.value_label = build_profile_cache(data, calibration)
+
+    @property
+    def nbytes(self):
+        size = self.data.nbytes + self.cache.nbytes()
+        if self.cache.array is not self.data:
+            size += self.cache.array.nbytes
+        for level in self.levels:
+            if level is not None:
+                size += level.width * level.height * len(level.getbands())
+        return size
+
+
+def decode_image(path, calibration=None, table=None):
+    """
+    Loads a file into a DecodedImage. `table` = (mode, direction) also builds
+    that prefix-sum table, so the first profile of a prefetched image is instant.
+    """
+    image = DecodedImage(path, load_array(path), calibration)
+    if table is not None:
+        image.cache.table(*table)
+    return image
+
+
+class ImageCache:
+    """
+    Byte-limited LRU of decoded images for flipping through a folder.
+
+    `loader(path, background)` turns a file into an entry with an `nbytes`
+    property; `background` is True for prefetch decodes, which may do extra work
+    up front that get() leaves for later. Entries
+    keep growing after they are cached (tables and pyramid levels are built
+    lazily), so sizes are measured again every time the cache trims itself;
+    the image being shown is never evicted. One background thread decodes
+    prefetch requests, nearest first; get() for a file that thread is decoding
+    waits for it instead of decoding it twice.
+    """
+
+    def __init__(self, loader, max_bytes=MAX_CACHE_BYTES):
+        self.loader = loader
+        self.max_bytes = max_bytes
+        self.current = None # Path of the image on screen
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._loading = {} # path -> Event set when its decode finishes
+        self._wanted = [] # Prefetch queue, nearest first
+        self._generation = 0 # Bumped by clear(): decodes started earlier are not cached
+        self._lock = threading.Lock()
+        self._wake = threading.Condition(self._lock)
+        self._thread = None
+
+    def __contains__(self, path):
+        return path in self._entries
+
+    def get(self, path):
+        """Entry for a file: cached, finished by the prefetch thread, or decoded now"""
+        while True:
+            with self._lock:
+                self.current = path
+                entry = self._entries.get(path)
+                if entry is not None:
+                    self._entries.move_to_end(path)
+                    self.hits += 1
+                    return entry
+                event = self._loading.get(path)
+                if event is None:
+                    self.misses += 1
+                    event = self._loading[path] = threading.Event()
+                    generation = self._generation
+                    break
+            # Being prefetched: wait, then take it from the cache (or decode here if that failed)
+            event.wait()
+        return self._load(path, event, generation, False)
+
+    def _load(self, path, event, generation, background):
+        try:
+            entry = self.loader(path, background)
+            with self._lock:
+                if generation == self._generation:
+                    self._entries[path] = entry
+                    self._trim()
+            return entry
+        finally:
+            with self._lock:
+                del self._loading[path]
+            event.set()
+
+    def _trim(self):
+        # Oldest first, skipping the image on screen
+        total = sum(entry.nbytes for entry in self._entries.values())
+        for path in list(self._entries):
+            if total <= self.max_bytes:
+                break
+            if path != self.current:
+                total -= self._entries.pop(path).nbytes
+
+    def prefetch(self, paths):
+        """Decodes these files in the background (nearest first), replacing any earlier request"""
+        with self._lock:
+            self._wanted = [path for path in paths if path not in self._entries]
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._prefetch_loop, daemon=True)
+                self._thread.start()
+            self._wake.notify()
+
+    def _prefetch_loop(self):
+        while True:
+            with self._lock:
+                while not self._wanted:
+                    self._wake.wait()
+                path = self._wanted.pop(0)
+                if path in self._entries or path in self._loading:
+                    continue
+                event = self._loading[path] = threading.Event()
+                generation = self._generation
+            try:
+                self._load(path, event, generation, True)
+            except Exception as e:
+                print(f"Prefetch failed for {os.path.basename(path)}: {e}")
+
+    def clear(self):
+        """Drops every entry (e.g. after the calibration changed)"""
+        with self._lock:
+            self._entries.clear()
+            self._wanted = []
+            self._generation += 1
+
+    @property
+    def nbytes(self):
+        with self._lock:
+            return sum(entry.nbytes for entry in self._entries.values())
+
+
+def neighbors(index, count, radius=PREFETCH_RADIUS):
+    """Indices around `index` to prefetch, nearest first, forward before backward"""
+    order = []
+    for step in range(1, radius + 1):
+        order += [i for i in (index + step, index - step) if 0 <= i < count]
+    return order
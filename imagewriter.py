@@ -0,0 +1,118 @@
+import os
+import queue
+import re
+import threading
+import time
+from rawimage import save_frame
+
+
+class ImageWriterService:
+    """
+    Background image encoder and writer.
+
+    Frames (NumPy arrays or PIL images) go into a bounded queue that a small pool
+    of threads drains, so PNG/JPEG encoding and disk I/O never run on the Tk thread.
+    Raw high bit depth frames are written as .npy or 16-bit TIFF, with their
+    Bayer layout in a sidecar (see save_frame).
+    PIL releases the GIL while encoding, so threads scale across cores.
+    When the queue is full submit() refuses the frame instead of blocking, and
+    the refusal is counted so the UI can report that the disk is falling behind.
+
+    Without an explicit path, files are auto-named in `directory` either by
+    timestamp (prefix_YYYYmmdd_HHMMSS_mmm.ext) or by sequence (prefix_0001.ext).
+    `on_done(path, error)` is called from the writer thread after each file.
+    """
+
+    def __init__(self, directory=".", prefix="snapshot", extension=".png", naming="timestamp",
+                 workers=2, max_pending=8, on_done=None):
+        self.directory = directory
+        self.prefix = prefix
+        self.naming = naming
+        self.on_done = on_done
+
+        self.written = 0
+        self.dropped = 0
+        self.errors = 0
+        self._lock = threading.Lock()
+        self.extension = extension # Also finds the last sequence number in use
+        self._last_stamp = None
+        self._repeat = 0
+        self._queue = queue.Queue(maxsize=max_pending)
+        self._threads = [threading.Thread(target=self._worker, daemon=True) for _ in range(workers)]
+        for thread in self._threads:
+            thread.start()
+
+    @property
+    def extension(self):
+        return self._extension
+
+    @extension.setter
+    def extension(self, extension):
+        # Numbering continues per extension: snapshot_0007.npy may exist when the .png files stop at 3
+        with self._lock:
+            self._extension = extension
+            self._sequence = self._last_sequence_number()
+
+    def _last_sequence_number(self):
+        # Continue numbering after existing files so nothing is overwritten
+        pattern = re.compile(re.escape(self.prefix) + r"_(\d+)" + re.escape(self.extension) + "$")
+        numbers = [int(m.group(1)) for m in map(pattern.match, os.listdir(self.directory or ".")) if m]
+        return max(numbers, default=0)
+
+    def next_path(self):
+        with self._lock:
+            if self.naming == "sequence":
+                self._sequence += 1
+                name = f"{self.prefix}_{self._sequence:04d}{self.extension}"
+            else:
+                now = time.time()
+                stamp = time.strftime("%Y%m%d_%H%M%S", time.localtime(now)) + f"_{int(now * 1000) % 1000:03d}"
+                # Several shots in the same millisecond get a counter suffix
+                self._repeat = self._repeat + 1 if stamp == self._last_stamp else 0
+                self._last_stamp = stamp
+                if self._repeat:
+                    stamp += f"_{self._repeat}"
+                name = f"{self.prefix}_{stamp}{self.extension}"
+        return os.path.join(self.directory, name)
+
+    @property
+    def pending(self):
+        return self._queue.qsize()
+
+    def submit(self, frame, path=None, raw_info=None):
+        """Queues a frame for writing; returns its path, or None if the queue is full"""
+        if path is None:
+            path = self.next_path()
+        try:
+            self._queue.put_nowait((frame, path, raw_info))
+        except queue.Full:
+            with self._lock:
+                self.dropped += 1
+            return None
+        return path
+
+    def _worker(self):
+        while True:
+            item = self._queue.get()
+            if item is None:
+                break
+            frame, path, raw_info = item
+            error = None
+            try:
+                save_frame(frame, path, raw_info)
+                with self._lock:
+                    self.written += 1
+            except Exception as e:
+                error = e
+                with self._lock:
+                    self.errors += 1
+            if self.on_done:
+                self.on_done(path, error)
+
+    def close(self, wait=True):
+        """Stops the workers after the queued frames are written"""
+        for _ in self._threads:
+            self._queue.put(None)
+        if wait:
+            for thread in self._threads:
+                thread.join()
@@ -0,0 +1,225 @@
+import argparse
+import json
+import os
+import sys
+import threading
+import numpy as np
+from profileio import TableWriter
+
+# File layout:
+#   [4096-byte header: MAGIC + JSON (length, direction, origin, rows)]
+#   [rows x record: float64 timestamp + length float32 profile values], appended chunk by chunk
+MAGIC = b"OPTKYMOG"
+HEADER_SIZE = 4096
+VERSION = 1
+# Rows buffered in memory and appended to the file with one write
+CHUNK_ROWS = 256
+# Rows kept in memory for the scrolling display
+DISPLAY_ROWS = 480
+
+
+def record_dtype(length):
+    """One kymograph row on disk: timestamp and profile"""
+    return np.dtype([("time", "<f8"), ("profile", "<f4", (int(length),))])
+
+
+def _write_header(file, info):
+    text = MAGIC + json.dumps(info).encode("utf-8")
+    if len(text) > HEADER_SIZE:
+        raise ValueError("Kymograph header too large")
+    file.seek(0)
+    file.write(text.ljust(HEADER_SIZE, b" "))
+
+
+class KymographWriter:
+    """
+    Append-only on-disk time series of equal-length profiles (one row per frame).
+
+    Rows are copied into a preallocated chunk and appended to the file with one
+    write when it is full, so memory stays at one chunk however long the
+    recording runs. The header's row count is refreshed on every flush; a reader
+    also trusts the file size, so a recording cut short still opens.
+    """
+
+    def __init__(self, path, length, direction="Horizontal", origin=0, chunk_rows=CHUNK_ROWS):
+        self.path = path
+        self.length = int(length)
+        self.rows = 0
+        self.skipped = 0 # Profiles of another length (ROI changed while recording)
+        self.info = {"version": VERSION, "length": self.length, "direction": direction,
+                     "origin": float(origin), "rows": 0}
+        self._chunk = np.zeros(int(chunk_rows), dtype=record_dtype(self.length))
+        self._filled = 0
+        self._lock = threading.Lock()
+        self._file = open(path, "wb")
+        _write_header(self._file, self.info)
+
+    def append(self, timestamp, profile):
+        """Adds one row; returns False (and counts it) when the profile length does not match"""
+        if len(profile) != self.length:
+            self.skipped += 1
+            return False
+        with self._lock:
+            if self._file is None:
+                return False
+            row = self._chunk[self._filled]
+            row["time"] = timestamp
+            row["profile"] = profile
+            self._filled += 1
+            if self._filled == len(self._chunk):
+                self._flush()
+        return True
+
+    def _flush(self):
+        if self._filled:
+            self._file.seek(0, os.SEEK_END)
+            self._file.write(self._chunk[:self._filled].tobytes())
+            self.rows += self._filled
+            self._filled = 0
+            self.info["rows"] = self.rows
+            _write_header(self._file, self.info)
+            self._file.flush()
+
+    def flush(self):
+        with self._lock:
+            if self._file is not None:
+                self._flush()
+
+    def close(self):
+        with self._lock:
+            if self._file is not None:
+                self._flush()
+                self._file.close()
+                self._file = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class KymographReader:
+    """
+    Read-only, memory-mapped view of a kymograph file.
+
+    Only the rows that are indexed or iterated are read from disk, so hours of
+    data can be exported or summarized chunk by chunk.
+    """
+
+    def __init__(self, path):
+        with open(path, "rb") as file:
+            header = file.read(HEADER_SIZE)
+        if not header.startswith(MAGIC):
+            raise ValueError(f"{path} is not a kymograph file")
+        self.path = path
+        self.info = json.loads(header[len(MAGIC):].decode("utf-8").rstrip())
+        self.length = self.info["length"]
+        self.direction = self.info.get("direction", "Horizontal")
+        self.origin = self.info.get("origin", 0.0)
+        self.dtype = record_dtype(self.length)
+
+        # Whole rows present on disk (the header count lags behind an interrupted recording)
+        rows = (os.path.getsize(path) - HEADER_SIZE) // self.dtype.itemsize
+        self._records = np.memmap(path, dtype=self.dtype, mode="r", offset=HEADER_SIZE, shape=(rows,)) if rows else \
+            np.empty(0, dtype=self.dtype)
+
+    def __len__(self):
+        return len(self._records)
+
+    def __getitem__(self, index):
+        return self._records[index]["profile"]
+
+    @property
+    def timestamps(self):
+        return np.asarray(self._records["time"])
+
+    def positions(self):
+        """Absolute sensor pixel of every profile sample"""
+        return np.arange(self.length, dtype=np.float64) + self.origin
+
+    def chunks(self, rows=CHUNK_ROWS):
+        """Yields (timestamps, (rows, length) profiles) blocks in recording order"""
+        for start in range(0, len(self), rows):
+            block = self._records[start:start + rows]
+            yield np.asarray(block["time"]), np.asarray(block["profile"])
+
+    def export(self, path, rows=CHUNK_ROWS * 16):
+        """
+        Writes the whole recording without loading it: .npy becomes a structured
+        array (Time, Profile) filled through a memory map, every other format is a
+        wide table (Time, one column per pixel) streamed through TableWriter.
+        """
+        if path.lower().endswith(".npy"):
+            table = np.lib.format.open_memmap(path, mode="w+", dtype=[("Time", "<f8"), ("Profile", "<f4", (self.length,))],
+                                              shape=(len(self),))
+            for start, (times, profiles) in zip(range(0, len(self), rows), self.chunks(rows)):
+                table["Time"][start:start + len(times)] = times
+                table["Profile"][start:start + len(times)] = profiles
+            table.flush()
+            return
+        if path.lower().endswith(".npz"):
+            raise ValueError("Kymograph export to .npz would reread the recording once per pixel column; use .npy")
+        headers = ["Time"] + [f"{p:g} px" for p in self.positions()]
+        with TableWriter(path, headers) as writer:
+            for times, profiles in self.chunks(rows):
+                writer.write([times] + list(profiles.T))
+
+
+class KymographDisplay:
+    """
+    Fixed ring of the latest rows for the scrolling kymograph image.
+
+    add() copies one profile into the ring; image() returns the rows in time
+    order (newest at the bottom) scaled to 8 bits over the visible range.
+    """
+
+    def __init__(self, length, rows=DISPLAY_ROWS):
+        self.length = int(length)
+        self.ring = np.zeros((int(rows), self.length), dtype=np.float32)
+        self.count = 0
+
+    def add(self, profile):
+        if len(profile) != self.length:
+            return
+        self.ring[self.count % len(self.ring)] = profile
+        self.count += 1
+
+    def image(self):
+        """(rows, length) uint8 array, oldest row at the top"""
+        rows = len(self.ring)
+        filled = min(self.count, rows)
+        # Rows never written yet stay black at the top
+        out = np.zeros((rows, self.length), dtype=np.uint8)
+        if not filled:
+            return out
+        # Unwrap the ring; only the written rows are scaled, so the range they set
+        # (which may be negative for calibrated profiles) never shifts the empty rows
+        start = self.count % rows
+        visible = np.concatenate((self.ring[start:], self.ring[:start])) if filled == rows else self.ring[:filled].copy()
+        low, high = float(visible.min()), float(visible.max())
+        scale = 255.0 / (high - low) if high > low else 0.0
+        visible -= low
+        visible *= scale
+        np.clip(visible, 0, 255, out=visible)
+        out[rows - filled:] = visible
+        return out
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Summarize or export a kymograph recording")
+    parser.add_argument("kymograph", help="kymograph file recorded by the camera app")
+    parser.add_argument("-o", "--output", help="export table: .csv, .npy, .parquet or .h5")
+    args = parser.parse_args(argv)
+
+    reader = KymographReader(args.kymograph)
+    times = reader.timestamps
+    duration = times[-1] - times[0] if len(times) > 1 else 0.0
+    print(f"{len(reader)} profiles of {reader.length} px ({reader.direction}), {duration:.1f} s")
+    if args.output:
+        reader.export(args.output)
+        print(f"Exported -> {args.output}")
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,144 @@
+import time
+import numpy as np
+from profileio import write_table
+
+# Pipeline stages, in frame order: camera -> calibration/analysis/recording -> PIL image -> preview size -> GUI queue -> Tk
+STAGES = ("capture", "process", "convert", "resize", "queue wait", "display")
+# Recent samples kept per stage (and per rate) for the rolling statistics
+WINDOW = 256
+# Histogram bin edges in milliseconds (the last bin is open-ended)
+BIN_EDGES_MS = (0, 1, 2, 4, 8, 16, 33, 66, 133, 266, np.inf)
+PERCENTILES = (50, 90, 99)
+
+
+def bin_labels():
+    labels = [f"{low:g}-{high:g} ms" for low, high in zip(BIN_EDGES_MS[:-2], BIN_EDGES_MS[1:-1])]
+    return labels + [f">{BIN_EDGES_MS[-2]:g} ms"]
+
+
+class Ring:
+    """
+    Fixed ring of the latest float samples.
+
+    Each ring has a single writer thread, so add() needs no lock: it stores the
+    value and then advances the count. Readers copy the array and may see one
+    sample being replaced, which does not matter for rolling statistics.
+    """
+
+    def __init__(self, size=WINDOW):
+        self.values = np.zeros(size, dtype=np.float64)
+        self.count = 0
+
+    def add(self, value):
+        self.values[self.count % len(self.values)] = value
+        self.count += 1
+
+    def recent(self):
+        """Samples currently in the ring (unordered)"""
+        return self.values[:min(self.count, len(self.values))].copy()
+
+
+class RateMeter(Ring):
+    """Rolling events per second from the timestamps of the latest events"""
+
+    def tick(self, now=None):
+        self.add(time.perf_counter() if now is None else now)
+
+    def rate(self, now=None):
+        times = self.recent()
+        if len(times) < 2:
+            return 0.0
+        now = time.perf_counter() if now is None else now
+        if now - times.max() > 2.0:
+            return 0.0 # Stalled: no events for a while
+        span = times.max() - times.min()
+        return (len(times) - 1) / span if span > 0 else 0.0
+
+
+class PipelineStats:
+    """
+    Per-stage timings, frame counters and frame rates of the camera pipeline.
+
+    The capture thread owns the capture/process/convert/resize rings and the
+    captured/dropped counters, the Tk thread owns queue wait/display and the
+    displayed counter, so recording a sample is a store and an increment with
+    no locking. Statistics are computed from copies when the overlay or an
+    export asks for them.
+    """
+
+    def __init__(self, window=WINDOW):
+        self.window = window
+        self.reset()
+
+    def reset(self):
+        self.stages = {stage: Ring(self.window) for stage in STAGES}
+        self.captured = 0
+        self.displayed = 0
+        self.dropped = 0 # Previews replaced in the queue (or skipped) before the GUI showed them
+        self.capture_rate = RateMeter(self.window)
+        self.display_rate = RateMeter(self.window)
+        self.started = time.time()
+
+    def add(self, stage, seconds):
+        self.stages[stage].add(seconds)
+
+    def frame_captured(self, now=None):
+        self.captured += 1
+        self.capture_rate.tick(now)
+
+    def frame_displayed(self, now=None):
+        self.displayed += 1
+        self.display_rate.tick(now)
+
+    def frame_dropped(self):
+        self.dropped += 1
+
+    def stage_summary(self, stage):
+        """(samples, mean, p50, p90, p99, max) in ms over the rolling window, None when empty"""
+        ms = self.stages[stage].recent() * 1000
+        if not len(ms):
+            return None
+        return (len(ms), ms.mean()) + tuple(np.percentile(ms, PERCENTILES)) + (ms.max(),)
+
+    def histogram(self, stage):
+        """Sample counts per BIN_EDGES_MS bin over the rolling window"""
+        return np.histogram(self.stages[stage].recent() * 1000, bins=BIN_EDGES_MS)[0]
+
+    def overlay_text(self):
+        """One-line summary for the status bar: rates, counters and median stage times"""
+        parts = [f"cap {self.capture_rate.rate():.1f} fps", f"disp {self.display_rate.rate():.1f} fps",
+                 f"drop {self.dropped}/{self.captured}"]
+        for stage in STAGES:
+            summary = self.stage_summary(stage)
+            if summary is not None:
+                parts.append(f"{stage} {summary[2]:.1f}")
+        return " | ".join(parts) + " (ms, p50)"
+
+    def export(self, path):
+        """
+        Writes one row per stage (total samples, then rolling statistics and
+        histogram counts) and one row per frame counter, in any TableWriter format.
+        """
+        labels = bin_labels()
+        headers = ["Stage", "Count", "Rate (fps)", "Mean (ms)"] + [f"p{p} (ms)" for p in PERCENTILES] + ["Max (ms)"] + labels
+        names, counts, rates, stats, histograms = [], [], [], [], []
+        for stage in STAGES:
+            summary = self.stage_summary(stage)
+            if summary is not None:
+                names.append(stage)
+                counts.append(self.stages[stage].count)
+                rates.append(np.nan)
+                stats.append(summary[1:])
+                histograms.append(self.histogram(stage))
+        for name, count, rate in (("frames captured", self.captured, self.capture_rate.rate()),
+                                  ("frames displayed", self.displayed, self.display_rate.rate()),
+                                  ("frames dropped", self.dropped, np.nan)):
+            names.append(name)
+            counts.append(count)
+            rates.append(rate)
+            stats.append((np.nan,) * (len(PERCENTILES) + 2))
+            histograms.append(np.zeros(len(labels), dtype=np.int64))
+        stats = np.array(stats, dtype=np.float64)
+        histograms = np.array(histograms, dtype=np.int64)
+        write_table(path, headers, [np.array(names), np.array(counts, dtype=np.int64), np.array(rates, dtype=np.float64)]
+                    + list(stats.T) + list(histograms.T))
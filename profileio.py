@@ -0,0 +1,207 @@
+import itertools
+import os
+import tempfile
+import zipfile
+import numpy as np
+
+# Optional binary backends: offered in the save dialog only when installed
+try:
+    import pyarrow
+    import pyarrow.parquet as pq
+except ImportError:
+    pyarrow = None
+
+try:
+    import h5py
+except ImportError:
+    h5py = None
+
+# Rows formatted per text chunk: bounds memory while keeping the formatting in C
+CSV_CHUNK_ROWS = 65536
+
+
+def save_filetypes():
+    """File dialog entries for every export format available on this machine"""
+    filetypes = [("CSV files", "*.csv"), ("NumPy archive", "*.npz"), ("NumPy array", "*.npy")]
+    if pyarrow is not None:
+        filetypes.append(("Parquet files", "*.parquet"))
+    if h5py is not None:
+        filetypes.append(("HDF5 files", "*.h5 *.hdf5"))
+    return filetypes
+
+
+def _text_format(column):
+    if column.dtype.kind in "ui":
+        return "%d"
+    if column.dtype.kind == "f" and column.dtype.itemsize >= 8:
+        # repr() of a float is the shortest string that round-trips, like csv.writer
+        return "%r"
+    return "%s"
+
+
+def _text_values(column):
+    """Python values of a column chunk for %-formatting"""
+    if column.dtype.kind == "f" and column.dtype.itemsize < 8:
+        # Shortest repr at the column's own precision: float32 0.1 is "0.1", not 0.10000000149011612
+        return column.astype(str).tolist()
+    values = column.tolist()
+    return _quote(values) if column.dtype.kind in "USO" else values
+
+
+def _quote(values):
+    # Same quoting rule as csv.writer for text cells containing separators
+    quoted = []
+    for value in map(str, values):
+        if any(ch in value for ch in ',"\n'):
+            value = '"' + value.replace('"', '""') + '"'
+        quoted.append(value)
+    return quoted
+
+
+class TableWriter:
+    """
+    Streams a column table to disk in chunks, choosing the format by file extension:
+    .csv (text), .npy (structured array), .npz (one array per column),
+    .parquet (pyarrow) or .h5/.hdf5 (h5py).
+    Each write() takes one NumPy array per header, all the same length.
+
+    .npy/.npz need the final length (and string widths) before the first byte,
+    so their chunks are spooled to a temporary file next to the output and
+    copied into place on close(), one chunk in memory at a time.
+    """
+
+    def __init__(self, path, headers):
+        self.path = path
+        self.headers = list(headers)
+        self.format = os.path.splitext(path)[1].lower().lstrip(".")
+        self._file = None
+        self._parquet = None
+        self._spool = None # Temporary file of np.save()d column chunks (.npy/.npz)
+        self._lengths = [] # Rows per spooled chunk
+        self._dtypes = None # Column dtypes that hold every spooled chunk
+        self._binary_pending = self.format in ("npy", "npz") # Output still to be written by close()
+
+        if self.format in ("csv", "txt"):
+            self._file = open(path, mode='w', newline='')
+            self._file.write(",".join(self.headers) + "\r\n")
+        elif self.format == "parquet":
+            if pyarrow is None:
+                raise RuntimeError("Parquet export needs pyarrow")
+        elif self.format in ("h5", "hdf5"):
+            if h5py is None:
+                raise RuntimeError("HDF5 export needs h5py")
+            self._file = h5py.File(path, "w")
+        elif self.format not in ("npy", "npz"):
+            raise ValueError(f"Unsupported export format: .{self.format}")
+
+    def write(self, columns):
+        columns = [np.asarray(c) for c in columns]
+        if len(columns) != len(self.headers):
+            raise ValueError("One column per header is required")
+        if not len(columns[0]):
+            return
+
+        if self.format in ("csv", "txt"):
+            self._write_text(columns)
+        elif self.format == "parquet":
+            table = pyarrow.table(dict(zip(self.headers, columns)))
+            if self._parquet is None:
+                self._parquet = pq.ParquetWriter(self.path, table.schema)
+            self._parquet.write_table(table)
+        elif self.format in ("h5", "hdf5"):
+            self._write_hdf5(columns)
+        else:
+            self._spool_chunk(columns)
+
+    def _spool_chunk(self, columns):
+        if self._spool is None:
+            self._spool = tempfile.TemporaryFile(dir=os.path.dirname(os.path.abspath(self.path)))
+            self._dtypes = [c.dtype for c in columns]
+        else:
+            # Widen as needed, e.g. longer file names in a later chunk
+            self._dtypes = [np.result_type(dtype, c.dtype) for dtype, c in zip(self._dtypes, columns)]
+        for column in columns:
+            np.save(self._spool, column, allow_pickle=False)
+        self._lengths.append(len(columns[0]))
+
+    def _spooled_chunks(self):
+        """Spooled chunks in write order, one list of columns at a time"""
+        self._spool.seek(0)
+        for _ in self._lengths:
+            yield [np.load(self._spool) for _ in self.headers]
+
+    def _close_binary(self):
+        rows = sum(self._lengths)
+        dtypes = self._dtypes or [np.dtype(np.float64)] * len(self.headers)
+        if self.format == "npy":
+            # Structured array keeps the column names and mixed types in one .npy
+            dtype = list(zip(self.headers, dtypes))
+            if not rows:
+                np.save(self.path, np.empty(0, dtype=dtype))
+                return
+            table = np.lib.format.open_memmap(self.path, mode="w+", dtype=dtype, shape=(rows,))
+            start = 0
+            for columns in self._spooled_chunks():
+                stop = start + len(columns[0])
+                for header, column in zip(self.headers, columns):
+                    table[header][start:stop] = column
+                start = stop
+            table.flush()
+        else:
+            # Same layout as np.savez (one .npy member per column), written member by member
+            with zipfile.ZipFile(self.path, "w", allowZip64=True) as archive:
+                for index, (header, dtype) in enumerate(zip(self.headers, dtypes)):
+                    with archive.open(header + ".npy", "w", force_zip64=True) as member:
+                        np.lib.format.write_array_header_1_0(member, {"descr": np.lib.format.dtype_to_descr(dtype),
+                                                                      "fortran_order": False, "shape": (rows,)})
+                        if self._spool is not None:
+                            for columns in self._spooled_chunks():
+                                member.write(columns[index].astype(dtype, copy=False).tobytes())
+
+    def _write_text(self, columns):
+        row_format = ",".join(_text_format(c) for c in columns) + "\r\n"  # csv.writer line endings
+        for start in range(0, len(columns[0]), CSV_CHUNK_ROWS):
+            chunk = [_text_values(c[start:start + CSV_CHUNK_ROWS]) for c in columns]
+            # One %-format call per chunk instead of one csv.writer call per row
+            values = tuple(itertools.chain.from_iterable(zip(*chunk)))
+            self._file.write((row_format * len(chunk[0])) % values)
+
+    def _write_hdf5(self, columns):
+        for header, column in zip(self.headers, columns):
+            if column.dtype.kind == "U":
+                column = column.astype("S")
+            if header not in self._file:
+                self._file.create_dataset(header, data=column, maxshape=(None,), chunks=True)
+            else:
+                dataset = self._file[header]
+                start = dataset.shape[0]
+                dataset.resize((start + len(column),))
+                dataset[start:] = column
+
+    def close(self):
+        if self._binary_pending:
+            self._binary_pending = False
+            try:
+                self._close_binary()
+            finally:
+                if self._spool is not None:
+                    self._spool.close()
+                    self._spool = None
+        if self._parquet is not None:
+            self._parquet.close()
+            self._parquet = None
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def write_table(path, headers, columns):
+    """Writes a whole table in one call"""
+    with TableWriter(path, headers) as writer:
+        writer.write(columns)
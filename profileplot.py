@@ -0,0 +1,127 @@
+import tkinter as tk
+import numpy as np
+from matplotlib.figure import Figure
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
+
+# Standard line colors per profile label (others use the Matplotlib color cycle)
+LINE_COLORS = {"Intensity": "black", "Red": "red", "Green": "green", "Blue": "blue"}
+
+
+class ProfilePlot:
+    """
+    Long-lived Matplotlib plot embedded in a Tk widget.
+
+    The Figure and canvas are built once; update() changes the Line2D data in
+    place with set_data and blits only the lines over a cached background unless
+    the lines, title or axis limits changed. Limits autoscale with hysteresis so
+    noisy live data does not force a full redraw on every frame.
+    Without a master the same drawing runs on an off-screen Agg canvas (benchmarks).
+    """
+
+    def __init__(self, master, xlabel="Pixel Position", ylabel="Avg Intensity (0-255)", figsize=(6, 3)):
+        self.figure = Figure(figsize=figsize, dpi=100)
+        self.ax = self.figure.add_subplot(111)
+        self.ax.set_xlabel(xlabel)
+        self.ax.set_ylabel(ylabel)
+        self.ax.grid(True, linestyle='--', alpha=0.6)
+        self.lines = {} # Label -> Line2D, updated in place
+        self.background = None # Cached axes pixels for blitting
+        self._needs_draw = False
+
+        if master is None:
+            self.canvas = FigureCanvasAgg(self.figure)
+        else:
+            self.canvas = FigureCanvasTkAgg(self.figure, master=master)
+            self.canvas.get_tk_widget().pack(fill=tk.BOTH, expand=True)
+        # Every full redraw (including window resizes) refreshes the blit background
+        self.canvas.mpl_connect("draw_event", self.on_draw)
+
+    def on_draw(self, event):
+        self.background = self.canvas.copy_from_bbox(self.figure.bbox)
+        for line in self.lines.values():
+            self.ax.draw_artist(line)
+
+    def set_labels(self, xlabel=None, ylabel=None):
+        if xlabel is not None and self.ax.get_xlabel() != xlabel:
+            self.ax.set_xlabel(xlabel)
+            self._needs_draw = True
+        if ylabel is not None and self.ax.get_ylabel() != ylabel:
+            self.ax.set_ylabel(ylabel)
+            self._needs_draw = True
+
+    def rescale(self, x, data_dict):
+        """Autoscale with hysteresis so small changes keep the cached background valid"""
+        changed = False
+
+        xs = x.values() if isinstance(x, dict) else [x]
+        x_lo, x_hi = min(float(np.min(v)) for v in xs), max(float(np.max(v)) for v in xs)
+        if x_hi <= x_lo:
+            x_hi = x_lo + 1
+        cur_x_lo, cur_x_hi = self.ax.get_xlim()
+        if x_lo < cur_x_lo or x_hi > cur_x_hi or (x_hi - x_lo) < 0.5 * (cur_x_hi - cur_x_lo):
+            self.ax.set_xlim(x_lo, x_hi)
+            changed = True
+
+        y_min = min(float(np.min(v)) for v in data_dict.values())
+        y_max = max(float(np.max(v)) for v in data_dict.values())
+        cur_y_min, cur_y_max = self.ax.get_ylim()
+        span = max(y_max - y_min, 1.0)
+        if y_min < cur_y_min or y_max > cur_y_max or span < 0.5 * (cur_y_max - cur_y_min):
+            margin = 0.05 * span
+            self.ax.set_ylim(y_min - margin, y_max + margin)
+            changed = True
+
+        return changed
+
+    def update(self, data_dict, title, x=None, colors=None):
+        """
+        Shows {label: 1D array}; x is shared, per label ({label: x}) or the pixel
+        index by default. `colors` ({label: color}) replaces LINE_COLORS for new lines.
+        """
+        ax = self.ax
+        if x is None:
+            x = {label: np.arange(len(values)) for label, values in data_dict.items()}
+        elif not isinstance(x, dict):
+            x = dict.fromkeys(data_dict, x)
+
+        # Drop lines that are not part of this profile (e.g. switching Gray <-> RGB)
+        full_redraw = self._needs_draw
+        self._needs_draw = False
+        for label in list(self.lines):
+            if label not in data_dict:
+                self.lines.pop(label).remove()
+                full_redraw = True
+
+        # Update each line in place
+        for label, values in data_dict.items():
+            line = self.lines.get(label)
+            if line is None:
+                # Animated lines are drawn only by us, on top of the cached background
+                line, = ax.plot([], [], label=label, color=(colors or LINE_COLORS).get(label), linewidth=1, animated=True)
+                self.lines[label] = line
+                full_redraw = True
+            line.set_data(x[label], values)
+
+        # Formatting
+        if ax.get_title() != title:
+            ax.set_title(title)
+            full_redraw = True
+        if full_redraw:
+            legend = ax.get_legend()
+            if legend:
+                legend.remove()
+            if len(data_dict) > 1:
+                ax.legend()
+
+        if self.rescale(x, data_dict):
+            full_redraw = True
+
+        # Render to Tkinter: blit only the lines when the axes did not change
+        if full_redraw or self.background is None:
+            self.canvas.draw()
+        else:
+            self.canvas.restore_region(self.background)
+            for line in self.lines.values():
+                ax.draw_artist(line)
+            self.canvas.blit(self.figure.bbox)
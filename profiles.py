@@ -0,0 +1,298 @@
+import threading
+import numpy as np
+
+
+# ITU-R 601-2 luma weights (the ones PIL's convert("L") uses)
+LUMA_WEIGHTS = (0.299, 0.587, 0.114)
+
+
+def luminance(array):
+    """
+    Grayscale plane of an RGB array, matching PIL's convert("L") for 8-bit data.
+    Higher bit depths and float data are weighted in one float32 matrix product
+    over the channel axis, keeping their full range.
+    """
+    if array.ndim == 2:
+        return array
+    rgb = array[..., :3]
+    if array.dtype == np.uint8:
+        # PIL uses fixed point ITU-R 601-2 weights: L = R*299/1000 + G*587/1000 + B*114/1000
+        acc = rgb[..., 0].astype(np.uint32)
+        acc *= 19595
+        # Widen before multiplying: NumPy 1.x would keep uint8 * scalar in uint16 and overflow
+        acc += rgb[..., 1].astype(np.uint32) * 38470
+        acc += rgb[..., 2].astype(np.uint32) * 7471
+        acc += np.uint32(0x8000)
+        acc >>= 16
+        return acc.astype(np.uint8)
+    dtype = np.float64 if rgb.dtype == np.float64 else np.float32
+    return rgb.astype(dtype, copy=False) @ np.array(LUMA_WEIGHTS, dtype=dtype)
+
+
+# PIL modes whose pixels NumPy reads directly at full precision (16-bit, 32-bit int, float)
+HIGH_BIT_MODES = ("I;16", "I;16L", "I;16B", "I;16N", "I", "F")
+
+
+def image_array(image):
+    """
+    Pixel array of a PIL image: L and RGB as uint8, 16-bit/int/float single
+    channel modes at full precision, alpha dropped; other modes become RGB.
+    """
+    if image.mode in HIGH_BIT_MODES:
+        array = np.asarray(image)
+        return array.astype(array.dtype.newbyteorder("=")) if array.dtype.byteorder == ">" else array
+    if image.mode in ("RGBA", "RGBX"):
+        return np.asarray(image)[..., :3]
+    if image.mode == "LA":
+        return np.asarray(image)[..., 0]
+    if image.mode not in ("L", "RGB"):
+        image = image.convert("RGB")
+    return np.asarray(image)
+
+
+def bbox_to_indices(bbox, width, height):
+    """Round a (possibly float) canvas bbox to clamped integer pixel indices, like PIL crop"""
+    x1, y1, x2, y2 = (int(round(v)) for v in bbox)
+    x1, x2 = sorted((max(0, min(width, x1)), max(0, min(width, x2))))
+    y1, y2 = sorted((max(0, min(height, y1)), max(0, min(height, y2))))
+    return x1, y1, x2, y2
+
+
+def profile_origin(bbox, direction):
+    """Absolute pixel coordinate of a profile's first sample along its axis"""
+    lo, hi = (bbox[0], bbox[2]) if direction == "Horizontal" else (bbox[1], bbox[3])
+    return max(0, int(round(min(lo, hi))))
+
+
+def roi_profile(array, bbox, direction, mode):
+    """
+    Profile of one ROI straight from a raw frame, for data seen only once (live
+    camera frames) where building prefix sums would cost more than the ROI itself.
+    Gives the same values as ProfileCache.profile on the same pixels.
+    """
+    height, width = array.shape[:2]
+    x1, y1, x2, y2 = bbox_to_indices(bbox, width, height)
+    if x2 <= x1 or y2 <= y1:
+        return {}
+
+    region = array[y1:y2, x1:x2]
+    axis = 0 if direction == "Horizontal" else 1
+    if mode == "Grayscale":
+        return {"Intensity": np.mean(luminance(region), axis=axis)}
+
+    if region.ndim == 2:
+        means = np.mean(region, axis=axis)
+        return {"Red": means, "Green": means, "Blue": means}
+    means = np.mean(region[..., :3], axis=axis)
+    return {"Red": means[:, 0], "Green": means[:, 1], "Blue": means[:, 2]}
+
+
+def _channels(means):
+    # (N,) -> Intensity, (N, 3) -> Red/Green/Blue
+    if means.ndim == 1:
+        return {"Intensity": means}
+    return {"Red": means[:, 0], "Green": means[:, 1], "Blue": means[:, 2]}
+
+
+def _bilinear(plane, xs, ys):
+    """Bilinear samples of plane at float coordinates (edges clamped), one batched gather"""
+    height, width = plane.shape[:2]
+    xs = np.clip(xs, 0, width - 1)
+    ys = np.clip(ys, 0, height - 1)
+    xi = np.minimum(xs.astype(np.intp), max(width - 2, 0))
+    yi = np.minimum(ys.astype(np.intp), max(height - 2, 0))
+    fx = xs - xi
+    fy = ys - yi
+    xi1 = np.minimum(xi + 1, width - 1)
+    yi1 = np.minimum(yi + 1, height - 1)
+    if plane.ndim == 3:
+        fx = fx[..., None]
+        fy = fy[..., None]
+    top = plane[yi, xi] * (1 - fx) + plane[yi, xi1] * fx
+    bottom = plane[yi1, xi] * (1 - fx) + plane[yi1, xi1] * fx
+    return top * (1 - fy) + bottom * fy
+
+
+def line_profiles(plane, lines, width=1):
+    """
+    Profiles along arbitrary lines (x1, y1, x2, y2 in pixels), each averaged across
+    a band `width` pixels wide perpendicular to the line.
+
+    The sample grids of all lines (band x length points, one pixel apart) are
+    concatenated and interpolated in a single batched bilinear gather, so extra
+    lines cost only their own samples. Returns one (distance along the line,
+    {label: 1D array}) pair per line; lines shorter than a pixel give (None, {}).
+    """
+    m = max(1, int(round(width)))
+    offsets = (np.arange(m) - (m - 1) / 2.0)[:, None]
+    grids_x, grids_y, distances = [], [], []
+    for x0, y0, x1, y1 in lines:
+        dx, dy = x1 - x0, y1 - y0
+        length = float(np.hypot(dx, dy))
+        if length < 1:
+            distances.append(None)
+            continue
+        # n points along the line, m parallel lines across the band
+        t = np.linspace(0.0, 1.0, int(np.ceil(length)) + 1)
+        nx, ny = -dy / length, dx / length # Unit normal
+        grids_x.append(x0 + t * dx + offsets * nx) # (m, n)
+        grids_y.append(y0 + t * dy + offsets * ny)
+        distances.append(t * length)
+
+    results = [(None, {})] * len(distances)
+    if not grids_x:
+        return results
+
+    # Average across the band, then cut the concatenated samples back into lines
+    means = _bilinear(plane, np.hstack(grids_x), np.hstack(grids_y)).mean(axis=0)
+    lengths = [len(d) for d in distances if d is not None]
+    pieces = iter(np.split(means, np.cumsum(lengths)[:-1]))
+    return [(d, _channels(next(pieces))) if d is not None else (None, {}) for d in distances]
+
+
+def line_profile(plane, p0, p1, width=1):
+    """Profile along one line p0 -> p1 (x, y), averaged across the band; see line_profiles()"""
+    return line_profiles(plane, [(p0[0], p0[1], p1[0], p1[1])], width)[0]
+
+
+def _accumulator_dtype(array, length):
+    # Cumulative sums along one axis of 8-bit data stay well inside uint32
+    if array.dtype.kind == "u":
+        peak = np.iinfo(array.dtype).max * (length + 1)
+        return np.uint32 if peak < 2**32 else np.uint64
+    if array.dtype.kind == "i":
+        # Signed data (PIL mode "I", .npy frames) can be negative: an unsigned sum would wrap
+        return np.int64
+    return np.float64
+
+
+class ProfileCache:
+    """
+    Per-image prefix sums for fast ROI profiles.
+
+    Tables are cumulative sums along one axis with a leading zero row/column, so
+    the mean of any ROI along that axis is the difference of two slices divided by
+    the ROI extent. A profile costs O(width) (or O(height)) instead of
+    O(width x height) and never crops, converts or copies the region.
+    Tables are built lazily per (mode, direction) and shared between threads.
+    """
+
+    def __init__(self, array):
+        self.array = np.asarray(array)
+        self.height, self.width = self.array.shape[:2]
+        self._planes = {}
+        self._tables = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_image(cls, image):
+        return cls(image_array(image))
+
+    def plane(self, mode):
+        """Pixel data for a color mode: (H, W) for Grayscale, (H, W, 3) for RGB"""
+        plane = self._planes.get(mode)
+        if plane is None:
+            if mode == "Grayscale":
+                plane = luminance(self.array)
+            elif self.array.ndim == 2:
+                plane = np.repeat(self.array[..., None], 3, axis=2)
+            else:
+                plane = self.array[..., :3]
+            self._planes[mode] = plane
+        return plane
+
+    def table(self, mode, direction):
+        key = (mode, direction)
+        table = self._tables.get(key)
+        if table is None:
+            with self._lock:
+                table = self._tables.get(key)
+                if table is None:
+                    table = self._build_table(self.plane(mode), direction)
+                    self._tables[key] = table
+        return table
+
+    def _build_table(self, plane, direction):
+        if direction == "Horizontal":
+            # Column sums: table[y] = sum of rows [0, y)
+            dtype = _accumulator_dtype(plane, self.height)
+            table = np.zeros((self.height + 1,) + plane.shape[1:], dtype=dtype)
+            np.cumsum(plane, axis=0, dtype=dtype, out=table[1:])
+        else:
+            # Row sums: table[:, x] = sum of columns [0, x)
+            dtype = _accumulator_dtype(plane, self.width)
+            table = np.zeros((self.height, self.width + 1) + plane.shape[2:], dtype=dtype)
+            np.cumsum(plane, axis=1, dtype=dtype, out=table[:, 1:])
+        return table
+
+    def nbytes(self):
+        """Bytes held by the derived planes and tables (the source array is not counted)"""
+        arrays = list(self._planes.values()) + list(self._tables.values())
+        return sum(a.nbytes for a in arrays if not np.may_share_memory(a, self.array))
+
+    def prefetch(self, mode, direction):
+        """Build a table on a background thread so the first ROI is instant"""
+        thread = threading.Thread(target=self.table, args=(mode, direction), daemon=True)
+        thread.start()
+        return thread
+
+    def line_profile(self, p0, p1, width, mode):
+        """Arbitrary-angle band profile; see line_profile()"""
+        return line_profile(self.plane(mode), p0, p1, width)
+
+    def line_profiles(self, lines, width, mode):
+        return line_profiles(self.plane(mode), lines, width)
+
+    def profiles(self, bboxes, direction, mode):
+        """
+        Profiles of many ROIs at once: one dict per bbox ({} for empty ROIs).
+
+        Every output sample of every ROI is gathered from the prefix table with a
+        single pair of fancy-indexing lookups, so extra ROIs add only their own
+        O(width) samples and no Python work per pixel.
+        """
+        boxes = np.array([bbox_to_indices(b, self.width, self.height) for b in bboxes], dtype=np.intp).reshape(-1, 4)
+        x1, y1, x2, y2 = boxes.T
+        valid = (x2 > x1) & (y2 > y1)
+        if not valid.any():
+            return [{} for _ in boxes]
+
+        if direction == "Horizontal":
+            start, stop, lo, hi = x1, x2, y1, y2
+        else:
+            start, stop, lo, hi = y1, y2, x1, x2
+        lengths = np.where(valid, stop - start, 0)
+
+        # Owner ROI and position along the profile of every output sample
+        owner = np.repeat(np.arange(len(boxes)), lengths)
+        first = np.cumsum(lengths) - lengths
+        position = np.arange(int(lengths.sum())) - first[owner] + start[owner]
+
+        table = self.table(mode, direction)
+        if direction == "Horizontal":
+            sums = table[hi[owner], position] - table[lo[owner], position]
+        else:
+            sums = table[position, hi[owner]] - table[position, lo[owner]]
+        extent = (hi - lo)[owner].astype(np.float64)
+        means = sums / (extent if sums.ndim == 1 else extent[:, None])
+
+        pieces = np.split(means, np.cumsum(lengths)[:-1])
+        return [_channels(piece) if ok else {} for piece, ok in zip(pieces, valid)]
+
+    def profile(self, bbox, direction, mode):
+        """Returns {label: 1D array} for the ROI, averaged across the profile direction"""
+        x1, y1, x2, y2 = bbox_to_indices(bbox, self.width, self.height)
+        if x2 <= x1 or y2 <= y1:
+            return {}
+
+        table = self.table(mode, direction)
+        if direction == "Horizontal":
+            # Average down rows -> 1D array along X
+            sums = table[y2, x1:x2] - table[y1, x1:x2]
+            means = sums / float(y2 - y1)
+        else:
+            # Average across columns -> 1D array along Y
+            sums = table[y1:y2, x2] - table[y1:y2, x1]
+            means = sums / float(x2 - x1)
+
+        return _channels(means)
@@ -0,0 +1,140 @@
+import json
+import os
+import numpy as np
+from PIL import Image
+from profiles import image_array
+
+# Files that hold full-precision sensor data
+RAW_EXTENSIONS = (".npy", ".tif", ".tiff")
+
+# Bayer layouts of libcamera raw formats (e.g. "SRGGB12" -> "RGGB"); mono sensors ("R10") have none
+BAYER_ORDERS = ("RGGB", "GRBG", "GBRG", "BGGR")
+# Sidecar next to a saved Bayer mosaic (frame.npy -> frame.npy.json) recording its layout
+RAW_INFO_SUFFIX = ".json"
+
+
+def bayer_order(raw_format):
+    """Bayer order of a libcamera raw format name, or None for mono sensors"""
+    for order in BAYER_ORDERS:
+        if order in raw_format:
+            return order
+    return None
+
+
+def unpack_raw(buffer, size):
+    """
+    Sensor values from an unpacked raw stream buffer: the uint8 rows (with any
+    stride padding) are reinterpreted as little-endian uint16, no copy.
+    """
+    width, height = size
+    return buffer[:height, :2 * width].view("<u2")
+
+
+def bayer_to_rgb(raw, order="RGGB"):
+    """
+    Half-resolution RGB from a Bayer mosaic by 2x2 binning, kept in uint16:
+    each output pixel takes the R and B samples of its cell and the mean of both
+    greens. Slicing only, no interpolation and no float conversion. The mosaic
+    is the last two axes, so a (frames, height, width) stack works too.
+    """
+    height, width = raw.shape[-2] // 2 * 2, raw.shape[-1] // 2 * 2
+    # The four sample planes of the 2x2 cell, in the order the format names them
+    planes = [raw[..., dy:height:2, dx:width:2] for dy, dx in ((0, 0), (0, 1), (1, 0), (1, 1))]
+    red = planes[order.index("R")]
+    blue = planes[order.index("B")]
+    greens = [plane for color, plane in zip(order, planes) if color == "G"]
+
+    rgb = np.empty(red.shape + (3,), dtype=np.uint16)
+    rgb[..., 0] = red
+    rgb[..., 1] = (greens[0].astype(np.uint32) + greens[1]) >> 1
+    rgb[..., 2] = blue
+    return rgb
+
+
+def bit_depth(array):
+    """Significant bits of integer data (8, 10, 12, 14 or 16), None for float data"""
+    if array.dtype.kind not in "ui":
+        return None
+    if array.dtype.itemsize == 1:
+        return 8
+    peak = int(array.max()) if array.size else 0
+    for bits in (10, 12, 14):
+        if peak < 2 ** bits:
+            return bits
+    return 16
+
+
+def intensity_label(array):
+    """Profile axis label with the data's full scale, e.g. 'Avg Intensity (0-4095)'"""
+    bits = bit_depth(array)
+    if bits is None:
+        return "Avg Intensity"
+    return f"Avg Intensity (0-{2 ** bits - 1})"
+
+
+def read_raw_info(path):
+    """Layout recorded next to a saved raw frame ({"bayer": "RGGB", "bits": 12}), or {} when there is none"""
+    try:
+        with open(path + RAW_INFO_SUFFIX) as file:
+            return json.load(file)
+    except (OSError, ValueError):
+        return {}
+
+
+def load_array(path):
+    """
+    Pixel array of an image file at full precision: .npy as saved, 16-bit and
+    float TIFFs as uint16/float32, everything else through image_array().
+
+    A Bayer mosaic saved with its layout sidecar is binned to half-resolution
+    RGB (bayer_to_rgb), the same pixel space the camera app analyzes live and
+    builds its dark/flat masters and wavelength maps in.
+    """
+    if path.lower().endswith(".npy"):
+        array = np.load(path)
+    else:
+        with Image.open(path) as image:
+            array = image_array(image)
+    bayer = read_raw_info(path).get("bayer") if array.ndim == 2 else None
+    if bayer:
+        array = bayer_to_rgb(array, bayer)
+    return array
+
+
+def display_image(array):
+    """8-bit PIL image for on-screen display, scaled to the data's full range"""
+    if array.dtype == np.uint8:
+        return Image.fromarray(array)
+    bits = bit_depth(array)
+    if bits is not None:
+        scale = 255.0 / (2 ** bits - 1)
+        offset = 0.0
+    else:
+        low, high = float(np.min(array)), float(np.max(array))
+        scale = 255.0 / (high - low) if high > low else 1.0
+        offset = low
+    scaled = np.empty(array.shape, dtype=np.float32)
+    np.subtract(array, offset, out=scaled)
+    scaled *= scale
+    np.clip(scaled, 0, 255, out=scaled)
+    return Image.fromarray(scaled.astype(np.uint8))
+
+
+def save_frame(frame, path, raw_info=None):
+    """
+    Writes a frame: .npy keeps any array exactly; other formats go through PIL
+    (2D uint16 becomes a 16-bit TIFF or PNG). 16-bit color needs .npy.
+    `raw_info` (e.g. {"bayer": "RGGB", "bits": 12}) is written to the sidecar
+    that load_array() reads back.
+    """
+    if isinstance(frame, np.ndarray) and os.path.splitext(path)[1].lower() == ".npy":
+        np.save(path, frame)
+    else:
+        if isinstance(frame, np.ndarray):
+            if frame.dtype != np.uint8 and frame.ndim == 3:
+                raise ValueError("High bit depth color frames can only be saved as .npy")
+            frame = Image.fromarray(frame)
+        frame.save(path)
+    if raw_info:
+        with open(path + RAW_INFO_SUFFIX, "w") as file:
+            json.dump(raw_info, file)
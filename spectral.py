@@ -0,0 +1,201 @@
+import json
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+# Common fluorescent-lamp (Hg/Eu/Tb) lines, a handy default for the calibration dialog
+DEFAULT_LAMP_LINES = "435.8, 546.1, 611.6"
+
+
+def find_peaks(profile, min_distance=3, rel_height=0.2, max_peaks=None):
+    """
+    Indices of local maxima of a 1D profile, in ascending pixel order.
+
+    A sample is a peak when it is the maximum of the window +-min_distance around
+    it (the first sample of a flat top wins) and rises above
+    median + rel_height * (max - median). Everything is array operations over
+    sliding windows, cheap enough for every live frame. With max_peaks only the
+    highest peaks are kept.
+    """
+    profile = np.asarray(profile, dtype=np.float64)
+    if profile.size < 3:
+        return np.empty(0, dtype=np.intp)
+    d = max(1, int(min_distance))
+
+    # Window maximum around every sample (edges padded so they never win by default)
+    padded = np.pad(profile, d, mode="constant", constant_values=-np.inf)
+    window_max = sliding_window_view(padded, 2 * d + 1).max(axis=1)
+    is_max = profile >= window_max
+    # Plateaus: keep only their first sample
+    is_max[1:] &= profile[1:] != profile[:-1]
+
+    baseline = np.median(profile)
+    threshold = baseline + rel_height * (profile.max() - baseline)
+    peaks = np.flatnonzero(is_max & (profile > threshold))
+
+    if max_peaks is not None and len(peaks) > max_peaks:
+        strongest = np.argsort(profile[peaks])[::-1][:max_peaks]
+        peaks = np.sort(peaks[strongest])
+    return peaks
+
+
+def refine_peaks(profile, peaks, method="parabolic"):
+    """
+    Sub-pixel peak centers from the three samples around each peak, vectorized.
+
+    "parabolic" fits a parabola through the samples, "gaussian" fits a parabola to
+    their logarithm (exact for Gaussian line shapes, needs positive samples).
+    Peaks on the first or last sample are returned unrefined.
+    """
+    profile = np.asarray(profile, dtype=np.float64)
+    peaks = np.asarray(peaks, dtype=np.intp)
+    centers = peaks.astype(np.float64)
+    inner = (peaks > 0) & (peaks < len(profile) - 1)
+    i = peaks[inner]
+    left, mid, right = profile[i - 1], profile[i], profile[i + 1]
+    if method == "gaussian":
+        floor = np.finfo(np.float64).tiny
+        left, mid, right = (np.log(np.maximum(v, floor)) for v in (left, mid, right))
+
+    curvature = left - 2 * mid + right
+    with np.errstate(divide="ignore", invalid="ignore"):
+        delta = np.where(curvature < 0, 0.5 * (left - right) / curvature, 0.0)
+    centers[inner] += np.clip(delta, -0.5, 0.5)
+    return centers
+
+
+def peak_centers(profile, min_distance=3, rel_height=0.2, max_peaks=None, method="parabolic"):
+    """find_peaks + refine_peaks: sub-pixel centers in ascending order"""
+    peaks = find_peaks(profile, min_distance, rel_height, max_peaks)
+    return refine_peaks(profile, peaks, method)
+
+
+def parse_wavelengths(text):
+    return [float(v) for v in text.replace(";", ",").split(",") if v.strip()]
+
+
+class WavelengthCalibration:
+    """
+    Polynomial pixel -> wavelength map for spectrometer images.
+
+    Pixels are absolute sensor coordinates along `direction` (x for Horizontal
+    profiles, y for Vertical), so the map holds for any ROI on the same setup.
+    The fitted lamp peaks are kept for reporting the residuals.
+    """
+
+    def __init__(self, coefficients, direction="Horizontal", pixels=(), wavelengths=(), unit="nm"):
+        self.coefficients = np.asarray(coefficients, dtype=np.float64)
+        self.direction = direction
+        self.pixels = np.asarray(pixels, dtype=np.float64)
+        self.wavelengths = np.asarray(wavelengths, dtype=np.float64)
+        self.unit = unit
+
+    @classmethod
+    def fit(cls, pixels, wavelengths, degree=2, direction="Horizontal", unit="nm"):
+        """Least-squares fit; the degree is lowered when there are too few lines"""
+        pixels = np.asarray(pixels, dtype=np.float64)
+        wavelengths = np.asarray(wavelengths, dtype=np.float64)
+        if len(pixels) != len(wavelengths):
+            raise ValueError(f"{len(pixels)} peaks for {len(wavelengths)} wavelengths")
+        if len(pixels) < 2:
+            raise ValueError("At least two lines are needed for a wavelength calibration")
+        degree = min(int(degree), len(pixels) - 1)
+        return cls(np.polyfit(pixels, wavelengths, degree), direction, pixels, wavelengths, unit)
+
+    @classmethod
+    def from_profile(cls, profile, wavelengths, origin=0, degree=2, direction="Horizontal", method="parabolic"):
+        """
+        Calibrates from a lamp profile: the len(wavelengths) strongest peaks, taken
+        left to right, are paired with `wavelengths` in the given order.
+        `origin` is the absolute pixel of the profile's first sample.
+        """
+        centers = peak_centers(profile, max_peaks=len(wavelengths), method=method)
+        if len(centers) < len(wavelengths):
+            raise ValueError(f"Found {len(centers)} peaks, need {len(wavelengths)}")
+        return cls.fit(centers + origin, wavelengths, degree, direction)
+
+    @property
+    def degree(self):
+        return len(self.coefficients) - 1
+
+    def __call__(self, pixels):
+        return np.polyval(self.coefficients, pixels)
+
+    def axis(self, origin, length):
+        """Wavelength of each sample of a profile starting at absolute pixel `origin`"""
+        return self(np.arange(origin, origin + length, dtype=np.float64))
+
+    def residuals(self):
+        return self.wavelengths - self(self.pixels)
+
+    def rms(self):
+        residuals = self.residuals()
+        return float(np.sqrt(np.mean(residuals ** 2))) if len(residuals) else 0.0
+
+    def save(self, path):
+        """Stores the map as JSON (small and readable next to the data)"""
+        data = {"coefficients": self.coefficients.tolist(), "direction": self.direction, "unit": self.unit,
+                "pixels": self.pixels.tolist(), "wavelengths": self.wavelengths.tolist()}
+        with open(path, "w") as file:
+            json.dump(data, file, indent=2)
+
+    @classmethod
+    def load(cls, path):
+        with open(path) as file:
+            data = json.load(file)
+        return cls(data["coefficients"], data.get("direction", "Horizontal"), data.get("pixels", ()),
+                   data.get("wavelengths", ()), data.get("unit", "nm"))
+
+
+class PeakTracker:
+    """
+    Follows line centers across live frames.
+
+    Tracks start at the first frame's peaks; on every update each track moves to
+    the nearest new peak within `max_shift` (one searchsorted call for all
+    tracks) or records NaN for that frame. History is a preallocated ring of
+    `history` rows, so tracking allocates nothing per frame beyond the lookup.
+    """
+
+    def __init__(self, max_shift=3.0, history=1000):
+        self.max_shift = max_shift
+        self.history = int(history)
+        self.reset()
+
+    def reset(self):
+        self.positions = None # Latest center of every track
+        self.times = np.full(self.history, np.nan)
+        self.log = None # (history, tracks) ring of centers
+        self.count = 0
+
+    def update(self, centers, timestamp):
+        centers = np.asarray(centers, dtype=np.float64)
+        if self.positions is None:
+            if not len(centers):
+                return None
+            self.positions = centers.copy()
+            self.log = np.full((self.history, len(centers)), np.nan)
+            matched = self.positions.copy()
+        else:
+            matched = np.full(len(self.positions), np.nan)
+            if len(centers):
+                # Nearest new center on either side of every track
+                right = np.clip(np.searchsorted(centers, self.positions), 0, len(centers) - 1)
+                left = np.clip(right - 1, 0, len(centers) - 1)
+                nearest = np.where(np.abs(centers[left] - self.positions) <= np.abs(centers[right] - self.positions),
+                                   centers[left], centers[right])
+                found = np.abs(nearest - self.positions) <= self.max_shift
+                matched[found] = nearest[found]
+                self.positions[found] = nearest[found]
+
+        slot = self.count % self.history
+        self.log[slot] = matched
+        self.times[slot] = timestamp
+        self.count += 1
+        return matched
+
+    def table(self):
+        """(times, centers) in chronological order, for export"""
+        if self.log is None:
+            return np.empty(0), np.empty((0, 0))
+        order = np.arange(self.count - min(self.count, self.history), self.count) % self.history
+        return self.times[order], self.log[order]
@@ -0,0 +1,363 @@
+import argparse
+import io
+import json
+import queue
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+from PIL import Image
+import fakecamera
+from batchprofile import DIRECTIONS, parse_bbox
+from pipelinestats import RateMeter
+from profiles import profile_origin, roi_profile
+
+# Camera stream served to viewers (same stream as the desktop app)
+STREAM_SIZE = (640, 480)
+JPEG_QUALITY = 80
+# Encoded frames buffered per viewer; a slow viewer loses its oldest frames, nobody else notices
+CLIENT_QUEUE = 2
+# Seconds a viewer waits for a frame before checking that the server is still up
+CLIENT_TIMEOUT = 5.0
+BOUNDARY = "opticslabframe"
+
+INDEX_PAGE = """<!DOCTYPE html>
+<html><head><title>Optic Lab Live</title></head>
+<body style="font-family: sans-serif; background: #222; color: #ddd">
+<h2>Optic Lab Live Camera</h2>
+<img src="/stream.mjpg" style="max-width: 100%"><br>
+<canvas id="profile" width="640" height="200" style="background: #111"></canvas>
+<div id="info"></div>
+<script>
+const canvas = document.getElementById("profile"), ctx = canvas.getContext("2d");
+new EventSource("/profile").onmessage = (event) => {
+  const data = JSON.parse(event.data), values = data.values;
+  const low = Math.min(...values), high = Math.max(...values), span = (high - low) || 1;
+  ctx.clearRect(0, 0, canvas.width, canvas.height);
+  ctx.strokeStyle = "#4af";
+  ctx.beginPath();
+  values.forEach((v, i) => {
+    const x = i * canvas.width / Math.max(values.length - 1, 1), y = canvas.height * (1 - (v - low) / span);
+    i ? ctx.lineTo(x, y) : ctx.moveTo(x, y);
+  });
+  ctx.stroke();
+  document.getElementById("info").textContent =
+    `${data.direction} profile from pixel ${data.origin}, intensity ${low.toFixed(1)} - ${high.toFixed(1)}`;
+};
+</script>
+</body></html>
+"""
+
+
+class Subscriber:
+    """One viewer's bounded queue: publish() drops the oldest item instead of blocking"""
+
+    def __init__(self, size=CLIENT_QUEUE):
+        self.queue = queue.Queue(maxsize=size)
+        self.dropped = 0
+
+    def publish(self, item):
+        while True:
+            try:
+                self.queue.put_nowait(item)
+                return
+            except queue.Full:
+                try:
+                    self.queue.get_nowait()
+                    self.dropped += 1
+                except queue.Empty:
+                    pass
+
+    def get(self, timeout=CLIENT_TIMEOUT):
+        return self.queue.get(timeout=timeout)
+
+
+class Channel:
+    """A set of subscribers receiving the same encoded items"""
+
+    def __init__(self):
+        self.subscribers = set()
+        self._lock = threading.Lock()
+
+    def subscribe(self):
+        subscriber = Subscriber()
+        with self._lock:
+            self.subscribers.add(subscriber)
+        return subscriber
+
+    def unsubscribe(self, subscriber):
+        with self._lock:
+            self.subscribers.discard(subscriber)
+
+    def __len__(self):
+        return len(self.subscribers)
+
+    def publish(self, item):
+        with self._lock:
+            subscribers = list(self.subscribers)
+        for subscriber in subscribers:
+            subscriber.publish(item)
+
+
+class StreamServer:
+    """
+    Headless camera server: one capture loop, any number of viewers.
+
+    The capture thread only stores a reference to the newest frame and wakes
+    the encoder. The encoder thread takes whatever frame is newest (frames it
+    had no time for are skipped), encodes it once as JPEG and computes the ROI
+    profile once as JSON, then hands the same bytes to every viewer's
+    drop-oldest queue. Capture never waits for encoding or for viewers, and
+    nothing is encoded while nobody is watching.
+    """
+
+    def __init__(self, camera, size=STREAM_SIZE, quality=JPEG_QUALITY, roi=None, direction="Horizontal"):
+        self.camera = camera
+        self.size = size
+        self.quality = quality
+        self.roi = roi # (x1, y1, x2, y2) as fractions of the frame, or None
+        self.direction = direction
+        self.frames = Channel() # JPEG bytes
+        self.profiles = Channel() # JSON bytes
+        self.running = False
+        self.captured = 0
+        self.encoded = 0
+        self.capture_rate = RateMeter()
+        self.encode_rate = RateMeter()
+        self._latest = None # (sequence, frame), replaced by the capture thread
+        self._new_frame = threading.Condition()
+        self._threads = []
+
+    def start(self):
+        self.camera.configure(self.camera.create_preview_configuration(main={"size": self.size, "format": "RGB888"}))
+        self.camera.start()
+        self.running = True
+        self._threads = [threading.Thread(target=self.capture_loop, daemon=True),
+                         threading.Thread(target=self.encode_loop, daemon=True)]
+        for thread in self._threads:
+            thread.start()
+
+    def stop(self):
+        self.running = False
+        with self._new_frame:
+            self._new_frame.notify_all()
+        for thread in self._threads:
+            thread.join(2)
+        self.camera.stop()
+
+    def capture_loop(self):
+        """Capture Thread: newest frame into the shared slot, nothing else"""
+        while self.running:
+            try:
+                frame = self.camera.capture_array()
+            except Exception as e:
+                print(f"Capture Error: {e}")
+                self.running = False
+                break
+            self.captured += 1
+            self.capture_rate.tick()
+            with self._new_frame:
+                self._latest = (self.captured, frame)
+                self._new_frame.notify()
+        with self._new_frame:
+            self._new_frame.notify_all()
+
+    def encode_loop(self):
+        """Encoder Thread: one JPEG and one profile per frame, shared by every viewer"""
+        done = 0
+        while self.running:
+            with self._new_frame:
+                while self.running and (self._latest is None or self._latest[0] == done):
+                    self._new_frame.wait(1.0)
+                if not self.running:
+                    break
+                done, frame = self._latest
+            if len(self.frames):
+                self.frames.publish(self.encode_jpeg(frame))
+                self.encoded += 1
+                self.encode_rate.tick()
+            if len(self.profiles) and self.roi is not None:
+                profile = self.profile_message(frame)
+                if profile is not None:
+                    self.profiles.publish(profile)
+
+    def encode_jpeg(self, frame):
+        buffer = io.BytesIO()
+        Image.fromarray(frame).save(buffer, format="JPEG", quality=self.quality)
+        return buffer.getvalue()
+
+    def profile_message(self, frame):
+        """ROI intensity profile as JSON bytes, or None when the ROI is empty"""
+        height, width = frame.shape[:2]
+        roi, direction = self.roi, self.direction
+        bbox = (roi[0] * width, roi[1] * height, roi[2] * width, roi[3] * height)
+        plot_dict = roi_profile(frame, bbox, direction, "Grayscale")
+        if not plot_dict:
+            return None
+        message = {"time": time.time(), "direction": direction, "origin": profile_origin(bbox, direction),
+                   "values": [round(v, 2) for v in plot_dict["Intensity"].tolist()]}
+        return json.dumps(message).encode("utf-8")
+
+    def status(self):
+        return {"captured": self.captured, "encoded": self.encoded, "capture_fps": round(self.capture_rate.rate(), 1),
+                "encode_fps": round(self.encode_rate.rate(), 1), "viewers": len(self.frames),
+                "profile_viewers": len(self.profiles), "roi": self.roi, "direction": self.direction,
+                "dropped": sum(s.dropped for s in list(self.frames.subscribers))}
+
+
+class StreamHandler(BaseHTTPRequestHandler):
+    """
+    /              viewer page (stream plus live profile plot)
+    /stream.mjpg   MJPEG stream (multipart/x-mixed-replace)
+    /snapshot.jpg  next encoded frame
+    /profile       live ROI profile as server-sent events (JSON per frame)
+    /profile.json  next ROI profile
+    /roi?bbox=x1,y1,x2,y2&direction=horizontal   sets the ROI (fractions of the frame)
+    /status.json   frame counters and rates
+    """
+
+    server_version = "OpticLabStream/1.0"
+
+    @property
+    def stream(self):
+        return self.server.stream
+
+    def log_message(self, format, *args):
+        pass # One line per request would flood the console during a class
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        routes = {"/": self.send_index, "/index.html": self.send_index, "/stream.mjpg": self.send_mjpeg,
+                  "/snapshot.jpg": self.send_snapshot, "/profile": self.send_profile_events,
+                  "/profile.json": self.send_profile, "/roi": self.set_roi, "/status.json": self.send_status}
+        route = routes.get(url.path)
+        if route is None:
+            self.send_error(404)
+            return
+        try:
+            route(parse_qs(url.query))
+        except (BrokenPipeError, ConnectionResetError):
+            pass # Viewer went away
+
+    def send_body(self, body, content_type, status=200):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.send_header("Cache-Control", "no-store")
+        self.end_headers()
+        self.wfile.write(body)
+
+    def send_index(self, query):
+        self.send_body(INDEX_PAGE.encode("utf-8"), "text/html; charset=utf-8")
+
+    def send_status(self, query):
+        self.send_body(json.dumps(self.stream.status()).encode("utf-8"), "application/json")
+
+    def send_snapshot(self, query):
+        # Frames are only encoded while someone subscribes: wait for the next one
+        subscriber = self.stream.frames.subscribe()
+        try:
+            jpeg = subscriber.get()
+        except queue.Empty:
+            self.send_error(503, "No frame from the camera")
+            return
+        finally:
+            self.stream.frames.unsubscribe(subscriber)
+        self.send_body(jpeg, "image/jpeg")
+
+    def send_profile(self, query):
+        if self.stream.roi is None:
+            self.send_error(409, "No ROI set (use /roi?bbox=x1,y1,x2,y2)")
+            return
+        subscriber = self.stream.profiles.subscribe()
+        try:
+            profile = subscriber.get()
+        except queue.Empty:
+            self.send_error(503, "No profile from the camera")
+            return
+        finally:
+            self.stream.profiles.unsubscribe(subscriber)
+        self.send_body(profile, "application/json")
+
+    def set_roi(self, query):
+        try:
+            roi = parse_bbox(query["bbox"][0])
+            direction = DIRECTIONS[query.get("direction", ["horizontal"])[0].lower()]
+        except (KeyError, ValueError, argparse.ArgumentTypeError):
+            self.send_error(400, "Use /roi?bbox=x1,y1,x2,y2 (fractions 0-1)&direction=horizontal|vertical")
+            return
+        if not all(0 <= v <= 1 for v in roi) or roi[2] <= roi[0] or roi[3] <= roi[1]:
+            self.send_error(400, "ROI must be fractions of the frame with x1 < x2 and y1 < y2")
+            return
+        self.stream.roi, self.stream.direction = roi, direction
+        self.send_status(query)
+
+    def send_mjpeg(self, query):
+        subscriber = self.stream.frames.subscribe()
+        try:
+            self.send_response(200)
+            self.send_header("Content-Type", f"multipart/x-mixed-replace; boundary={BOUNDARY}")
+            self.send_header("Cache-Control", "no-store")
+            self.end_headers()
+            while self.stream.running:
+                try:
+                    jpeg = subscriber.get()
+                except queue.Empty:
+                    continue
+                self.wfile.write(f"--{BOUNDARY}\r\nContent-Type: image/jpeg\r\nContent-Length: {len(jpeg)}\r\n\r\n".encode("ascii"))
+                self.wfile.write(jpeg)
+                self.wfile.write(b"\r\n")
+        finally:
+            self.stream.frames.unsubscribe(subscriber)
+
+    def send_profile_events(self, query):
+        subscriber = self.stream.profiles.subscribe()
+        try:
+            self.send_response(200)
+            self.send_header("Content-Type", "text/event-stream")
+            self.send_header("Cache-Control", "no-store")
+            self.end_headers()
+            while self.stream.running:
+                try:
+                    message = subscriber.get()
+                except queue.Empty:
+                    self.wfile.write(b": keepalive\n\n")
+                    continue
+                self.wfile.write(b"data: " + message + b"\n\n")
+        finally:
+            self.stream.profiles.unsubscribe(subscriber)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serves the camera to many browsers on the local network (MJPEG + live ROI profile)")
+    parser.add_argument("--host", default="0.0.0.0", help="address to listen on (default: all interfaces)")
+    parser.add_argument("--port", type=int, default=8000, help="HTTP port (default: 8000)")
+    parser.add_argument("--quality", type=int, default=JPEG_QUALITY, help="JPEG quality 1-95 (default: 80)")
+    parser.add_argument("--roi", type=parse_bbox, help="profile ROI as x1,y1,x2,y2 fractions of the frame, e.g. 0.2,0.4,0.8,0.6")
+    parser.add_argument("--direction", default="horizontal", type=str.lower, choices=sorted(DIRECTIONS),
+                        help="profile direction (default: horizontal)")
+    parser.add_argument("--simulate", choices=fakecamera.SCENES, help="serve a synthetic scene instead of the camera")
+    args = parser.parse_args(argv)
+
+    if args.simulate:
+        fakecamera.install(args.simulate, STREAM_SIZE)
+    from picamera2 import Picamera2
+
+    stream = StreamServer(Picamera2(), quality=args.quality, roi=args.roi, direction=DIRECTIONS[args.direction])
+    stream.start()
+    server = ThreadingHTTPServer((args.host, args.port), StreamHandler)
+    server.daemon_threads = True
+    server.stream = stream
+    print(f"Streaming on http://{args.host}:{args.port}/ (Ctrl+C to stop)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        stream.stop()
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,175 @@
+import math
+from collections import OrderedDict
+from PIL import Image, ImageTk
+
+TILE_SIZE = 256
+MAX_CACHED_TILES = 256
+ZOOM_STEP = 1.25
+MAX_SCALE = 16.0
+
+
+class TiledImageView:
+    """
+    Zoomable, pannable image display on a tk.Canvas.
+
+    Downsampled pyramid levels are built lazily (level k is the image reduced by
+    2**k) and only the tiles intersecting the viewport are rendered, so opening a
+    large sensor image never creates a full-resolution PhotoImage. Rendered tiles
+    are kept in an LRU cache keyed by level, tile index and display scale.
+
+    The view is a scale plus the image coordinate shown at the canvas origin, so
+    canvas_to_image/image_to_canvas map exactly between screen and full-resolution
+    pixel coordinates. Mouse wheel zooms about the cursor, right or middle drag pans.
+    """
+
+    def __init__(self, canvas, on_view_change=None):
+        self.canvas = canvas
+        self.on_view_change = on_view_change # Called after every zoom/pan/resize
+        self.image = None
+        self.levels = []
+        self.scale = 1.0
+        self.offset_x = 0.0
+        self.offset_y = 0.0
+        self._tiles = OrderedDict()
+        self._shown = [] # PhotoImages on the canvas right now (kept alive past LRU eviction)
+        self._pan_start = None
+
+        self.canvas.bind("<Configure>", lambda event: self.redraw())
+        self.canvas.bind("<MouseWheel>", self.on_wheel)
+        self.canvas.bind("<Button-4>", self.on_wheel)
+        self.canvas.bind("<Button-5>", self.on_wheel)
+        for button in (2, 3):
+            self.canvas.bind(f"<ButtonPress-{button}>", self.on_pan_press)
+            self.canvas.bind(f"<B{button}-Motion>", self.on_pan_move)
+
+    def set_image(self, image, levels=None, keep_view=False):
+        """
+        Shows a new image. `levels` is an optional pyramid list ([image] to start)
+        that is filled in place, so a caller that keeps it gets the reduced levels
+        back when the image is shown again. keep_view keeps zoom and pan.
+        """
+        if image.mode not in ("RGB", "RGBA", "L"):
+            image = image.convert("RGB")
+            levels = None
+        self.image = image
+        self.levels = levels if levels is not None else [image]
+        self._tiles.clear()
+        if keep_view:
+            self.redraw()
+        else:
+            self.fit()
+
+    # --- Coordinate mapping ---
+    def canvas_to_image(self, x, y):
+        return x / self.scale + self.offset_x, y / self.scale + self.offset_y
+
+    def image_to_canvas(self, x, y):
+        return (x - self.offset_x) * self.scale, (y - self.offset_y) * self.scale
+
+    # --- View control ---
+    def fit(self):
+        """Shows the whole image, never enlarging past 1:1"""
+        if self.image is None:
+            return
+        width = max(self.canvas.winfo_width(), 1)
+        height = max(self.canvas.winfo_height(), 1)
+        self.scale = min(1.0, width / self.image.width, height / self.image.height)
+        self.offset_x = 0.0
+        self.offset_y = 0.0
+        self.redraw()
+
+    def zoom(self, factor, x, y):
+        """Zooms by factor keeping canvas point (x, y) fixed on the same image pixel"""
+        if self.image is None:
+            return
+        min_scale = min(1.0, 256 / max(self.image.width, self.image.height))
+        new_scale = max(min_scale, min(MAX_SCALE, self.scale * factor))
+        image_x, image_y = self.canvas_to_image(x, y)
+        self.scale = new_scale
+        self.offset_x = image_x - x / new_scale
+        self.offset_y = image_y - y / new_scale
+        self.redraw()
+
+    def on_wheel(self, event):
+        if event.num == 4 or getattr(event, "delta", 0) > 0:
+            self.zoom(ZOOM_STEP, event.x, event.y)
+        else:
+            self.zoom(1 / ZOOM_STEP, event.x, event.y)
+
+    def on_pan_press(self, event):
+        self._pan_start = (event.x, event.y, self.offset_x, self.offset_y)
+
+    def on_pan_move(self, event):
+        if self._pan_start is None:
+            return
+        x0, y0, offset_x, offset_y = self._pan_start
+        self.offset_x = offset_x - (event.x - x0) / self.scale
+        self.offset_y = offset_y - (event.y - y0) / self.scale
+        self.redraw()
+
+    # --- Pyramid and tiles ---
+    def level_image(self, level):
+        while len(self.levels) <= level:
+            self.levels.append(None)
+        if self.levels[level] is None:
+            # Reduce from the closest finer level that already exists
+            finer = max(k for k in range(level) if self.levels[k] is not None)
+            self.levels[level] = self.levels[finer].reduce(2 ** (level - finer))
+        return self.levels[level]
+
+    def tile(self, level, tx, ty, size):
+        key = (level, tx, ty, round(self.scale, 6))
+        photo = self._tiles.get(key)
+        if photo is not None:
+            self._tiles.move_to_end(key)
+            return photo
+
+        source = self.level_image(level)
+        box = (tx * size, ty * size,
+               min(source.width, (tx + 1) * size), min(source.height, (ty + 1) * size))
+        # Display size of this tile; ceil so neighbors overlap instead of leaving gaps
+        display_scale = self.scale * 2 ** level
+        display_size = (max(1, math.ceil((box[2] - box[0]) * display_scale)),
+                        max(1, math.ceil((box[3] - box[1]) * display_scale)))
+        resample = Image.NEAREST if display_scale >= 1 else Image.BILINEAR
+        photo = ImageTk.PhotoImage(source.crop(box).resize(display_size, resample))
+
+        self._tiles[key] = photo
+        if len(self._tiles) > MAX_CACHED_TILES:
+            self._tiles.popitem(last=False)
+        return photo
+
+    def redraw(self):
+        self.canvas.delete("tile")
+        self._shown = []
+        if self.image is None:
+            return
+
+        # Coarsest level that still has at least one source pixel per screen pixel
+        max_level = max(0, int(math.log2(max(self.image.width, self.image.height) / TILE_SIZE)))
+        if self.scale > 1:
+            # Zoomed in: smaller source tiles so each one still displays at about TILE_SIZE
+            level = 0
+            size = max(8, TILE_SIZE >> math.ceil(math.log2(self.scale)))
+        else:
+            level = min(max_level, int(math.floor(math.log2(1 / self.scale))))
+            size = TILE_SIZE
+        tile_span = size * 2 ** level # Full-resolution pixels per tile
+
+        # Visible part of the image in full-resolution coordinates
+        left, top = self.canvas_to_image(0, 0)
+        right, bottom = self.canvas_to_image(self.canvas.winfo_width(), self.canvas.winfo_height())
+        tx_range = range(max(0, int(left // tile_span)), min(math.ceil(self.image.width / tile_span), int(right // tile_span) + 1))
+        ty_range = range(max(0, int(top // tile_span)), min(math.ceil(self.image.height / tile_span), int(bottom // tile_span) + 1))
+
+        for ty in ty_range:
+            for tx in tx_range:
+                x, y = self.image_to_canvas(tx * tile_span, ty * tile_span)
+                photo = self.tile(level, tx, ty, size)
+                self._shown.append(photo)
+                self.canvas.create_image(round(x), round(y), anchor="nw", image=photo, tags="tile")
+
+        # Keep overlays (ROI rectangles) above the image
+        self.canvas.tag_lower("tile")
+        if self.on_view_change:
+            self.on_view_change()